@@ -0,0 +1,235 @@
+"""The benchmarked operations.
+
+Strategies and closers run against the simulated broker of the backtest engine, with the clocks of the bots set to
+the simulated time, so a terminal call costs what the bot's own code around it costs and nothing else. Every case
+gets a session of its own starting at the first operation time of the fixture, with empty caches.
+"""
+import dataclasses
+import pkgutil
+from contextlib import ExitStack
+from copy import deepcopy
+from importlib import import_module
+from typing import Callable, Iterator
+
+from aiomql import Config, ForexSymbol, OrderType, Strategy, TimeFrame, Candles
+from pandas import DataFrame
+
+from src.backtest import Backtest, SimLoop
+from src.closers import (OpenOrder, adx_closer, atr_trailer, chandelier, chandelier_trailer, fixed_check_profit,
+                         ratio_check_profit, trail_sl, trail_tp, hedge_position, track_hedge, track_hedge_2)
+from src.closers.ema_closer import ema_closer
+from src.strategies import FFATR, FingerADX, FingerADXBatch
+from src.utils import find_bullish_fractals, find_bearish_fractals, candle_cache, indicator_engine
+from src.utils.double_bottoms import find_local_maxima_minima
+from src.utils.support_resistance.fibonacci_retracement import fib_ret
+
+from .fixtures import Fixture
+from .harness import Case, Step, Timer
+
+
+class Session:
+    """The simulated broker and clocks a case runs against, in place while the session is entered.
+
+    Attributes:
+        fixture (Fixture): The bars.
+        backtest (Backtest): Provides the broker, the clock and the patches pointing the bots at them.
+        loop (SimLoop): Event loop running on the simulated clock.
+    """
+    def __init__(self, *, fixture: Fixture):
+        self.fixture = fixture
+        self.backtest = Backtest(history=fixture.history, strategies=[], start=fixture.start, specs=fixture.specs,
+                                 monitor=False)
+        self.loop = SimLoop(clock=self.backtest.clock)
+        self.stack = ExitStack()
+
+    @property
+    def clock(self):
+        return self.backtest.clock
+
+    @property
+    def broker(self):
+        return self.backtest.broker
+
+    def __enter__(self) -> 'Session':
+        self.stack.enter_context(self.backtest.patched())
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stack.close()
+        self.loop.close()
+
+
+def strategy_classes() -> Iterator[type[Strategy]]:
+    """Every strategy defined in the modules of src.strategies."""
+    package = import_module('src.strategies')
+    for info in pkgutil.iter_modules(package.__path__):
+        module = import_module(f"{package.__name__}.{info.name}")
+        yield from (value for value in vars(module).values() if isinstance(value, type)
+                    and issubclass(value, Strategy) and value.__module__ == module.__name__)
+
+
+def bar(strategy: Strategy) -> TimeFrame:
+    """The timeframe a strategy waits on for a new bar."""
+    if requirements := getattr(strategy, 'requirements', None):
+        return requirements[0][0]
+    return next(strategy.parameters[name] for name in ('ttf', 'etf') if name in strategy.parameters)
+
+
+def check(cls: type[Strategy]) -> str:
+    """The method a strategy checks the market with, check_trend unless it only has confirm_trend like RA."""
+    return 'check_trend' if hasattr(cls, 'check_trend') else 'confirm_trend'
+
+
+def strategy_case(cls: type[Strategy], *, cold: bool = False) -> Case:
+    """The check of a strategy on the opening of each new bar. Cold cases start every operation with empty caches."""
+    method = check(cls)
+
+    async def prepare(session: Session) -> Step:
+        strategy = cls(symbol=ForexSymbol(name=session.fixture.symbols[0]))
+        await strategy.symbol.init()
+        secs = bar(strategy).time
+        func = getattr(strategy, method)
+
+        async def step(timer: Timer):
+            session.clock.now += secs
+            if cold:
+                candle_cache.invalidate()
+                indicator_engine.states.clear()
+            with timer:
+                await func()
+        return step
+    return Case(name=f"strategies.{cls.__name__}.{method}{'[cold]' if cold else ''}", prepare=prepare)
+
+
+def batch_case() -> Case:
+    """FingerADXBatch.evaluate over every symbol of the fixture on the opening of each new bar."""
+    async def prepare(session: Session) -> Step:
+        batch = FingerADXBatch()
+        strategies = [FingerADX(symbol=ForexSymbol(name=name), batch=batch) for name in session.fixture.symbols]
+        for strategy in strategies:
+            await strategy.symbol.init()
+        secs = batch.params['ttf'].time
+
+        async def step(timer: Timer):
+            session.clock.now += secs
+            with timer:
+                await batch.evaluate()
+        return step
+    return Case(name='strategies.FingerADXBatch.evaluate', prepare=prepare)
+
+
+async def open_orders(session: Session) -> tuple[list[OpenOrder], list[OpenOrder]]:
+    """Place a buy and a sell on every symbol through the trader of FFATR, hedge each of them, and move the clock
+    six hours on so the positions are in profit or loss.
+
+    Returns:
+        tuple[list[OpenOrder], list[OpenOrder]]: The orders and their hedges
+    """
+    for name in session.fixture.symbols:
+        for order_type in (OrderType.BUY, OrderType.SELL):
+            # a trader holds a single open order, so each trade needs a trader of its own
+            strategy = FFATR(symbol=ForexSymbol(name=name))
+            await strategy.symbol.init()
+            tick = await strategy.symbol.info_tick()
+            price, sign = (tick.ask, 1) if order_type == OrderType.BUY else (tick.bid, -1)
+            # ema_closer reads exit_ema, which FFATR does not set
+            await strategy.trader.place_trade(order_type=order_type, sl=price * (1 - sign * 0.05),
+                                              tp=price * (1 + sign * 0.1),
+                                              parameters=strategy.parameters | {'exit_ema': 21})
+    orders = list(Config().state['tracked_orders'].values())
+    session.clock.now += 6 * 3600
+    for order in orders:
+        await order.get_position()
+        # a hedge point above any loss hedges every order, whatever its profit
+        hedge = clone(order)
+        hedge.hedger_params = (hedge.hedger_params or {}) | {'hedge_point': float('-inf')}
+        await hedge_position(order=hedge)
+        order.hedge, order.hedged = hedge.hedge, hedge.hedged
+    hedges = [order.hedge for order in orders if order.hedge is not None]
+    for hedge in hedges:
+        await hedge.get_position()
+    session.broker.sync()
+    return orders, hedges
+
+
+def clone(order: OpenOrder) -> OpenOrder:
+    """A copy of an order the closers can change without affecting the original."""
+    params = {name: deepcopy(value) for name, value in vars(order).items()
+              if name.endswith('_params') or name == 'strategy_parameters'}
+    return dataclasses.replace(order, **params)
+
+
+def closer_case(closer: Callable, *, hedges: bool = False, profit: int = 0, params: dict[str, dict] = None) -> Case:
+    """A closer run on the open orders in turn, or on the hedges for the hedge trackers. The orders, the positions
+    of the broker and the tracked orders are restored after every operation.
+
+    Args:
+        closer (Callable): The closer
+        hedges (bool): Run the closer on the hedges
+        profit (int): Only run on the orders in profit when 1 or in loss when -1, if there are any
+        params (dict[str, dict]): Parameters updated on every order, by name of the parameter dict
+    """
+    async def prepare(session: Session) -> Step:
+        orders, hedged = await open_orders(session)
+        targets = hedged if hedges else orders
+        targets = [order for order in targets if order.position.profit * profit > 0] or targets
+        broker, config = session.broker, Config()
+        positions = deepcopy(broker.positions)
+        balance, deals, trades = broker.balance, len(broker.deals), len(broker.trades)
+        tracked = dict(config.state['tracked_orders'])
+        count = 0
+
+        async def step(timer: Timer):
+            nonlocal count
+            order = clone(targets[count % len(targets)])
+            count += 1
+            for name, values in (params or {}).items():
+                getattr(order, name).update(values)
+            if hedges:
+                order.hedged_order = clone(order.hedged_order)
+            with timer:
+                await (closer(hedge=order) if hedges else closer(order=order))
+            broker.positions = deepcopy(positions)
+            broker.balance = balance
+            del broker.deals[deals:], broker.trades[trades:]
+            config.state['tracked_orders'] = dict(tracked)
+        return step
+    return Case(name=f"closers.{closer.__name__}", prepare=prepare)
+
+
+def util_case(name: str, func: Callable[[Candles], object], *, timeframe: TimeFrame = TimeFrame.H1,
+              count: int = 720) -> Case:
+    """A function of src.utils applied to the last count bars of the first symbol of the fixture."""
+    async def prepare(session: Session) -> Step:
+        fixture = session.fixture
+        rates = fixture.history.copy_rates_from_pos(symbol=fixture.symbols[0], timeframe=timeframe, start_pos=0,
+                                                    count=count, now=fixture.start)
+
+        async def step(timer: Timer):
+            candles = Candles(data=DataFrame(rates))
+            with timer:
+                func(candles)
+        return step
+    return Case(name=f"utils.{name}", prepare=prepare)
+
+
+def cases() -> list[Case]:
+    strategies = list(strategy_classes())
+    # the trailers only act once a position has made or lost enough, so they run on the positions past that point
+    start = {'trail_start': 0, 'previous_profit': 0}
+    closers = [closer_case(closer) for closer in (adx_closer, ema_closer, chandelier, fixed_check_profit,
+                                                  ratio_check_profit)]
+    closers += [closer_case(hedge_position, params={'hedger_params': {'hedge_point': float('-inf')}})]
+    closers += [closer_case(closer, profit=1, params={'track_profit_params': start})
+                for closer in (atr_trailer, chandelier_trailer, trail_tp)]
+    closers += [closer_case(trail_sl, profit=-1, params={'track_loss_params': start})]
+    closers += [closer_case(closer, hedges=True) for closer in (track_hedge, track_hedge_2)]
+    return ([strategy_case(cls) for cls in strategies] + [strategy_case(cls, cold=True) for cls in strategies]
+            + [batch_case()] + closers
+            + [util_case('find_bullish_fractals', find_bullish_fractals),
+               util_case('find_bearish_fractals', find_bearish_fractals),
+               util_case('double_bottoms.find_local_maxima_minima',
+                         lambda candles: find_local_maxima_minima(candles.data, 5)),
+               util_case('double_bottoms.find_local_maxima_minima[smooth]',
+                         lambda candles: find_local_maxima_minima(candles.data, 5, smooth=True)),
+               util_case('fib_ret', lambda candles: fib_ret(data=candles.data))])
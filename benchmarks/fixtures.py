@@ -0,0 +1,80 @@
+"""Candle fixtures for the benchmarks.
+
+The synthetic fixture is a seeded random walk starting at a fixed date, so it is the same on every run and every
+machine. The recorded fixture is made of bars saved from a terminal with record, one csv file per symbol with the
+specification of the symbol in a json file next to it.
+"""
+import json
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Sequence
+
+from aiomql import Account, ForexSymbol, TimeFrame
+
+from src.backtest import History
+from src.backtest.terminal import SYNTHETIC_SPEC
+
+FIXTURES = Path(__file__).parent / 'fixtures'
+# midnight of 2024-01-01, so the synthetic bars and all simulated times are the same from run to run
+EPOCH = 1704067200
+# bars before the first operation, enough for the 60 daily bars of the chandelier exit and the 720 hourly bars of
+# the strategies
+LOOKBACK = 70 * 86400
+# bars after the first operation, the strategies move one bar on per operation
+SPAN = 20 * 86400
+
+
+@dataclass
+class Fixture:
+    """Bars to benchmark against.
+
+    Attributes:
+        name (str): Name of the fixture.
+        history (History): The bars.
+        specs (dict[str, dict]): Specifications of the symbols for the simulated broker.
+        start (float): Time of the first operation.
+    """
+    name: str
+    history: History
+    specs: dict[str, dict]
+    start: float
+
+    @property
+    def symbols(self) -> list[str]:
+        return list(self.history.rates)
+
+
+def synthetic(*, symbols: int = 3, seed: int = 7) -> Fixture:
+    names = [f"SYN{i}" for i in range(symbols)]
+    history = History.synthetic(symbols=names, start=EPOCH, end=EPOCH + LOOKBACK + SPAN, seed=seed)
+    return Fixture(name='synthetic', history=history, specs={name: SYNTHETIC_SPEC.copy() for name in names},
+                   start=EPOCH + LOOKBACK)
+
+
+def recorded(*, directory: Path = FIXTURES) -> Fixture:
+    files = sorted(directory.glob('*.csv'))
+    if not files:
+        raise FileNotFoundError(f"No recorded bars in {directory}, save some with python -m benchmarks.record")
+    history = History.from_csv(files={file.stem: str(file) for file in files})
+    if history.end - history.start < LOOKBACK + SPAN:
+        raise ValueError(f"Recorded bars cover {(history.end - history.start) / 86400:.0f} days, "
+                         f"{(LOOKBACK + SPAN) / 86400:.0f} are needed")
+    specs = {file.stem: json.loads(spec.read_text()) for file in files if (spec := file.with_suffix('.json')).exists()}
+    return Fixture(name='recorded', history=history, specs=specs, start=history.end - SPAN)
+
+
+FIXTURE_LOADERS = {'synthetic': synthetic, 'recorded': recorded}
+
+
+async def record(*, symbols: Sequence[str], days: int = 90, directory: Path = FIXTURES):
+    """Save the most recent five minute bars of symbols from the terminal of the loaded config as fixtures."""
+    directory.mkdir(parents=True, exist_ok=True)
+    async with Account():
+        for name in symbols:
+            symbol = ForexSymbol(name=name)
+            await symbol.init()
+            candles = await symbol.copy_rates_from_pos(timeframe=TimeFrame.M5, count=days * 288)
+            columns = ['time', 'open', 'high', 'low', 'close', 'tick_volume', 'spread', 'real_volume']
+            candles.data[columns].to_csv(directory / f"{name}.csv", index=False)
+            spec = {key: getattr(symbol, key) for key in SYNTHETIC_SPEC}
+            (directory / f"{name}.json").write_text(json.dumps(spec, indent=2))
@@ -0,0 +1,156 @@
+import gc
+import json
+import platform
+import subprocess
+import tracemalloc
+from dataclasses import dataclass, asdict
+from pathlib import Path
+from statistics import mean, median
+from time import perf_counter
+from typing import Awaitable, Callable
+
+import numpy as np
+
+BASELINES = Path(__file__).parent / 'baselines'
+# names are padded to this width, so rows printed one at a time line up
+NAME_WIDTH = 52
+
+
+class Timer:
+    """Times the operation run inside it, and with trace its peak memory, once per entry.
+
+    The garbage collector is paused while an operation runs, as timeit does, so a collection triggered by the
+    previous operation is not charged to the next one.
+
+    Attributes:
+        times (list[float]): Seconds taken by each operation.
+        peaks (list[int]): Peak bytes allocated by each operation above what was allocated before it.
+    """
+    def __init__(self, *, trace: bool = False):
+        self.trace = trace
+        self.times: list[float] = []
+        self.peaks: list[int] = []
+        self.start = 0.0
+        self.base = 0
+
+    def __enter__(self) -> 'Timer':
+        gc.disable()
+        if self.trace:
+            tracemalloc.reset_peak()
+            self.base = tracemalloc.get_traced_memory()[0]
+        self.start = perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.times.append(perf_counter() - self.start)
+        if self.trace:
+            self.peaks.append(tracemalloc.get_traced_memory()[1] - self.base)
+        gc.enable()
+
+
+Step = Callable[[Timer], Awaitable[None]]
+
+
+@dataclass
+class Case:
+    """A benchmark. prepare sets up what the operation needs and returns step, which runs one operation inside the
+    timer it is given. Work done by step outside the timer, such as restoring state, is not measured.
+    """
+    name: str
+    prepare: Callable[..., Awaitable[Step]]
+
+
+@dataclass
+class Result:
+    name: str
+    ops: int
+    ops_per_sec: float
+    mean: float
+    median: float
+    peak_memory: int
+
+
+async def measure(case: Case, step: Step, *, number: int, warmup: int, traced: int) -> Result:
+    """Run an operation warmup times unmeasured, number times timed and traced times under tracemalloc.
+
+    The rate is taken from the median time, so a stray slow operation does not move it. Memory is traced in runs
+    of its own because tracing slows every allocation down.
+    """
+    for _ in range(warmup):
+        await step(Timer())
+    gc.collect()
+    timer = Timer()
+    for _ in range(number):
+        await step(timer)
+    tracer = Timer(trace=True)
+    tracemalloc.start()
+    try:
+        for _ in range(traced):
+            await step(tracer)
+    finally:
+        tracemalloc.stop()
+    middle = median(timer.times)
+    return Result(name=case.name, ops=number, ops_per_sec=1 / middle if middle else float('inf'),
+                  mean=mean(timer.times), median=middle, peak_memory=max(tracer.peaks, default=0))
+
+
+def revision() -> str:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=Path(__file__).parent).stdout.strip()
+    except OSError:
+        return ''
+
+
+def save(results: list[Result], *, name: str, meta: dict) -> Path:
+    """Store results as the baseline called name."""
+    BASELINES.mkdir(parents=True, exist_ok=True)
+    path = BASELINES / f"{name}.json"
+    meta = meta | {'revision': revision(), 'python': platform.python_version(), 'numpy': np.__version__,
+                   'machine': platform.machine(), 'processor': platform.processor()}
+    path.write_text(json.dumps({'meta': meta, 'results': {result.name: asdict(result) for result in results}},
+                               indent=2))
+    return path
+
+
+def load(name: str) -> dict:
+    return json.loads((BASELINES / f"{name}.json").read_text())
+
+
+def compare(results: list[Result], baseline: dict, *, tolerance: float = 0.1,
+            memory_slack: int = 64 * 1024) -> list[str]:
+    """Names and details of the results slower or using more memory than the baseline by more than tolerance.
+
+    Args:
+        results (list[Result]): The results of this run
+        baseline (dict): A baseline as stored by save
+        tolerance (float): Allowed fraction by which the rate can drop and the peak memory can grow
+        memory_slack (int): Bytes a peak can grow by regardless of tolerance, as small peaks vary between runs
+
+    Returns:
+        list[str]: One line per regression
+    """
+    regressions = []
+    for result in results:
+        if (base := baseline['results'].get(result.name)) is None:
+            continue
+        if result.ops_per_sec < base['ops_per_sec'] * (1 - tolerance):
+            regressions.append(f"{result.name}: {result.ops_per_sec:.1f} ops/sec, "
+                               f"{result.ops_per_sec / base['ops_per_sec'] - 1:+.0%} on {base['ops_per_sec']:.1f}")
+        if result.peak_memory > base['peak_memory'] * (1 + tolerance) + memory_slack:
+            regressions.append(f"{result.name}: {result.peak_memory / 1024:.0f} KiB peak, "
+                               f"up from {base['peak_memory'] / 1024:.0f} KiB")
+    return regressions
+
+
+def report(results: list[Result], baseline: dict = None) -> str:
+    """A table of the results, with the change in rate against the baseline when there is one."""
+    rows = []
+    width = max([len(result.name) for result in results] + [NAME_WIDTH])
+    for result in results:
+        row = f"{result.name:<{width}}  {result.ops_per_sec:>10.1f} ops/sec  {result.median * 1000:>9.3f} ms  " \
+              f"{result.peak_memory / 1024:>9.0f} KiB"
+        if baseline and (base := baseline['results'].get(result.name)):
+            row += f"  {result.ops_per_sec / base['ops_per_sec'] - 1:>+7.1%}"
+        rows.append(row)
+    return '\n'.join(rows)
@@ -0,0 +1,24 @@
+"""Save recent five minute bars from a terminal as benchmark fixtures.
+
+    python -m benchmarks.record "Volatility 75 Index" "Volatility 25 Index" --config deriv1.json --days 90
+"""
+import argparse
+import asyncio
+
+from aiomql import Config
+
+from .fixtures import record
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('symbols', nargs='+')
+    parser.add_argument('--config', default='deriv1.json', help='config file in configs/ of the terminal to use')
+    parser.add_argument('--days', type=int, default=90, help='days of bars to save')
+    args = parser.parse_args()
+    Config(config_dir='configs', filename=args.config, reload=True, record_trades=False)
+    asyncio.run(record(symbols=args.symbols, days=args.days))
+
+
+if __name__ == '__main__':
+    main()
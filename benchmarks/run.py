@@ -0,0 +1,77 @@
+"""Run the benchmarks and compare them with a stored baseline.
+
+    python -m benchmarks.run --save main
+    python -m benchmarks.run --compare main --tolerance 0.15
+    python -m benchmarks.run --filter closers --fixture recorded
+
+Each case is timed over --number operations after --warmup unmeasured ones, and its peak memory is traced over
+--traced more. Baselines are stored in benchmarks/baselines. The exit status is 1 when a case is slower or uses more
+memory than the baseline by more than the tolerance. Timings are only comparable on the same machine. The
+MetaTrader5 package is replaced by src/backtest/metatrader5.py where it is not installed.
+"""
+import argparse
+import importlib.util
+import logging
+import sys
+from pathlib import Path
+
+try:
+    import MetaTrader5
+except ImportError:
+    path = Path(__file__).parents[1] / 'src' / 'backtest' / 'metatrader5.py'
+    spec = importlib.util.spec_from_file_location('MetaTrader5', path)
+    MetaTrader5 = sys.modules['MetaTrader5'] = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(MetaTrader5)
+
+from .cases import Session, cases
+from .fixtures import FIXTURE_LOADERS
+from .harness import Result, measure, save, load, compare, report
+
+
+def run(*, fixture: str, pattern: str, number: int, warmup: int, traced: int) -> list[Result]:
+    loaded = FIXTURE_LOADERS[fixture]()
+    results = []
+    for case in cases():
+        if pattern not in case.name:
+            continue
+        with Session(fixture=loaded) as session:
+            step = session.loop.run_until_complete(case.prepare(session))
+            result = session.loop.run_until_complete(measure(case, step, number=number, warmup=warmup,
+                                                             traced=traced))
+        print(report([result]), flush=True)
+        results.append(result)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--fixture', choices=list(FIXTURE_LOADERS), default='synthetic')
+    parser.add_argument('--filter', default='', help='run only the cases with names containing this')
+    parser.add_argument('--number', type=int, default=30, help='timed operations per case')
+    parser.add_argument('--warmup', type=int, default=2, help='unmeasured operations before timing')
+    parser.add_argument('--traced', type=int, default=5, help='operations run to trace peak memory')
+    parser.add_argument('--save', metavar='NAME', help='store the results as the baseline NAME')
+    parser.add_argument('--compare', metavar='NAME', help='compare the results with the baseline NAME')
+    parser.add_argument('--tolerance', type=float, default=0.1, help='allowed fractional slowdown or memory growth')
+    args = parser.parse_args()
+
+    # the cases run the error paths of the bots too, their logs would drown the results
+    logging.disable(logging.CRITICAL)
+    baseline = load(args.compare) if args.compare else None
+    if baseline and baseline['meta']['fixture'] != args.fixture:
+        print(f"Baseline {args.compare} was taken on the {baseline['meta']['fixture']} fixture", file=sys.stderr)
+    results = run(fixture=args.fixture, pattern=args.filter, number=args.number, warmup=args.warmup,
+                  traced=args.traced)
+    if args.save:
+        path = save(results, name=args.save, meta={'fixture': args.fixture, 'number': args.number})
+        print(f"Saved baseline to {path}")
+    if baseline:
+        print(f"\nAgainst {args.compare} ({baseline['meta'].get('revision', '')}):")
+        print(report(results, baseline))
+        if regressions := compare(results, baseline, tolerance=args.tolerance):
+            print('\nRegressions:\n' + '\n'.join(regressions))
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
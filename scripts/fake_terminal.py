@@ -0,0 +1,55 @@
+"""Run one of the bots against an in-process fake terminal serving random walk bars.
+
+    python -m scripts.fake_terminal crypto --latency 0.005 --jitter 0.01 --duration 600
+
+The MetaTrader5 package is replaced by src/backtest/metatrader5.py where it is not installed, so the bots can be
+run on any platform. Call counts and latencies of the terminal functions and a summary of the trades are printed
+when the run ends.
+"""
+import argparse
+import importlib.util
+import json
+import os
+import sys
+import time
+from pathlib import Path
+from threading import Thread
+
+try:
+    import MetaTrader5
+except ImportError:
+    path = Path(__file__).parents[1] / 'src' / 'backtest' / 'metatrader5.py'
+    spec = importlib.util.spec_from_file_location('MetaTrader5', path)
+    MetaTrader5 = sys.modules['MetaTrader5'] = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(MetaTrader5)
+
+from src import bots
+from src.backtest import FakeTerminal
+from src.symbols.deriv_symbols import volatility_symbols
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('bot', choices=['crypto', 'deriv1', 'deriv2', 'deriv_scalper'])
+    parser.add_argument('--latency', type=float, default=0, help='seconds every terminal call blocks for')
+    parser.add_argument('--jitter', type=float, default=0, help='upper bound of a random delay added to the latency')
+    parser.add_argument('--duration', type=float, default=300, help='seconds to run the bot for')
+    parser.add_argument('--days', type=float, default=30, help='days of bars before the start of the run')
+    parser.add_argument('--seed', type=int, default=None)
+    args = parser.parse_args()
+
+    symbols = volatility_symbols + ['ETHUSD', 'BTCUSD', 'SOLUSD']
+    terminal = FakeTerminal.synthetic(symbols=symbols, days=args.days, seed=args.seed, latency=args.latency,
+                                      jitter=args.jitter)
+    os.makedirs('logs', exist_ok=True)
+    terminal.install()
+    Thread(target=getattr(bots, args.bot), daemon=True).start()
+    time.sleep(args.duration)
+    print(json.dumps({'terminal': terminal.stats(), 'account': terminal.broker.summary()}, indent=2, default=str))
+    # the bot has no way to be stopped from outside, so its threads are left to the exit
+    sys.stdout.flush()
+    os._exit(0)
+
+
+if __name__ == '__main__':
+    main()
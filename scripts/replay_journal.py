@@ -0,0 +1,69 @@
+"""Replay the evaluations in a decision journal against stored bars and report the decisions that differ.
+
+    python -m scripts.replay_journal records/deriv1/journal "Volatility 75 Index=v75.csv" --symbol "Volatility 75 Index"
+    python -m scripts.replay_journal records/deriv2/journal "Volatility 25 Index=v25.csv" --specs specs.json --all
+
+Bars are given per symbol as csv files of the base timeframe, covering the journaled evaluations and the look back
+of the strategies. Specs is a json file of symbol properties by name, for the strategies that size their stops
+from them. The exit status is 1 when an evaluation read other bars or came to another decision. The MetaTrader5
+package is replaced by src/backtest/metatrader5.py where it is not installed.
+"""
+import argparse
+import importlib.util
+import json
+import logging
+import sys
+from datetime import datetime
+from pathlib import Path
+
+try:
+    import MetaTrader5
+except ImportError:
+    path = Path(__file__).parents[1] / 'src' / 'backtest' / 'metatrader5.py'
+    spec = importlib.util.spec_from_file_location('MetaTrader5', path)
+    MetaTrader5 = sys.modules['MetaTrader5'] = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(MetaTrader5)
+
+from aiomql import TimeFrame
+
+from src.backtest import History, Replayer
+from src.utils.decision_journal import DecisionJournal
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('journal', help='directory of the journal segments')
+    parser.add_argument('bars', nargs='+', metavar='SYMBOL=CSV', help='csv file of the bars of a symbol')
+    parser.add_argument('--timeframe', default='M5', help='timeframe of the bars in the csv files')
+    parser.add_argument('--specs', help='json file of symbol properties by name')
+    parser.add_argument('--symbol', help='replay only the evaluations of this symbol')
+    parser.add_argument('--strategy', help='replay only the evaluations of the strategy with this name')
+    parser.add_argument('--all', action='store_true', help='report the evaluations that match as well')
+    args = parser.parse_args()
+
+    files = dict(bar.split('=', 1) for bar in args.bars)
+    history = History.from_csv(files=files, timeframe=TimeFrame[args.timeframe])
+    specs = json.loads(Path(args.specs).read_text()) if args.specs else None
+    records = [record for record in DecisionJournal.read(args.journal) if record.symbol in files
+               and (args.symbol is None or record.symbol == args.symbol)
+               and (args.strategy is None or record.name == args.strategy)]
+    # the strategies log the errors of a check, which the report shows as a mismatch anyway
+    logging.disable(logging.ERROR)
+    results = Replayer(history=history, specs=specs).run(records)
+    differing = 0
+    for result in results:
+        matched = result.inputs_match and result.decision_match
+        differing += not matched
+        if matched and not args.all:
+            continue
+        record = result.record
+        status = 'ok' if matched else 'bars differ' if not result.inputs_match else 'decision differs'
+        print(f"{datetime.fromtimestamp(record.time):%Y-%m-%d %H:%M:%S} {record.name} {record.symbol}: {status}")
+        if not result.decision_match:
+            print(f"    journaled {result.expected}\n    replayed  {result.actual}")
+    print(f"{len(results)} evaluations replayed, {differing} differ")
+    sys.exit(1 if differing else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,6 @@
+from .history import History
+from .broker import SimBroker
+from .engine import Backtest, SimLoop, VirtualClock
+from .terminal import FakeTerminal
+from .sweep import Sweep
+from .replay import Replayer, Replayed
@@ -0,0 +1,382 @@
+from itertools import count
+from logging import getLogger
+from math import isclose
+from typing import Callable
+
+import numpy as np
+from aiomql import TimeFrame
+
+from .history import History
+from .metatrader5 import (SymbolInfo, Tick, AccountInfo, TradePosition, TradeDeal, TradeRequest, OrderSendResult,
+                      OrderCheckResult)
+
+logger = getLogger(__name__)
+
+BUY, SELL = 0, 1
+DEAL, SLTP = 1, 6
+ENTRY_IN, ENTRY_OUT = 0, 1
+REASON_EXPERT, REASON_SL, REASON_TP = 3, 4, 5
+DONE, CHECKED = 10009, 0
+RETCODES = {10009: 'Request completed', 10013: 'Invalid request', 10014: 'Invalid volume', 10016: 'Invalid stops',
+            10019: 'No money', 10025: 'No changes', 10036: 'Position already closed'}
+
+
+class SimBroker:
+    """A simulated hedging account driven by stored history.
+
+    The broker exposes the functions of the MetaTrader5 package used by this project, with the same signatures and
+    return types, answered from a History at the time given by clock. Market orders fill at the last price of the
+    symbol, that is the open of the forming base bar, with the ask taken as the bid plus the spread of the bar. Stop
+    loss and take profit levels are checked against the high and low of every base bar once it closes. A bar that
+    opens beyond a level closes the position at the open, and when both levels lie within one bar the stop loss is
+    assumed to have been hit first.
+
+    Attributes:
+        history (History): The stored bars.
+        clock (Callable): Source of the simulated time in seconds.
+        specs (dict[str, dict]): Symbol properties by name, overriding the defaults of SymbolInfo.
+        balance (float): Account balance.
+        leverage (int): Account leverage.
+        positions (dict[int, dict]): Open positions by ticket.
+        deals (list[TradeDeal]): Executed deals.
+        trades (list[dict]): Closed positions with their entry, exit and profit.
+        equity_curve (list[tuple[int, float]]): Equity at the close of each base bar with open positions.
+    """
+    history: History
+    clock: Callable[[], float]
+    specs: dict[str, dict]
+    balance: float
+    leverage: int
+
+    def __init__(self, *, history: History, clock: Callable[[], float], specs: dict[str, dict] = None,
+                 balance: float = 10000, leverage: int = 100, currency: str = 'USD'):
+        self.history = history
+        self.clock = clock
+        self.specs = {symbol: SymbolInfo(name=symbol, currency_profit=currency, currency_margin=currency)._asdict()
+                      | (specs or {}).get(symbol, {}) for symbol in history.rates}
+        self.balance = balance
+        self.leverage = leverage
+        self.currency = currency
+        self.tickets = count(1000)
+        self.positions: dict[int, dict] = {}
+        self.deals: list[TradeDeal] = []
+        self.trades: list[dict] = []
+        self.equity_curve: list[tuple[int, float]] = []
+        self.checked = {symbol: 0 for symbol in history.rates}
+        self.synced = None
+        self.error = (1, 'Success')
+
+    # prices and bookkeeping
+    def quote(self, symbol: str) -> tuple[float, float, int]:
+        """Bid, ask and time of the last price of a symbol."""
+        bid, spread, time = self.history.price(symbol=symbol, now=self.clock())
+        spec = self.specs[symbol]
+        spread = spread or spec['spread']
+        return bid, round(bid + spread * spec['point'], spec['digits']), time
+
+    def calc_profit(self, order_type: int, symbol: str, volume: float, price_open: float, price_close: float) -> float:
+        sign = 1 if int(order_type) == BUY else -1
+        return sign * (price_close - price_open) * volume * self.specs[symbol]['trade_contract_size']
+
+    def calc_margin(self, symbol: str, volume: float, price: float) -> float:
+        return volume * self.specs[symbol]['trade_contract_size'] * price / self.leverage
+
+    def sync(self):
+        """Bring the account up to the current time. Stop loss and take profit levels are checked against every
+        base bar that closed since the last call, then open positions are marked to the last price."""
+        now = self.clock()
+        if now == self.synced:
+            return
+        self.synced = now
+        symbols = {position['symbol'] for position in self.positions.values()}
+        for symbol in self.checked:
+            closed = self.history.closed(symbol=symbol, now=now)
+            if symbol in symbols:
+                rates = self.history.rates[symbol]
+                for i in range(self.checked[symbol], closed):
+                    self.check_stops(symbol=symbol, bar=rates[i])
+                    self.equity_curve.append((int(rates[i]['time']), self.equity))
+            self.checked[symbol] = max(self.checked[symbol], closed)
+
+        for position in self.positions.values():
+            bid, ask, _ = self.quote(position['symbol'])
+            self.mark(position, bid=bid, ask=ask)
+
+    def mark(self, position: dict, *, bid: float, ask: float):
+        price = bid if position['type'] == BUY else ask
+        position['price_current'] = price
+        position['profit'] = self.calc_profit(position['type'], position['symbol'], position['volume'],
+                                              position['price_open'], price)
+
+    def check_stops(self, *, symbol: str, bar: np.void):
+        spec = self.specs[symbol]
+        time = int(bar['time'])
+        spread = (int(bar['spread']) or spec['spread']) * spec['point']
+        end = time + self.history.timeframe.time
+        for position in [p for p in self.positions.values() if p['symbol'] == symbol and p['time'] < end]:
+            sl, tp = position['sl'], position['tp']
+            # a buy closes at the bid and a sell at the ask
+            shift = 0 if position['type'] == BUY else spread
+            open_, high, low = bar['open'] + shift, bar['high'] + shift, bar['low'] + shift
+            if position['type'] == BUY:
+                hits = ((sl and open_ <= sl, open_, REASON_SL), (tp and open_ >= tp, open_, REASON_TP),
+                        (sl and low <= sl, sl, REASON_SL), (tp and high >= tp, tp, REASON_TP))
+            else:
+                hits = ((sl and open_ >= sl, open_, REASON_SL), (tp and open_ <= tp, open_, REASON_TP),
+                        (sl and high >= sl, sl, REASON_SL), (tp and low <= tp, tp, REASON_TP))
+            for hit, price, reason in hits:
+                if hit:
+                    self.close(position, price=float(price), volume=position['volume'],
+                               time=max(time, position['time']), reason=reason)
+                    break
+
+    def close(self, position: dict, *, price: float, volume: float, time: int, reason: int = REASON_EXPERT) -> int:
+        profit = round(self.calc_profit(position['type'], position['symbol'], volume, position['price_open'], price),
+                       2)
+        self.balance += profit
+        deal = next(self.tickets)
+        self.deals.append(TradeDeal(ticket=deal, order=deal, time=time, time_msc=time * 1000,
+                                    type=1 - position['type'], entry=ENTRY_OUT, position_id=position['ticket'],
+                                    reason=reason, volume=volume, price=price, profit=profit, sl=position['sl'],
+                                    tp=position['tp'], symbol=position['symbol'], comment=position['comment']))
+        self.trades.append({'ticket': position['ticket'], 'symbol': position['symbol'], 'type': position['type'],
+                            'volume': volume, 'time_open': position['time'], 'price_open': position['price_open'],
+                            'time_close': time, 'price_close': price, 'sl': position['sl'], 'tp': position['tp'],
+                            'profit': profit, 'reason': reason, 'comment': position['comment']})
+        position['volume'] = round(position['volume'] - volume, 8)
+        if position['volume'] <= 0:
+            self.positions.pop(position['ticket'])
+        return deal
+
+    @property
+    def profit(self) -> float:
+        return sum(position['profit'] for position in self.positions.values())
+
+    @property
+    def equity(self) -> float:
+        return self.balance + self.profit
+
+    @property
+    def margin(self) -> float:
+        return sum(self.calc_margin(position['symbol'], position['volume'], position['price_open'])
+                   for position in self.positions.values())
+
+    # order validation and execution
+    def validate(self, request: dict) -> tuple[int, dict]:
+        """Check a trade request against the account and the symbol.
+
+        Returns:
+            tuple[int, dict]: The return code, 0 if the request can be executed, and the values needed to execute it
+        """
+        action = int(request.get('action', DEAL))
+        ticket = int(request.get('position', 0) or 0)
+        position = self.positions.get(ticket) if ticket else None
+        # like the terminal, requests on a position can leave out the symbol
+        symbol = str(request.get('symbol', '') or (position['symbol'] if position is not None else ''))
+        if ticket and (position is None or position['symbol'] != symbol):
+            return 10036, {}
+        if symbol not in self.specs or action not in (DEAL, SLTP):
+            return 10013, {}
+        spec = self.specs[symbol]
+        bid, ask, _ = self.quote(symbol)
+
+        if action == SLTP:
+            if position is None:
+                return 10013, {}
+            sl, tp = float(request.get('sl', 0) or 0), float(request.get('tp', 0) or 0)
+            if isclose(sl, position['sl']) and isclose(tp, position['tp']):
+                return 10025, {}
+            return (CHECKED if self.valid_stops(position['type'], sl=sl, tp=tp, bid=bid, ask=ask, spec=spec)
+                    else 10016), {'position': position, 'sl': sl, 'tp': tp}
+
+        volume = float(request.get('volume', 0) or 0)
+        step = spec['volume_step']
+        if not spec['volume_min'] <= volume <= spec['volume_max'] or not isclose(volume / step, round(volume / step)):
+            return 10014, {}
+        if position is not None:
+            if int(request.get('type', 0)) == position['type']:
+                return 10013, {}
+            if volume > position['volume'] + 1e-9:
+                return 10014, {}
+            return CHECKED, {'position': position, 'volume': volume,
+                             'price': bid if position['type'] == BUY else ask}
+
+        order_type = int(request.get('type', 0))
+        if order_type not in (BUY, SELL):
+            return 10013, {}
+        sl, tp = float(request.get('sl', 0) or 0), float(request.get('tp', 0) or 0)
+        if not self.valid_stops(order_type, sl=sl, tp=tp, bid=bid, ask=ask, spec=spec):
+            return 10016, {}
+        price = ask if order_type == BUY else bid
+        margin = self.calc_margin(symbol, volume, price)
+        if margin > self.equity - self.margin:
+            return 10019, {}
+        return CHECKED, {'type': order_type, 'volume': volume, 'price': price, 'sl': sl, 'tp': tp, 'margin': margin}
+
+    @staticmethod
+    def valid_stops(order_type: int, *, sl: float, tp: float, bid: float, ask: float, spec: dict) -> bool:
+        level = spec['trade_stops_level'] * spec['point']
+        if order_type == BUY:
+            return (not sl or sl < bid - level) and (not tp or tp > bid + level)
+        return (not sl or sl > ask + level) and (not tp or tp < ask - level)
+
+    @staticmethod
+    def trade_request(request: dict) -> TradeRequest:
+        return TradeRequest(**{key: value for key, value in request.items() if key in TradeRequest._fields})
+
+    def order_check(self, request: dict) -> OrderCheckResult:
+        self.sync()
+        retcode, values = self.validate(request)
+        margin = values.get('margin', 0)
+        equity = self.equity
+        return OrderCheckResult(retcode=retcode, balance=self.balance, equity=equity, profit=self.profit,
+                                margin=self.margin + margin, margin_free=equity - self.margin - margin,
+                                margin_level=equity / (self.margin + margin) * 100 if self.margin + margin else 0,
+                                comment='Done' if retcode == CHECKED else RETCODES[retcode],
+                                request=self.trade_request(request))
+
+    def order_send(self, request: dict) -> OrderSendResult:
+        self.sync()
+        retcode, values = self.validate(request)
+        symbol = str(request.get('symbol', '') or values.get('position', {}).get('symbol', ''))
+        bid, ask, _ = self.quote(symbol) if symbol in self.specs else (0, 0, 0)
+        result = {'bid': bid, 'ask': ask, 'request': self.trade_request(request)}
+        if retcode != CHECKED:
+            self.error = (retcode, RETCODES[retcode])
+            return OrderSendResult(retcode=retcode, comment=RETCODES[retcode], **result)
+
+        now = int(self.clock())
+        position = values.get('position')
+        if int(request.get('action', DEAL)) == SLTP:
+            position.update(sl=values['sl'], tp=values['tp'], time_update=now, time_update_msc=now * 1000)
+            return OrderSendResult(retcode=DONE, order=position['ticket'], comment=RETCODES[DONE], **result)
+
+        if position is not None:
+            deal = self.close(position, price=values['price'], volume=values['volume'], time=now)
+            return OrderSendResult(retcode=DONE, deal=deal, order=deal, volume=values['volume'],
+                                   price=values['price'], comment=RETCODES[DONE], **result)
+
+        ticket, deal = next(self.tickets), next(self.tickets)
+        comment = str(request.get('comment', ''))
+        position = {'ticket': ticket, 'time': now, 'time_msc': now * 1000, 'time_update': now,
+                    'time_update_msc': now * 1000, 'type': values['type'], 'magic': int(request.get('magic', 0)),
+                    'identifier': ticket, 'reason': REASON_EXPERT, 'volume': values['volume'],
+                    'price_open': values['price'], 'sl': values['sl'], 'tp': values['tp'],
+                    'price_current': values['price'], 'swap': 0.0, 'profit': 0.0, 'symbol': symbol,
+                    'comment': comment, 'external_id': ''}
+        self.mark(position, bid=bid, ask=ask)
+        self.positions[ticket] = position
+        self.deals.append(TradeDeal(ticket=deal, order=ticket, time=now, time_msc=now * 1000, type=values['type'],
+                                    entry=ENTRY_IN, position_id=ticket, volume=values['volume'],
+                                    price=values['price'], sl=values['sl'], tp=values['tp'], symbol=symbol,
+                                    comment=comment))
+        return OrderSendResult(retcode=DONE, deal=deal, order=ticket, volume=values['volume'],
+                               price=values['price'], comment=RETCODES[DONE], **result)
+
+    # terminal functions
+    def initialize(self, *args, **kwargs) -> bool:
+        return True
+
+    def login(self, *args, **kwargs) -> bool:
+        return True
+
+    def shutdown(self):
+        return None
+
+    def last_error(self) -> tuple[int, str]:
+        return self.error
+
+    def version(self) -> tuple[int, int, str]:
+        return 500, 4000, 'Backtest'
+
+    def account_info(self) -> AccountInfo:
+        self.sync()
+        margin, equity = self.margin, self.equity
+        return AccountInfo(balance=round(self.balance, 2), equity=round(equity, 2), profit=round(self.profit, 2),
+                           margin=round(margin, 2), margin_free=round(equity - margin, 2),
+                           margin_level=equity / margin * 100 if margin else 0, leverage=self.leverage,
+                           currency=self.currency)
+
+    def symbols_total(self) -> int:
+        return len(self.specs)
+
+    def symbols_get(self, group: str = '') -> tuple[SymbolInfo, ...]:
+        return tuple(self.symbol_info(symbol) for symbol in self.specs)
+
+    def symbol_info(self, symbol: str) -> SymbolInfo | None:
+        if symbol not in self.specs:
+            self.error = (-1, f'Unknown symbol {symbol}')
+            return None
+        bid, ask, time = self.quote(symbol)
+        spec = self.specs[symbol]
+        spread = round((ask - bid) / spec['point'])
+        return SymbolInfo(**spec | {'bid': bid, 'ask': ask, 'time': time, 'spread': spread})
+
+    def symbol_info_tick(self, symbol: str) -> Tick | None:
+        if symbol not in self.specs:
+            self.error = (-1, f'Unknown symbol {symbol}')
+            return None
+        bid, ask, _ = self.quote(symbol)
+        now = self.clock()
+        return Tick(time=int(now), bid=bid, ask=ask, time_msc=int(now * 1000))
+
+    def symbol_select(self, symbol: str, enable: bool = True) -> bool:
+        return symbol in self.specs
+
+    def market_book_add(self, symbol: str) -> bool:
+        return symbol in self.specs
+
+    def market_book_release(self, symbol: str) -> bool:
+        return symbol in self.specs
+
+    def copy_rates_from_pos(self, symbol: str, timeframe: TimeFrame, start_pos: int, count: int) -> np.ndarray | None:
+        if symbol not in self.specs:
+            self.error = (-1, f'Unknown symbol {symbol}')
+            return None
+        return self.history.copy_rates_from_pos(symbol=symbol, timeframe=TimeFrame(timeframe), start_pos=start_pos,
+                                                count=count, now=self.clock())
+
+    def positions_total(self) -> int:
+        self.sync()
+        return len(self.positions)
+
+    def positions_get(self, group: str = '', ticket: int = 0, symbol: str = '') -> tuple[TradePosition, ...]:
+        self.sync()
+        return tuple(TradePosition(**position) for position in self.positions.values()
+                     if (not ticket or position['ticket'] == ticket) and (not symbol or position['symbol'] == symbol))
+
+    def orders_total(self) -> int:
+        return 0
+
+    def orders_get(self, group: str = '', ticket: int = 0, symbol: str = '') -> tuple:
+        return ()
+
+    def order_calc_profit(self, action: int, symbol: str, volume: float, price_open: float,
+                          price_close: float) -> float:
+        return round(self.calc_profit(action, symbol, volume, price_open, price_close), 2)
+
+    def order_calc_margin(self, action: int, symbol: str, volume: float, price: float) -> float:
+        return round(self.calc_margin(symbol, volume, price), 2)
+
+    def history_deals_total(self, date_from: float, date_to: float) -> int:
+        return len(self.history_deals_get(date_from, date_to))
+
+    def history_deals_get(self, date_from: float = None, date_to: float = None, group: str = '', ticket: int = 0,
+                          position: int = 0) -> tuple[TradeDeal, ...]:
+        date_from = date_from.timestamp() if hasattr(date_from, 'timestamp') else date_from or 0
+        date_to = date_to.timestamp() if hasattr(date_to, 'timestamp') else date_to or float('inf')
+        return tuple(deal for deal in self.deals if date_from <= deal.time <= date_to
+                     and (not ticket or deal.ticket == ticket) and (not position or deal.position_id == position))
+
+    # results
+    def summary(self) -> dict:
+        """Performance of the closed trades."""
+        profits = np.array([trade['profit'] for trade in self.trades])
+        wins, losses = profits[profits > 0], profits[profits < 0]
+        curve = np.array([equity for _, equity in self.equity_curve] or [self.equity])
+        drawdown = float((np.maximum.accumulate(curve) - curve).max())
+        return {'trades': len(profits), 'wins': len(wins), 'losses': len(losses),
+                'win_rate': len(wins) / len(profits) if len(profits) else 0, 'net_profit': round(profits.sum(), 2),
+                'profit_factor': wins.sum() / -losses.sum() if len(losses) else float('inf') if len(wins) else 0,
+                'max_drawdown': round(drawdown, 2), 'balance': round(self.balance, 2),
+                'equity': round(self.equity, 2), 'open_positions': len(self.positions)}
@@ -0,0 +1,158 @@
+import asyncio
+from contextlib import contextmanager
+from importlib import import_module
+from logging import getLogger
+from typing import Callable, Sequence
+
+from aiomql import Config, MetaTrader, Strategy
+
+from ..closers.trader_monitor import monitor
+from ..utils.account_state import account_state
+from ..utils.exposure import exposure_index
+from ..utils.bar_scheduler import bar_scheduler
+from ..utils.candle_cache import candle_cache
+from ..utils.indicators import indicator_engine
+from ..utils.symbol_registry import symbol_registry
+from .broker import SimBroker
+from .history import History
+
+logger = getLogger(__name__)
+
+TERMINAL = ('initialize', 'login', 'shutdown', 'last_error', 'version', 'account_info', 'symbols_total',
+            'symbols_get', 'symbol_info', 'symbol_info_tick', 'symbol_select', 'market_book_add',
+            'market_book_release', 'copy_rates_from_pos', 'positions_total', 'positions_get', 'orders_total',
+            'orders_get', 'order_calc_profit', 'order_calc_margin', 'order_check', 'order_send',
+            'history_deals_total', 'history_deals_get')
+MISSING = object()
+
+
+class VirtualClock:
+    """Simulated time in seconds. Calling the clock returns the current simulated time."""
+    def __init__(self, *, now: float = 0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class SimLoop(asyncio.SelectorEventLoop):
+    """An event loop running on a virtual clock.
+
+    Whenever there is nothing ready to run the clock jumps to the next scheduled callback, so sleeping costs nothing
+    and a strategy that sleeps for an hour wakes up immediately with the clock an hour ahead. An optional skip
+    function can move the clock further, past periods in which nothing can happen.
+
+    Attributes:
+        clock (VirtualClock): The simulated time.
+        skip (Callable): Maps the time the clock would jump to onto the time it should jump to.
+    """
+    def __init__(self, *, clock: VirtualClock, skip: Callable[[float], float] = None):
+        super().__init__()
+        self.clock = clock
+        self.skip = skip
+        # unix times are too large for callbacks due now to be told apart from the nanosecond default
+        self._clock_resolution = 1e-3
+
+    def time(self) -> float:
+        return self.clock.now
+
+    def _run_once(self):
+        if not self._ready and self._scheduled:
+            when = self._scheduled[0]._when
+            if when > self.clock.now:
+                self.clock.now = self.skip(when) if self.skip else when
+        super()._run_once()
+
+
+async def run_inline(func, /, *args, **kwargs):
+    """Stand in for asyncio.to_thread that calls the function on the event loop."""
+    return func(*args, **kwargs)
+
+
+class Backtest:
+    """Replay stored history through unmodified strategies, their traders and the order closers.
+
+    Every call aiomql makes to the terminal is answered by a SimBroker at the simulated time, and the strategies, the
+    trade monitor and the closers it drives run on a SimLoop. The module level clocks used for sleeping until the next
+    bar, the bar scheduler, the candle cache and the symbol registry are pointed at the simulated time for the
+    duration of the run. Trade records and telegram confirmations are left to the live bots. Sessions other than the
+    default all day session are not simulated, since sessions are checked against the wall clock.
+
+    Prices change only when a base bar opens, so the monitor by default tracks orders once per base bar.
+
+    Attributes:
+        history (History): The stored bars.
+        strategies (Sequence[Strategy]): Strategies to run, with symbols that are in the history.
+        start (float): Simulated start time. The bars before it serve as look back for the strategies.
+        end (float): Simulated end time.
+        broker (SimBroker): The simulated account.
+        clock (VirtualClock): The simulated time.
+        monitor (bool): Run the trade monitor and with it the closers.
+        monitor_interval (int): Seconds between monitor cycles.
+    """
+    def __init__(self, *, history: History, strategies: Sequence[Strategy], start: float = None, end: float = None,
+                 balance: float = 10000, leverage: int = 100, specs: dict[str, dict] = None, monitor: bool = True,
+                 monitor_interval: int = None):
+        self.history = history
+        self.strategies = strategies
+        self.start = start or history.start
+        self.end = end or history.end
+        self.clock = VirtualClock(now=self.start)
+        self.broker = SimBroker(history=history, clock=self.clock, specs=specs, balance=balance, leverage=leverage)
+        self.monitor = monitor
+        self.monitor_interval = monitor_interval or history.timeframe.time
+
+    def run(self) -> dict:
+        """Run the backtest to the end time.
+
+        Returns:
+            dict: Summary of the closed trades. Details are kept on the broker.
+        """
+        loop = SimLoop(clock=self.clock, skip=self.history.active)
+        try:
+            with self.patched():
+                loop.run_until_complete(self.main())
+        finally:
+            loop.close()
+        return self.broker.summary()
+
+    async def main(self):
+        await asyncio.gather(*(strategy.symbol.init() for strategy in self.strategies))
+        tasks = [asyncio.create_task(strategy.trade()) for strategy in self.strategies]
+        if self.monitor:
+            tasks.append(asyncio.create_task(monitor(tf=self.monitor_interval, event_driven=False)))
+        await asyncio.sleep(self.end - self.clock())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self.broker.sync()
+
+    @contextmanager
+    def patched(self):
+        """Point the terminal functions and the clocks used by the bots at the simulation, restoring them on exit."""
+        config = Config()
+        patches = [(MetaTrader, f"_{name}", getattr(self.broker, name)) for name in TERMINAL]
+        patches += [(asyncio, 'to_thread', run_inline), (import_module('aiomql.strategy'), 'time', self.clock),
+                    (import_module('..utils.sleep', __package__), 'time', self.clock),
+                    (import_module('..closers.trader_monitor', __package__), 'time', self.clock),
+                    (candle_cache, 'clock', self.clock), (symbol_registry, 'clock', self.clock),
+                    (account_state, 'clock', self.clock), (account_state, 'refreshed', 0),
+                    (exposure_index, 'clock', self.clock),
+                    (bar_scheduler, 'clock', self.clock), (bar_scheduler, 'offset', 0.0),
+                    (bar_scheduler, 'synced', False), (bar_scheduler, 'pending', {}),
+                    (symbol_registry, 'symbols', {}), (symbol_registry, 'refreshed', {}),
+                    (config, 'record_trades', False), (config, 'state', config.state | {'tracked_orders': {}})]
+        originals = [(target, name, vars(target).get(name, MISSING)) for target, name, _ in patches]
+        try:
+            for target, name, value in patches:
+                setattr(target, name, value)
+            candle_cache.invalidate()
+            indicator_engine.states.clear()
+            exposure_index.clear()
+            yield
+        finally:
+            for target, name, value in originals:
+                setattr(target, name, value) if value is not MISSING else delattr(target, name)
+            candle_cache.invalidate()
+            indicator_engine.states.clear()
+            exposure_index.clear()
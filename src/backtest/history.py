@@ -0,0 +1,188 @@
+from logging import getLogger
+from typing import Sequence
+
+import numpy as np
+import pandas as pd
+from aiomql import TimeFrame
+
+from ..utils.resample import Resampled, resample, nests
+
+logger = getLogger(__name__)
+
+RATES = np.dtype([('time', '<i8'), ('open', '<f8'), ('high', '<f8'), ('low', '<f8'), ('close', '<f8'),
+                  ('tick_volume', '<u8'), ('spread', '<i4'), ('real_volume', '<u8')])
+
+
+class History:
+    """Stored bars of one base timeframe for a set of symbols, served as the terminal would have at a given time.
+
+    The bars of any higher timeframe are resampled from the base bars. A request made at a given time gets the
+    bars that had opened by then. The base bar that is still forming at that time contributes only its open price,
+    so a strategy never sees the high, low or close of a bar before it closes.
+
+    Attributes:
+        timeframe (TimeFrame): Timeframe of the stored bars.
+        rates (dict[str, np.ndarray]): Base bars by symbol in the rates format of the terminal.
+    """
+    timeframe: TimeFrame
+    rates: dict[str, np.ndarray]
+
+    def __init__(self, *, timeframe: TimeFrame = TimeFrame.M5):
+        self.timeframe = timeframe
+        self.rates = {}
+        self.resampled: dict[tuple[str, TimeFrame], Resampled] = {}
+        self.timeline = np.empty(0, dtype=np.int64)
+
+    @classmethod
+    def from_csv(cls, *, files: dict[str, str], timeframe: TimeFrame = TimeFrame.M5) -> 'History':
+        """Load bars from csv files with a time column and open, high, low and close columns. Times can be unix
+        timestamps or dates.
+
+        Args:
+            files (dict[str, str]): Paths of the csv files by symbol name
+            timeframe (TimeFrame): Timeframe of the stored bars
+        """
+        history = cls(timeframe=timeframe)
+        for symbol, file in files.items():
+            history.add(symbol=symbol, rates=pd.read_csv(file))
+        return history
+
+    @classmethod
+    def synthetic(cls, *, symbols: Sequence[str], start: float, end: float, timeframe: TimeFrame = TimeFrame.M5,
+                  price: float = 1000, volatility: float = 0.001, spread: int = 10, seed: int = None) -> 'History':
+        """Generate bars for a set of symbols from independent geometric random walks. Each bar opens at the close
+        of the one before it and takes four steps of the walk.
+
+        Args:
+            symbols (Sequence[str]): Names of the symbols
+            start (float): Time of the first bar, rounded down to the timeframe
+            end (float): Time by which the last bar has opened
+            timeframe (TimeFrame): Timeframe of the bars
+            price (float): Opening price of every symbol
+            volatility (float): Standard deviation of the log returns of a bar
+            spread (int): Spread of every bar in points
+            seed (int): Seed of the random generator, for repeatable bars
+        """
+        history = cls(timeframe=timeframe)
+        rng = np.random.default_rng(seed)
+        step = timeframe.time
+        times = np.arange(int(start) - int(start) % step, int(end), step, dtype=np.int64)
+        for symbol in symbols:
+            walk = price * np.exp(np.cumsum(rng.normal(0, volatility / 2, len(times) * 4))).reshape(-1, 4)
+            rates = np.zeros(len(times), dtype=RATES)
+            rates['time'] = times
+            rates['open'] = np.r_[price, walk[:-1, -1]][:len(times)]
+            rates['high'] = np.maximum(walk.max(axis=1), rates['open'])
+            rates['low'] = np.minimum(walk.min(axis=1), rates['open'])
+            rates['close'] = walk[:, -1]
+            rates['tick_volume'] = rng.integers(50, 500, len(times))
+            rates['spread'] = spread
+            history.add(symbol=symbol, rates=rates)
+        return history
+
+    def add(self, *, symbol: str, rates: np.ndarray | pd.DataFrame):
+        """Add the base bars of a symbol.
+
+        Args:
+            symbol (str): Name of the symbol
+            rates (np.ndarray | pd.DataFrame): Bars with at least time, open, high, low and close fields
+        """
+        frame = pd.DataFrame(rates)
+        if not pd.api.types.is_numeric_dtype(frame['time']):
+            frame['time'] = pd.to_datetime(frame['time'], utc=True).astype('int64') // 10 ** 9
+        frame = frame.sort_values('time').drop_duplicates('time', keep='last')
+        data = np.zeros(len(frame), dtype=RATES)
+        for name in RATES.names:
+            if name in frame:
+                data[name] = frame[name].to_numpy()
+        self.rates[symbol] = data
+        self.resampled = {key: value for key, value in self.resampled.items() if key[0] != symbol}
+        self.timeline = np.unique(np.concatenate([rates['time'] for rates in self.rates.values()]))
+
+    @property
+    def start(self) -> int:
+        return int(self.timeline[0]) if len(self.timeline) else 0
+
+    @property
+    def end(self) -> int:
+        return int(self.timeline[-1]) + self.timeframe.time if len(self.timeline) else 0
+
+    def active(self, now: float) -> float:
+        """The earliest time at or after now that falls within a base bar of any symbol. Used to skip over the
+        periods when the market is closed."""
+        i = int(np.searchsorted(self.timeline, now, side='right')) - 1
+        if i >= 0 and now < self.timeline[i] + self.timeframe.time:
+            return now
+        return max(now, float(self.timeline[i + 1])) if i + 1 < len(self.timeline) else now
+
+    def position(self, *, symbol: str, now: float) -> tuple[int, bool]:
+        """Number of base bars of a symbol opened by now and whether the last of them is still forming."""
+        times = self.rates[symbol]['time']
+        opened = int(np.searchsorted(times, now, side='right'))
+        return opened, opened > 0 and now < times[opened - 1] + self.timeframe.time
+
+    def closed(self, *, symbol: str, now: float) -> int:
+        """Number of base bars of a symbol that have closed by now."""
+        opened, forming = self.position(symbol=symbol, now=now)
+        return opened - forming
+
+    def price(self, *, symbol: str, now: float) -> tuple[float, int, int]:
+        """The last price of a symbol at a given time. That is the open of the forming base bar or the close of the
+        last base bar if none is forming.
+
+        Returns:
+            tuple[float, int, int]: The price, the spread in points and the time of the bar the price comes from
+        """
+        opened, forming = self.position(symbol=symbol, now=now)
+        if opened == 0:
+            raise ValueError(f"No bars for {symbol} at {now}")
+        bar = self.rates[symbol][opened - 1]
+        return float(bar['open'] if forming else bar['close']), int(bar['spread']), int(bar['time'])
+
+    def copy_rates_from_pos(self, *, symbol: str, timeframe: TimeFrame, start_pos: int, count: int,
+                            now: float) -> np.ndarray:
+        """Bars of a symbol as the terminal would have returned them at a given time.
+
+        Args:
+            symbol (str): Name of the symbol
+            timeframe (TimeFrame): Timeframe of the bars, equal to or a multiple of the base timeframe
+            start_pos (int): Index of the first bar to return counting back from the current bar
+            count (int): Number of bars to return
+            now (float): The time of the request
+
+        Returns:
+            np.ndarray: The bars in chronological order
+        """
+        base = self.rates[symbol]
+        opened, forming = self.position(symbol=symbol, now=now)
+        size = start_pos + count
+        if opened == 0 or size <= 0:
+            return np.empty(0, dtype=RATES)
+
+        if timeframe == self.timeframe:
+            rates = base[max(0, opened - size): opened].copy()
+            if forming:
+                self.open_only(rates[-1:])
+            return rates[:len(rates) - start_pos]
+
+        if not nests(self.timeframe, timeframe):
+            raise ValueError(f"Cannot build {timeframe} bars from {self.timeframe} bars")
+
+        key = (symbol, timeframe)
+        if (resampled := self.resampled.get(key)) is None:
+            resampled = self.resampled[key] = Resampled(base=base, timeframe=timeframe)
+        group = int(resampled.groups[opened - 1])
+        first = int(resampled.starts[group])
+        rows = base[first: opened].copy()
+        if forming:
+            self.open_only(rows[-1:])
+        current = resample(rows, timeframe)
+        rates = np.concatenate([resampled.rates[max(0, group - size + 1): group], current])
+        return rates[:len(rates) - start_pos]
+
+    @staticmethod
+    def open_only(rates: np.ndarray):
+        """Reduce forming bars to what is known when they open."""
+        rates['high'] = rates['low'] = rates['close'] = rates['open']
+        rates['tick_volume'] = 1
+        rates['real_volume'] = 0
@@ -0,0 +1,192 @@
+"""A stand-in for the MetaTrader5 package.
+
+The module defines the constants and structures of the MetaTrader5 package and a stub for every terminal function
+aiomql binds, so aiomql and this project can be imported where the package is not available. The stubs behave like a
+terminal that is not running. Terminal calls are answered once a FakeTerminal or a Backtest is installed, both of
+which replace the functions bound to aiomql's MetaTrader class. Load the module under the name MetaTrader5 before
+aiomql is imported, as `scripts/fake_terminal.py` does. The module only depends on the standard library so it can be
+loaded from its path without importing the rest of the project.
+
+The terminal returns named structure sequences, which aiomql converts with `_asdict()` and, for the request attached
+to an order result, by passing the whole sequence to the MetaTrader5 type. The records below behave the same way: they
+can be built from keyword arguments or from a single sequence of values in field order.
+"""
+from collections import namedtuple
+
+
+def record(name: str, fields: dict) -> type:
+    """Create a named tuple type with defaults that can also be constructed from a single sequence of values.
+
+    Args:
+        name (str): Name of the type
+        fields (dict): Field names and default values in field order
+
+    Returns:
+        type: The record type
+    """
+    base = namedtuple(name, fields.keys(), defaults=fields.values())
+
+    def __new__(cls, *args, **kwargs):
+        if len(args) == 1 and not kwargs and isinstance(args[0], (tuple, list)):
+            args = args[0]
+        return base.__new__(cls, *args, **kwargs)
+
+    return type(name, (base,), {'__new__': __new__, '__slots__': ()})
+
+
+SymbolInfo = record('SymbolInfo', {
+    'name': '', 'description': '', 'path': '', 'select': True, 'visible': True, 'time': 0, 'digits': 5,
+    'spread': 0, 'spread_float': True, 'trade_mode': 4, 'trade_stops_level': 0, 'trade_freeze_level': 0,
+    'swap_rollover3days': 3, 'filling_mode': 1, 'bid': 0.0, 'ask': 0.0, 'point': 0.00001, 'trade_tick_value': 1.0,
+    'trade_tick_size': 0.00001, 'trade_contract_size': 100000.0, 'volume_min': 0.01, 'volume_max': 100.0,
+    'volume_step': 0.01, 'currency_base': 'USD', 'currency_profit': 'USD', 'currency_margin': 'USD'})
+
+Tick = record('Tick', {'time': 0, 'bid': 0.0, 'ask': 0.0, 'last': 0.0, 'volume': 0, 'time_msc': 0, 'flags': 6,
+                       'volume_real': 0.0})
+
+AccountInfo = record('AccountInfo', {
+    'login': 0, 'trade_mode': 0, 'leverage': 100, 'limit_orders': 0, 'margin_so_mode': 0, 'trade_allowed': True,
+    'trade_expert': True, 'margin_mode': 2, 'currency_digits': 2, 'fifo_close': False, 'balance': 0.0,
+    'credit': 0.0, 'profit': 0.0, 'equity': 0.0, 'margin': 0.0, 'margin_free': 0.0, 'margin_level': 0.0,
+    'margin_so_call': 50.0, 'margin_so_so': 30.0, 'margin_initial': 0.0, 'margin_maintenance': 0.0, 'assets': 0.0,
+    'liabilities': 0.0, 'commission_blocked': 0.0, 'name': 'Backtest', 'server': 'Backtest', 'currency': 'USD',
+    'company': 'Backtest'})
+
+TradePosition = record('TradePosition', {
+    'ticket': 0, 'time': 0, 'time_msc': 0, 'time_update': 0, 'time_update_msc': 0, 'type': 0, 'magic': 0,
+    'identifier': 0, 'reason': 3, 'volume': 0.0, 'price_open': 0.0, 'sl': 0.0, 'tp': 0.0, 'price_current': 0.0,
+    'swap': 0.0, 'profit': 0.0, 'symbol': '', 'comment': '', 'external_id': ''})
+
+TradeDeal = record('TradeDeal', {
+    'ticket': 0, 'order': 0, 'time': 0, 'time_msc': 0, 'type': 0, 'entry': 0, 'magic': 0, 'position_id': 0,
+    'reason': 3, 'volume': 0.0, 'price': 0.0, 'commission': 0.0, 'swap': 0.0, 'profit': 0.0, 'fee': 0.0, 'sl': 0.0,
+    'tp': 0.0, 'symbol': '', 'comment': '', 'external_id': ''})
+
+TradeRequest = record('TradeRequest', {
+    'action': 1, 'magic': 0, 'order': 0, 'symbol': '', 'volume': 0.0, 'price': 0.0, 'stoplimit': 0.0, 'sl': 0.0,
+    'tp': 0.0, 'deviation': 0, 'type': 0, 'type_filling': 0, 'type_time': 0, 'expiration': 0, 'comment': '',
+    'position': 0, 'position_by': 0})
+
+OrderSendResult = record('OrderSendResult', {
+    'retcode': 0, 'deal': 0, 'order': 0, 'volume': 0.0, 'price': 0.0, 'bid': 0.0, 'ask': 0.0, 'comment': '',
+    'request_id': 0, 'retcode_external': 0, 'request': TradeRequest()})
+
+OrderCheckResult = record('OrderCheckResult', {
+    'retcode': 0, 'balance': 0.0, 'equity': 0.0, 'profit': 0.0, 'margin': 0.0, 'margin_free': 0.0,
+    'margin_level': 0.0, 'comment': '', 'request': TradeRequest()})
+
+BookInfo = record('BookInfo', {'type': 1, 'price': 0.0, 'volume': 0, 'volume_dbl': 0.0})
+
+TerminalInfo = record('TerminalInfo', {
+    'community_account': False, 'community_connection': False, 'connected': True, 'dlls_allowed': False,
+    'trade_allowed': True, 'tradeapi_disabled': False, 'email_enabled': False, 'ftp_enabled': False,
+    'notifications_enabled': False, 'mqid': False, 'build': 4000, 'maxbars': 100000, 'codepage': 0,
+    'ping_last': 0, 'community_balance': 0.0, 'retransmission': 0.0, 'company': 'Backtest', 'name': 'Backtest',
+    'language': 'English', 'path': '', 'data_path': '', 'commondata_path': ''})
+
+TradeOrder = record('TradeOrder', {
+    'ticket': 0, 'time_setup': 0, 'time_setup_msc': 0, 'time_done': 0, 'time_done_msc': 0, 'time_expiration': 0,
+    'type': 0, 'type_time': 0, 'type_filling': 0, 'state': 0, 'magic': 0, 'position_id': 0, 'position_by_id': 0,
+    'reason': 3, 'volume_initial': 0.0, 'volume_current': 0.0, 'price_open': 0.0, 'sl': 0.0, 'tp': 0.0,
+    'price_current': 0.0, 'price_stoplimit': 0.0, 'symbol': '', 'comment': '', 'external_id': ''})
+
+TIMEFRAME_M1, TIMEFRAME_M2, TIMEFRAME_M3, TIMEFRAME_M4, TIMEFRAME_M5, TIMEFRAME_M6 = 1, 2, 3, 4, 5, 6
+TIMEFRAME_M10, TIMEFRAME_M12, TIMEFRAME_M15, TIMEFRAME_M20, TIMEFRAME_M30 = 10, 12, 15, 20, 30
+TIMEFRAME_H1, TIMEFRAME_H2, TIMEFRAME_H3, TIMEFRAME_H4, TIMEFRAME_H6 = 16385, 16386, 16387, 16388, 16390
+TIMEFRAME_H8, TIMEFRAME_H12, TIMEFRAME_D1, TIMEFRAME_W1, TIMEFRAME_MN1 = 16392, 16396, 16408, 32769, 49153
+
+ORDER_TYPE_BUY, ORDER_TYPE_SELL, ORDER_TYPE_BUY_LIMIT, ORDER_TYPE_SELL_LIMIT = 0, 1, 2, 3
+ORDER_TYPE_BUY_STOP, ORDER_TYPE_SELL_STOP, ORDER_TYPE_BUY_STOP_LIMIT, ORDER_TYPE_SELL_STOP_LIMIT = 4, 5, 6, 7
+ORDER_TYPE_CLOSE_BY = 8
+ORDER_FILLING_FOK, ORDER_FILLING_IOC, ORDER_FILLING_RETURN = 0, 1, 2
+ORDER_TIME_GTC, ORDER_TIME_DAY, ORDER_TIME_SPECIFIED, ORDER_TIME_SPECIFIED_DAY = 0, 1, 2, 3
+ORDER_REASON_CLIENT, ORDER_REASON_MOBILE, ORDER_REASON_WEB, ORDER_REASON_EXPERT = 0, 1, 2, 3
+ORDER_REASON_SL, ORDER_REASON_TP, ORDER_REASON_SO = 4, 5, 6
+
+TRADE_ACTION_DEAL, TRADE_ACTION_PENDING, TRADE_ACTION_SLTP, TRADE_ACTION_MODIFY = 1, 5, 6, 7
+TRADE_ACTION_REMOVE, TRADE_ACTION_CLOSE_BY = 8, 10
+
+POSITION_TYPE_BUY, POSITION_TYPE_SELL = 0, 1
+POSITION_REASON_CLIENT, POSITION_REASON_MOBILE, POSITION_REASON_WEB, POSITION_REASON_EXPERT = 0, 1, 2, 3
+
+DEAL_TYPE_BUY, DEAL_TYPE_SELL, DEAL_TYPE_BALANCE, DEAL_TYPE_CREDIT, DEAL_TYPE_CHARGE = 0, 1, 2, 3, 4
+DEAL_TYPE_CORRECTION, DEAL_TYPE_BONUS, DEAL_TYPE_COMMISSION, DEAL_TYPE_COMMISSION_DAILY = 5, 6, 7, 8
+DEAL_TYPE_COMMISSION_MONTHLY, DEAL_TYPE_COMMISSION_AGENT_DAILY, DEAL_TYPE_COMMISSION_AGENT_MONTHLY = 9, 10, 11
+DEAL_TYPE_INTEREST, DEAL_TYPE_BUY_CANCELED, DEAL_TYPE_SELL_CANCELED, DEAL_DIVIDEND = 12, 13, 14, 15
+DEAL_DIVIDEND_FRANKED, DEAL_TAX = 16, 17
+DEAL_ENTRY_IN, DEAL_ENTRY_OUT, DEAL_ENTRY_INOUT, DEAL_ENTRY_OUT_BY = 0, 1, 2, 3
+DEAL_REASON_CLIENT, DEAL_REASON_MOBILE, DEAL_REASON_WEB, DEAL_REASON_EXPERT, DEAL_REASON_SL = 0, 1, 2, 3, 4
+DEAL_REASON_TP, DEAL_REASON_SO, DEAL_REASON_ROLLOVER, DEAL_REASON_VMARGIN, DEAL_REASON_SPLIT = 5, 6, 7, 8, 9
+
+ACCOUNT_TRADE_MODE_DEMO, ACCOUNT_TRADE_MODE_CONTEST, ACCOUNT_TRADE_MODE_REAL = 0, 1, 2
+ACCOUNT_STOPOUT_MODE_PERCENT, ACCOUNT_STOPOUT_MODE_MONEY = 0, 1
+ACCOUNT_MARGIN_MODE_RETAIL_NETTING, ACCOUNT_MARGIN_MODE_EXCHANGE, ACCOUNT_MARGIN_MODE_RETAIL_HEDGING = 0, 1, 2
+
+BOOK_TYPE_SELL, BOOK_TYPE_BUY, BOOK_TYPE_SELL_MARKET, BOOK_TYPE_BUY_MARKET = 1, 2, 3, 4
+COPY_TICKS_ALL, COPY_TICKS_INFO, COPY_TICKS_TRADE = -1, 1, 2
+TICK_FLAG_BID, TICK_FLAG_ASK, TICK_FLAG_LAST, TICK_FLAG_VOLUME, TICK_FLAG_BUY, TICK_FLAG_SELL = 2, 4, 8, 16, 32, 64
+DAY_OF_WEEK_SUNDAY, DAY_OF_WEEK_MONDAY, DAY_OF_WEEK_TUESDAY, DAY_OF_WEEK_WEDNESDAY = 0, 1, 2, 3
+DAY_OF_WEEK_THURSDAY, DAY_OF_WEEK_FRIDAY, DAY_OF_WEEK_SATURDAY = 4, 5, 6
+
+SYMBOL_CALC_MODE_FOREX, SYMBOL_CALC_MODE_FUTURES, SYMBOL_CALC_MODE_CFD, SYMBOL_CALC_MODE_CFDINDEX = 0, 1, 2, 3
+SYMBOL_CALC_MODE_CFDLEVERAGE, SYMBOL_CALC_MODE_FOREX_NO_LEVERAGE, SYMBOL_CALC_MODE_EXCH_STOCKS = 4, 5, 32
+SYMBOL_CALC_MODE_EXCH_FUTURES, SYMBOL_CALC_MODE_EXCH_OPTIONS, SYMBOL_CALC_MODE_EXCH_OPTIONS_MARGIN = 33, 34, 36
+SYMBOL_CALC_MODE_EXCH_BONDS, SYMBOL_CALC_MODE_EXCH_STOCKS_MOEX, SYMBOL_CALC_MODE_EXCH_BONDS_MOEX = 37, 38, 39
+SYMBOL_CALC_MODE_SERV_COLLATERAL = 64
+SYMBOL_CHART_MODE_BID, SYMBOL_CHART_MODE_LAST = 0, 1
+SYMBOL_OPTION_MODE_EUROPEAN, SYMBOL_OPTION_MODE_AMERICAN = 0, 1
+SYMBOL_OPTION_RIGHT_CALL, SYMBOL_OPTION_RIGHT_PUT = 0, 1
+SYMBOL_ORDERS_GTC, SYMBOL_ORDERS_DAILY, SYMBOL_ORDERS_DAILY_NO_STOPS = 0, 1, 2
+SYMBOL_SWAP_MODE_DISABLED, SYMBOL_SWAP_MODE_POINTS, SYMBOL_SWAP_MODE_CURRENCY_SYMBOL = 0, 1, 2
+SYMBOL_SWAP_MODE_CURRENCY_MARGIN, SYMBOL_SWAP_MODE_CURRENCY_DEPOSIT, SYMBOL_SWAP_MODE_INTEREST_CURRENT = 3, 4, 5
+SYMBOL_SWAP_MODE_INTEREST_OPEN, SYMBOL_SWAP_MODE_REOPEN_CURRENT, SYMBOL_SWAP_MODE_REOPEN_BID = 6, 7, 8
+SYMBOL_TRADE_EXECUTION_REQUEST, SYMBOL_TRADE_EXECUTION_INSTANT = 0, 1
+SYMBOL_TRADE_EXECUTION_MARKET, SYMBOL_TRADE_EXECUTION_EXCHANGE = 2, 3
+SYMBOL_TRADE_MODE_DISABLED, SYMBOL_TRADE_MODE_LONGONLY, SYMBOL_TRADE_MODE_SHORTONLY = 0, 1, 2
+SYMBOL_TRADE_MODE_CLOSEONLY, SYMBOL_TRADE_MODE_FULL = 3, 4
+
+TRADE_RETCODE_REQUOTE, TRADE_RETCODE_REJECT, TRADE_RETCODE_CANCEL, TRADE_RETCODE_PLACED = 10004, 10006, 10007, 10008
+TRADE_RETCODE_DONE, TRADE_RETCODE_DONE_PARTIAL, TRADE_RETCODE_ERROR, TRADE_RETCODE_TIMEOUT = 10009, 10010, 10011, 10012
+TRADE_RETCODE_INVALID, TRADE_RETCODE_INVALID_VOLUME, TRADE_RETCODE_INVALID_PRICE = 10013, 10014, 10015
+TRADE_RETCODE_INVALID_STOPS, TRADE_RETCODE_TRADE_DISABLED, TRADE_RETCODE_MARKET_CLOSED = 10016, 10017, 10018
+TRADE_RETCODE_NO_MONEY, TRADE_RETCODE_PRICE_CHANGED, TRADE_RETCODE_PRICE_OFF = 10019, 10020, 10021
+TRADE_RETCODE_INVALID_EXPIRATION, TRADE_RETCODE_ORDER_CHANGED, TRADE_RETCODE_TOO_MANY_REQUESTS = 10022, 10023, 10024
+TRADE_RETCODE_NO_CHANGES, TRADE_RETCODE_SERVER_DISABLES_AT, TRADE_RETCODE_CLIENT_DISABLES_AT = 10025, 10026, 10027
+TRADE_RETCODE_LOCKED, TRADE_RETCODE_FROZEN, TRADE_RETCODE_INVALID_FILL = 10028, 10029, 10030
+TRADE_RETCODE_CONNECTION = 10031
+TRADE_RETCODE_ONLY_REAL, TRADE_RETCODE_LIMIT_ORDERS, TRADE_RETCODE_LIMIT_VOLUME = 10032, 10033, 10034
+TRADE_RETCODE_INVALID_ORDER, TRADE_RETCODE_POSITION_CLOSED, TRADE_RETCODE_INVALID_CLOSE_VOLUME = 10035, 10036, 10038
+TRADE_RETCODE_CLOSE_ORDER_EXIST, TRADE_RETCODE_LIMIT_POSITIONS, TRADE_RETCODE_REJECT_CANCEL = 10039, 10040, 10041
+TRADE_RETCODE_LONG_ONLY, TRADE_RETCODE_SHORT_ONLY = 10042, 10043
+TRADE_RETCODE_CLOSE_ONLY, TRADE_RETCODE_FIFO_CLOSE = 10044, 10045
+
+RES_E_INTERNAL_FAIL_INIT = -10004
+
+
+class Disconnected:
+    """A terminal function answering the way the terminal does when it is not running. It is a callable object
+    rather than a function so it is not bound as a method when aiomql copies it onto the MetaTrader class.
+
+    Attributes:
+        name (str): Name of the terminal function.
+        result: Value returned on every call.
+    """
+    __slots__ = ('name', 'result')
+
+    def __init__(self, name: str, result=None):
+        self.name = name
+        self.result = result
+
+    def __call__(self, *args, **kwargs):
+        return self.result
+
+
+last_error = Disconnected('last_error', (RES_E_INTERNAL_FAIL_INIT, 'IPC initialize failed, MetaTrader 5 not found'))
+
+for _name in ('initialize', 'login', 'shutdown', 'version', 'account_info', 'terminal_info', 'symbols_total',
+              'symbols_get', 'symbol_info', 'symbol_info_tick', 'symbol_select', 'market_book_add', 'market_book_get',
+              'market_book_release', 'copy_rates_from', 'copy_rates_from_pos', 'copy_rates_range', 'copy_ticks_from',
+              'copy_ticks_range', 'orders_total', 'orders_get', 'order_calc_margin', 'order_calc_profit',
+              'order_check', 'order_send', 'positions_total', 'positions_get', 'history_orders_total',
+              'history_orders_get', 'history_deals_total', 'history_deals_get'):
+    globals()[_name] = Disconnected(_name, False if _name in ('initialize', 'login', 'symbol_select') else None)
@@ -0,0 +1,97 @@
+import math
+from dataclasses import dataclass
+from importlib import import_module
+from typing import Iterable
+
+from aiomql import ForexSymbol, OrderType, Strategy
+
+from ..utils.candle_cache import candle_cache
+from ..utils.decision_journal import JournalRecord, decision_journal, tracker_state
+from ..utils.indicators import indicator_engine
+from .engine import Backtest, SimLoop
+from .history import History
+
+# the parts of the state of the tracker that make up the decision of an evaluation
+DECISION = ('new', 'order_type', 'trend', 'sl', 'tp')
+# the methods the trade loops run within an evaluation, the first one a strategy defines is replayed
+EVALUATIONS = ('watch_market', 'check_trend', 'confirm_trend')
+
+
+@dataclass
+class Replayed:
+    """The outcome of replaying a journaled evaluation.
+
+    Attributes:
+        record (JournalRecord): The evaluation replayed.
+        inputs_match (bool): The closed bars read in the replay hash to the journaled ones and as many were read.
+        decision_match (bool): The replay came to the journaled decision.
+        expected (dict): The journaled decision.
+        actual (dict): The decision of the replay.
+    """
+    record: JournalRecord
+    inputs_match: bool
+    decision_match: bool
+    expected: dict
+    actual: dict
+
+
+class Replayer:
+    """Run the code of the strategies again on the inputs of journaled evaluations, to compare their decisions.
+
+    Every evaluation is replayed on its own, by a new instance of the strategy with the journaled parameters and the
+    journaled state of its tracker, against the stored history at the time the evaluation read its bars. The closed
+    bars come from the history and are checked against the hashes in the journal, the bars that were still forming
+    are the journaled ones. Indicators are computed afresh, which can move their values in the last digits when the
+    live bot computed them incrementally, so prices are compared with a relative tolerance. The method replayed is
+    the one the trade loop of the strategy evaluates, such as watch_market for FingerTrap. Evaluations of FingerADX
+    made through a batch are replayed through the check of a single symbol.
+
+    Attributes:
+        history (History): The stored bars, covering the journaled evaluations and the look back of the strategies.
+        specs (dict[str, dict]): Symbol properties by name.
+        rel_tol (float): Relative tolerance of the comparison of prices.
+    """
+    history: History
+    specs: dict[str, dict]
+    rel_tol: float
+
+    def __init__(self, *, history: History, specs: dict[str, dict] = None, rel_tol: float = 1e-6):
+        self.history = history
+        self.specs = specs
+        self.rel_tol = rel_tol
+
+    def run(self, records: Iterable[JournalRecord]) -> list[Replayed]:
+        """Replay journaled evaluations, such as the ones read from a journal by DecisionJournal.read."""
+        backtest = Backtest(history=self.history, strategies=[], specs=self.specs, monitor=False)
+        loop = SimLoop(clock=backtest.clock)
+        try:
+            with backtest.patched():
+                return [loop.run_until_complete(self.replay(record, backtest)) for record in records]
+        finally:
+            loop.close()
+
+    async def replay(self, record: JournalRecord, backtest: Backtest) -> Replayed:
+        module, _, name = record.strategy.rpartition('.')
+        cls: type[Strategy] = getattr(import_module(module), name)
+        # the forming bar of the timeframe the evaluation acted on opened last
+        backtest.clock.now = max(row[0] for _, row in record.frames if row) + 1
+        candle_cache.invalidate()
+        indicator_engine.states.clear()
+        strategy = cls(symbol=ForexSymbol(name=record.symbol), params=record.params)
+        await strategy.symbol.init()
+        for key, value in record.before.items():
+            setattr(strategy.tracker, key, OrderType(value) if key == 'order_type' and value is not None else value)
+        check = next(getattr(strategy, name) for name in EVALUATIONS if hasattr(strategy, name))
+        with decision_journal.replaying(strategy, record.frames) as state:
+            await check()
+        after = tracker_state(strategy.tracker)
+        expected = {key: record.after.get(key) for key in DECISION}
+        actual = {key: after.get(key) for key in DECISION}
+        return Replayed(record=record, inputs_match=not state.mismatches and not state.replay,
+                        decision_match=all(self.same(expected[key], actual[key]) for key in DECISION),
+                        expected=expected, actual=actual)
+
+    def same(self, expected, actual) -> bool:
+        if isinstance(expected, float) and isinstance(actual, float):
+            return math.isclose(expected, actual, rel_tol=self.rel_tol) or math.isnan(expected) and math.isnan(actual)
+        return expected == actual
@@ -0,0 +1,233 @@
+import os
+import warnings
+from concurrent.futures import ProcessPoolExecutor, Executor, wait
+from itertools import product
+from logging import getLogger
+from math import isnan, nan
+from typing import Callable, Sequence, Any
+
+import numpy as np
+import pandas as pd
+from aiomql import ForexSymbol, Strategy
+
+from ..utils.indicators import indicator_engine
+from .engine import Backtest
+from .history import History
+
+logger = getLogger(__name__)
+
+# the history of the worker process, set once by the pool initializer instead of being sent with every run
+worker_history: History | None = None
+
+
+def init_worker(history: History):
+    global worker_history
+    worker_history = history
+    # runs in a worker share one history, so the indicator columns they have in common are computed once
+    indicator_engine.journals = {}
+
+
+def run_backtest(strategy: type[Strategy], symbols: Sequence[str], params: dict, kwargs: dict) -> dict:
+    strategies = [strategy(symbol=ForexSymbol(name=symbol), params=params) for symbol in symbols]
+    return Backtest(history=worker_history, strategies=strategies, **kwargs).run()
+
+
+class Sweep:
+    """Tune the parameters of a strategy by backtesting parameter sets over stored history on a pool of processes.
+
+    The search space maps parameter names to the values to try. A list or a range gives the values to choose from, a
+    (low, high) tuple gives an interval to sample from, of integers when both bounds are integers. Parameters not in
+    the space keep the defaults of the strategy or the values in params. A grid search tries every combination of
+    the listed values, a random search samples the space and a bayesian search fits a gaussian process to the runs so
+    far and tries the sets with the highest expected improvement next.
+
+    Every worker process receives the history once. Runs in the same worker reuse the resampled bars of the history
+    and, through the journals of the indicator engine, the indicator columns of parameters the runs have in common.
+
+    Attributes:
+        strategy (type[Strategy]): The strategy to tune.
+        space (dict[str, Sequence | tuple]): The values to try by parameter name.
+        history (History): The stored bars.
+        symbols (Sequence[str]): Symbols to run the strategy on, all symbols in the history by default.
+        params (dict): Fixed parameters applied to every run.
+        objective (str | Callable): Key of the backtest summary to maximise or a function of the summary.
+        workers (int): Number of worker processes, one per core by default.
+        backtest (dict): Keyword arguments for Backtest, such as start, end, balance and specs.
+    """
+    strategy: type[Strategy]
+    space: dict[str, Sequence | tuple]
+    history: History
+    symbols: Sequence[str]
+    params: dict
+    objective: str | Callable[[dict], float]
+    workers: int
+    backtest: dict
+
+    def __init__(self, *, strategy: type[Strategy], space: dict[str, Sequence | tuple], history: History,
+                 symbols: Sequence[str] = None, params: dict = None, objective: str | Callable[[dict], float] =
+                 'net_profit', workers: int = None, seed: int = None, **kwargs):
+        if unknown := [name for name in space if name not in strategy.parameters]:
+            raise ValueError(f"{strategy.__name__} has no parameters named {', '.join(unknown)}")
+        self.strategy = strategy
+        self.space = {name: values if self.is_interval(values) else list(values) for name, values in space.items()}
+        self.history = history
+        self.symbols = symbols or list(history.rates)
+        self.params = params or {}
+        self.objective = objective
+        self.workers = workers or os.cpu_count() or 1
+        self.rng = np.random.default_rng(seed)
+        self.backtest = kwargs
+        self.results: list[dict] = []
+
+    @staticmethod
+    def is_interval(values) -> bool:
+        return isinstance(values, tuple) and len(values) == 2 and all(isinstance(v, (int, float)) for v in values)
+
+    def pool(self) -> ProcessPoolExecutor:
+        return ProcessPoolExecutor(max_workers=self.workers, initializer=init_worker, initargs=(self.history,))
+
+    def grid(self) -> pd.DataFrame:
+        """Run every combination of the values in the space.
+
+        Returns:
+            pd.DataFrame: The results ranked by the objective
+        """
+        if intervals := [name for name, values in self.space.items() if self.is_interval(values)]:
+            raise ValueError(f"Intervals can only be sampled, give the values of {', '.join(intervals)} as a list")
+        names = list(self.space)
+        sets = [dict(zip(names, values)) for values in product(*self.space.values())]
+        with self.pool() as pool:
+            self.evaluate(pool, sets)
+        return self.table()
+
+    def random(self, *, trials: int) -> pd.DataFrame:
+        """Run parameter sets sampled uniformly from the space.
+
+        Args:
+            trials (int): Number of parameter sets to run
+
+        Returns:
+            pd.DataFrame: The results ranked by the objective
+        """
+        with self.pool() as pool:
+            self.evaluate(pool, self.unseen([self.sample() for _ in range(trials)]))
+        return self.table()
+
+    def bayesian(self, *, trials: int, initial: int = None, candidates: int = 1000) -> pd.DataFrame:
+        """Run parameter sets chosen by expected improvement under a gaussian process fitted to the runs so far. A
+        batch of one set per worker is chosen at a time.
+
+        Args:
+            trials (int): Number of parameter sets to run
+            initial (int): Number of randomly sampled sets to start with, twice the number of workers by default
+            candidates (int): Number of random sets the next batch is chosen from
+
+        Returns:
+            pd.DataFrame: The results ranked by the objective
+        """
+        from scipy.stats import norm
+        from sklearn.gaussian_process import GaussianProcessRegressor
+        from sklearn.exceptions import ConvergenceWarning
+        from sklearn.gaussian_process.kernels import Matern, WhiteKernel
+
+        initial = min(trials, initial or 2 * self.workers)
+        with self.pool() as pool:
+            done = len(self.evaluate(pool, self.unseen([self.sample() for _ in range(initial)])))
+            while done < trials:
+                scored = [(self.encode(res['params']), res['score']) for res in self.results
+                          if not isnan(res['score'])]
+                options = self.unseen([self.sample() for _ in range(candidates)])
+                if not options:
+                    break
+                batch = min(self.workers, trials - done)
+                if len(scored) < 2:
+                    chosen = options[:batch]
+                else:
+                    x, y = np.array([s[0] for s in scored]), np.array([s[1] for s in scored])
+                    model = GaussianProcessRegressor(kernel=Matern(nu=2.5) + WhiteKernel(), normalize_y=True,
+                                                     random_state=int(self.rng.integers(2 ** 31)))
+                    with warnings.catch_warnings():
+                        # flat objectives, common with few trades, push the kernel parameters to their bounds
+                        warnings.simplefilter('ignore', ConvergenceWarning)
+                        model.fit(x, y)
+                    mean, std = model.predict(np.array([self.encode(s) for s in options]), return_std=True)
+                    std = np.maximum(std, 1e-12)
+                    z = (mean - y.max()) / std
+                    improvement = (mean - y.max()) * norm.cdf(z) + std * norm.pdf(z)
+                    chosen = [options[i] for i in np.argsort(improvement)[::-1][:batch]]
+                done += len(self.evaluate(pool, chosen))
+        return self.table()
+
+    def sample(self) -> dict:
+        """A parameter set drawn uniformly from the space."""
+        params = {}
+        for name, values in self.space.items():
+            if not self.is_interval(values):
+                params[name] = values[int(self.rng.integers(len(values)))]
+            elif all(isinstance(v, int) for v in values):
+                params[name] = int(self.rng.integers(values[0], values[1] + 1))
+            else:
+                params[name] = float(self.rng.uniform(*values))
+        return params
+
+    def encode(self, params: dict) -> list[float]:
+        """Map a parameter set onto the unit cube. Listed values are encoded by their position in the list."""
+        point = []
+        for name, values in self.space.items():
+            if self.is_interval(values):
+                low, high = values
+                point.append((params[name] - low) / (high - low) if high != low else 0)
+            else:
+                point.append(values.index(params[name]) / (len(values) - 1) if len(values) > 1 else 0)
+        return point
+
+    def unseen(self, sets: list[dict]) -> list[dict]:
+        """The distinct parameter sets that have not been run yet."""
+        seen = {self.key(res['params']) for res in self.results}
+        unique = {}
+        for params in sets:
+            if (key := self.key(params)) not in seen:
+                unique.setdefault(key, params)
+        return list(unique.values())
+
+    @staticmethod
+    def key(params: dict) -> tuple:
+        return tuple(sorted((name, repr(value)) for name, value in params.items()))
+
+    def evaluate(self, pool: Executor, sets: list[dict]) -> list[dict]:
+        """Backtest parameter sets on the pool and add their results.
+
+        Returns:
+            list[dict]: The results of the sets, with the parameters, the score and the backtest summary
+        """
+        futures = {pool.submit(run_backtest, self.strategy, self.symbols, self.params | params, self.backtest):
+                   params for params in sets}
+        wait(futures)
+        results = []
+        for future, params in futures.items():
+            result: dict[str, Any] = {'params': params}
+            try:
+                summary = future.result()
+                result |= {'summary': summary, 'score': self.score(summary), 'error': ''}
+            except Exception as err:
+                logger.error(f"Backtest of {self.strategy.__name__} with {params} failed: {err}")
+                result |= {'summary': {}, 'score': nan, 'error': str(err)}
+            results.append(result)
+        self.results.extend(results)
+        return results
+
+    def score(self, summary: dict) -> float:
+        score = self.objective(summary) if callable(self.objective) else summary[self.objective]
+        return float(score)
+
+    def table(self) -> pd.DataFrame:
+        """The results of all runs so far ranked by the objective, best first, with a column per swept parameter
+        and per summary field."""
+        rows = [res['params'] | {'score': res['score']} | res['summary'] | ({'error': res['error']} if res['error']
+                                                                            else {}) for res in self.results]
+        table = pd.DataFrame(rows)
+        if table.empty:
+            return table
+        table = table.sort_values('score', ascending=False, na_position='last', kind='stable').reset_index(drop=True)
+        table.index = pd.RangeIndex(1, len(table) + 1, name='rank')
+        return table
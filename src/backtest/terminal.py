@@ -0,0 +1,135 @@
+import time
+from functools import partial
+from logging import getLogger
+from random import Random
+from threading import Lock
+from typing import Sequence
+
+import numpy as np
+from aiomql import MetaTrader, TimeFrame
+
+from .broker import SimBroker
+from .engine import TERMINAL, MISSING
+from .history import History
+
+logger = getLogger(__name__)
+
+WEEK = 7 * 86400
+# synthetic bars are priced around 1000, so the symbols are specified like the synthetic indices of Deriv
+SYNTHETIC_SPEC = {'digits': 2, 'point': 0.01, 'trade_tick_size': 0.01, 'trade_tick_value': 0.01,
+                  'trade_contract_size': 1, 'volume_min': 0.5, 'volume_step': 0.01, 'volume_max': 100}
+
+
+class FakeTerminal:
+    """An in-process terminal that answers the calls aiomql makes with a SimBroker running on the wall clock.
+
+    Once installed every terminal function of aiomql's MetaTrader class is served by the broker, so the bots run
+    unmodified against recorded or synthetic bars. The calls still go through asyncio.to_thread, and each of them
+    blocks its worker thread for the configured latency, as a call to a real terminal blocks while it waits on the
+    terminal. The broker is not thread safe, so calls are served one at a time. The number of calls and the time
+    taken by each function are recorded for load runs.
+
+    Attributes:
+        broker (SimBroker): The simulated account.
+        latency (float): Seconds every call blocks for.
+        jitter (float): Upper bound of a uniformly distributed delay in seconds added to the latency.
+        calls (dict[str, list[float]]): Duration in seconds of every call by function name.
+    """
+    broker: SimBroker
+    latency: float
+    jitter: float
+
+    def __init__(self, *, broker: SimBroker, latency: float = 0, jitter: float = 0, seed: int = None):
+        self.broker = broker
+        self.latency = latency
+        self.jitter = jitter
+        self.random = Random(seed)
+        self.lock = Lock()
+        self.calls: dict[str, list[float]] = {}
+        self.originals = []
+
+    @classmethod
+    def synthetic(cls, *, symbols: Sequence[str], days: float = 30, timeframe: TimeFrame = TimeFrame.M5,
+                  seed: int = None, latency: float = 0, jitter: float = 0, **kwargs) -> 'FakeTerminal':
+        """A terminal serving random walk bars. The bars cover the given number of days before now, as look back for
+        the strategies, and the next seven days, over which new bars open in step with the wall clock.
+
+        Args:
+            symbols (Sequence[str]): Names of the symbols
+            days (float): Days of bars before now
+            timeframe (TimeFrame): Timeframe of the stored bars
+            seed (int): Seed of the random generator for the bars and the delays
+            latency (float): Seconds every call blocks for
+            jitter (float): Upper bound of a random delay added to the latency
+            **kwargs: Keyword arguments for SimBroker, such as balance, leverage and specs
+        """
+        now = time.time()
+        history = History.synthetic(symbols=symbols, start=now - days * 86400, end=now + WEEK, timeframe=timeframe,
+                                    seed=seed)
+        specs = kwargs.pop('specs', None) or {}
+        specs = {symbol: SYNTHETIC_SPEC | specs.get(symbol, {}) for symbol in symbols}
+        broker = SimBroker(history=history, clock=time.time, specs=specs, **kwargs)
+        return cls(broker=broker, latency=latency, jitter=jitter, seed=seed)
+
+    @classmethod
+    def replay(cls, *, history: History, start: float = None, latency: float = 0, jitter: float = 0,
+               seed: int = None, **kwargs) -> 'FakeTerminal':
+        """A terminal replaying stored bars in real time from a given point of the history.
+
+        The clock of the broker runs with the wall clock shifted back by whole weeks, so the replayed bars keep the
+        time of day and the day of the week they were recorded at.
+
+        Args:
+            history (History): The stored bars
+            start (float): Time in the history to replay from. Defaults to a week into the history.
+            latency (float): Seconds every call blocks for
+            jitter (float): Upper bound of a random delay added to the latency
+            seed (int): Seed of the random generator for the delays
+            **kwargs: Keyword arguments for SimBroker, such as balance, leverage and specs
+        """
+        start = start or history.start + WEEK
+        offset = (time.time() - start) // WEEK * WEEK
+        broker = SimBroker(history=history, clock=lambda: time.time() - offset, **kwargs)
+        return cls(broker=broker, latency=latency, jitter=jitter, seed=seed)
+
+    def call(self, name: str, *args, **kwargs):
+        """Serve a terminal function after the configured delay."""
+        start = time.perf_counter()
+        delay = self.latency + (self.random.uniform(0, self.jitter) if self.jitter else 0)
+        if delay:
+            time.sleep(delay)
+        with self.lock:
+            try:
+                return getattr(self.broker, name)(*args, **kwargs)
+            finally:
+                self.calls.setdefault(name, []).append(time.perf_counter() - start)
+
+    def install(self):
+        """Serve the terminal functions of aiomql's MetaTrader class from this terminal."""
+        if self.originals:
+            return
+        self.originals = [(f"_{name}", vars(MetaTrader).get(f"_{name}", MISSING)) for name in TERMINAL]
+        for name in TERMINAL:
+            setattr(MetaTrader, f"_{name}", partial(self.call, name))
+
+    def uninstall(self):
+        """Restore the terminal functions replaced by install."""
+        for name, value in self.originals:
+            setattr(MetaTrader, name, value) if value is not MISSING else delattr(MetaTrader, name)
+        self.originals = []
+
+    def __enter__(self) -> 'FakeTerminal':
+        self.install()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.uninstall()
+
+    def stats(self) -> dict[str, dict]:
+        """Number of calls and their mean and 95th percentile duration in milliseconds by function name."""
+        stats = {}
+        for name, durations in sorted(self.calls.items()):
+            durations = np.array(durations) * 1000
+            stats[name] = {'calls': len(durations), 'mean': round(float(durations.mean()), 3),
+                           'p95': round(float(np.percentile(durations, 95)), 3)}
+        return stats
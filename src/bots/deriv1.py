@@ -2,11 +2,14 @@
 import logging
 import logging.config
 import json
+from pathlib import Path
 
 from aiomql import Bot, ForexSymbol, Config
 
-from ..strategies import FingerADX
+from ..strategies import FingerADX, FingerADXBatch
 from ..closers import monitor
+from ..utils.metrics import serve
+from ..utils.decision_journal import decision_journal
 
 
 def build_bot():
@@ -16,15 +19,18 @@ def build_bot():
         log_config['handlers']['error']['filename'] = 'logs/deriv1_error.log'
         logging.config.dictConfig(log_config)
         config = Config(config_dir='configs', filename='deriv1.json', reload=True,
-                        records_dir='records/deriv1/')
+                        records_dir='records/deriv1/', metrics_port=9101)
         config.load_config()
         config.state['tracked_orders'] = {}
+        serve(port=config.metrics_port)
+        decision_journal.open(directory=Path('records/deriv1/journal'), name='deriv1')
         bot = Bot()
 
         syms = ['Volatility 10 Index', 'Volatility 100 (1s) Index', 'Volatility 25 Index', 'Volatility 25 (1s) Index',
                 'Volatility 75 Index', 'Volatility 10 (1s) Index', 'Volatility 75 (1s) Index', 'Volatility 50 Index',
                 'Volatility 50 (1s) Index']
-        ff_sts = [ST(symbol=ForexSymbol(name=sym)) for sym in syms for ST in [FingerADX]]
+        batch = FingerADXBatch()
+        ff_sts = [FingerADX(symbol=ForexSymbol(name=sym), batch=batch) for sym in syms]
         bot.add_strategies(ff_sts)
         bot.add_coroutine(monitor)
         bot.execute()
@@ -1,6 +1,7 @@
 """A Simple bot that uses the inbuilt FingerTrap strategy"""
 
 import json
+from pathlib import Path
 import logging
 import logging.config
 
@@ -8,6 +9,8 @@ from aiomql import Bot, ForexSymbol, Config
 
 from ..strategies import FFATR, FFCE
 from ..closers import monitor
+from ..utils.metrics import serve
+from ..utils.decision_journal import decision_journal
 
 
 def build_bot():
@@ -15,9 +18,12 @@ def build_bot():
     log_config['handlers']['debug']['filename'] = 'logs/deriv2_debug.log'
     log_config['handlers']['error']['filename'] = 'logs/deriv2_error.log'
     logging.config.dictConfig(log_config)
-    config = Config(config_dir='configs', filename='deriv2.json', reload=True, records_dir='records/deriv2/')
+    config = Config(config_dir='configs', filename='deriv2.json', reload=True, records_dir='records/deriv2/',
+                    metrics_port=9102)
     config.load_config()
     config.state['tracked_orders'] = {}
+    serve(port=config.metrics_port)
+    decision_journal.open(directory=Path('records/deriv2/journal'), name='deriv2')
 
     bot = Bot()
     syms = ['Volatility 10 Index', 'Volatility 100 (1s) Index', 'Volatility 25 Index', 'Volatility 25 (1s) Index',
@@ -2,11 +2,14 @@
 import logging
 import logging.config
 import json
+from pathlib import Path
 
 from aiomql import Bot, ForexSymbol, Config, TimeFrame
 
 from ..strategies import FFATR, FFCE, Chaos
 from ..closers import monitor
+from ..utils.metrics import serve
+from ..utils.decision_journal import decision_journal
 
 
 def build_bot():
@@ -16,9 +19,11 @@ def build_bot():
         log_config['handlers']['error']['filename'] = 'logs/deriv_crypto_error.log'
         logging.config.dictConfig(log_config)
         config = Config(config_dir='configs', filename='deriv_crypto.json', reload=True,
-                        records_dir='records/deriv_crypto/', use_telegram=False)
+                        records_dir='records/deriv_crypto/', use_telegram=False, metrics_port=9104)
         config.load_config()
         config.state['tracked_orders'] = {}
+        serve(port=config.metrics_port)
+        decision_journal.open(directory=Path('records/deriv_crypto/journal'), name='deriv_crypto')
         bot = Bot()
         crypto_syms = ['ETHUSD', 'BTCUSD', 'SOLUSD']
         crypto_syms = [ForexSymbol(name=sym) for sym in crypto_syms]
@@ -2,12 +2,15 @@
 import logging
 import logging.config
 import json
+from pathlib import Path
 
 from aiomql import Bot, ForexSymbol, Config, TimeFrame
 
 from ..traders.sp_trader import SPTrader
 from ..strategies import FFATR, Chaos
 from ..closers import monitor
+from ..utils.metrics import serve
+from ..utils.decision_journal import decision_journal
 
 
 def build_bot():
@@ -18,9 +21,11 @@ def build_bot():
         logging.config.dictConfig(log_config)
 
         config = Config(config_dir='configs', filename='deriv_scalper.json', reload=True,
-                        records_dir='records/deriv_scalper/')
+                        records_dir='records/deriv_scalper/', metrics_port=9103)
         config.load_config()
         config.state['tracked_orders'] = {}
+        serve(port=config.metrics_port)
+        decision_journal.open(directory=Path('records/deriv_scalper/journal'), name='deriv_scalper')
         bot = Bot()
         syms = ['Volatility 10 Index', 'Volatility 100 (1s) Index', 'Volatility 25 Index', 'Volatility 25 (1s) Index',
                 'Volatility 75 Index', 'Volatility 10 (1s) Index',
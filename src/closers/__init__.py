@@ -1,4 +1,5 @@
 from .track_order import TrackOrder, OpenOrder, OrderTracker
+from .position_snapshot import PositionSnapshot
 from .trader_monitor import monitor
 from .adx_closer import adx_closer
 from .check_profits import fixed_check_profit, ratio_check_profit
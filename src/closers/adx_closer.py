@@ -1,8 +1,12 @@
 from logging import getLogger
 
-from aiomql import Positions, Symbol, OrderType
+from aiomql import Positions, OrderType
 
+from ..utils.candle_cache import candle_cache
+from ..utils.indicators import indicator_engine
+from ..utils import signals
 from .hedge import hedge_position
+from ..utils.symbol_registry import symbol_registry
 from .track_order import OpenOrder
 
 logger = getLogger(__name__)
@@ -12,19 +16,18 @@ async def adx_closer(*, order: OpenOrder):
     try:
         pos = Positions()
         position = order.position
-        sym = Symbol(name=position.symbol)
-        await sym.init()
+        sym = await symbol_registry.get(name=position.symbol)
         parameters = order.strategy_parameters
         exit_timeframe = parameters['exit_timeframe']
         cc = parameters['excc']
-        candles = await sym.copy_rates_from_pos(count=cc, timeframe=exit_timeframe)
+        candles = await candle_cache.get(symbol=sym, count=cc, timeframe=exit_timeframe)
         adx = parameters['exit_adx']
-        candles.ta.adx(append=True, length=adx)
+        indicator_engine.apply(candles, symbol=sym.name, timeframe=exit_timeframe, kind='adx', length=adx)
         candles.rename(**{f"ADX_{adx}": "adx", f"DMP_{adx}": "dmp", f"DMN_{adx}": "dmn"})
-        candles['pxn'] = candles.ta_lib.cross(candles.dmp, candles.dmn, asint=False)
-        candles['pan'] = candles.ta_lib.above(candles.dmp, candles.dmn, asint=False)
-        candles['nxp'] = candles.ta_lib.cross(candles.dmn, candles.dmp, asint=False)
-        candles['nap'] = candles.ta_lib.above(candles.dmn, candles.dmp, asint=False)
+        candles['pxn'] = signals.cross(candles.dmp, candles.dmn, asint=False, window=1)
+        candles['pan'] = signals.above(candles.dmp, candles.dmn, asint=False, window=1)
+        candles['nxp'] = signals.cross(candles.dmn, candles.dmp, asint=False, window=1)
+        candles['nap'] = signals.above(candles.dmn, candles.dmp, asint=False, window=1)
         current = candles[-1]
 
         if position.type == OrderType.BUY and (current.nxp or current.nap):
@@ -34,7 +37,7 @@ async def adx_closer(*, order: OpenOrder):
         else:
             return
 
-        position = await pos.position_get(ticket=order.ticket)
+        position = await order.get_position()
         if position is None:
             return
 
@@ -45,6 +48,7 @@ async def adx_closer(*, order: OpenOrder):
             if res.retcode == 10009:
                 logger.info(f"Exited trade {position.symbol}{position.ticket} with adx_closer")
                 order.config.state['tracked_orders'].pop(order.ticket, None)
+                order.closed()
             else:
                 logger.error(f"Unable to close trade with adx_closer {res.comment}")
         else:
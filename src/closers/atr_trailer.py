@@ -1,8 +1,11 @@
 from logging import getLogger
 
-from aiomql import Order, TradeAction, OrderType, TradePosition, Symbol, Positions, OrderSendResult
+from aiomql import Order, TradeAction, OrderType, TradePosition, OrderSendResult
 
-from ..utils.order_utils import calc_profit
+from ..utils.order_utils import calc_profit, fit_stops, stops_frozen
+from ..utils.candle_cache import candle_cache
+from ..utils.indicators import indicator_engine
+from ..utils.symbol_registry import symbol_registry
 from .track_order import OpenOrder
 
 logger = getLogger(__name__)
@@ -22,26 +25,27 @@ async def atr_trailer(*, order: OpenOrder):
         logger.error(f"{exe}@{exe.__traceback__.tb_lineno} in atr_trailer for {order.position.symbol}:{order.ticket}")
 
 
-async def modify_stops(*, order: OpenOrder, extra: float = 0.0, tries: int = 4):
+async def modify_stops(*, order: OpenOrder):
     try:
-        position = await Positions().position_get(ticket=order.position.ticket)
+        position = await order.get_position()
+        if position is None:
+            return
         params = order.strategy_parameters
         tp_params = order.track_profit_params
-        symbol = Symbol(name=position.symbol)
-        await symbol.init()
+        symbol = await symbol_registry.get(name=position.symbol)
         etf = params['tptf']
         ecc = params['tpcc']
         atr = params.get('atr_length', 14)
         atr_factor = 0.75
-        candles = await symbol.copy_rates_from_pos(timeframe=etf, count=ecc)
-        candles.ta.atr(append=True, length=atr)
+        candles = await candle_cache.get(symbol=symbol, timeframe=etf, count=ecc)
+        indicator_engine.apply(candles, symbol=symbol.name, timeframe=etf, kind='atr', length=atr)
         candles.rename(inplace=True, **{f'ATRr_{atr}': 'atr'})
         current = candles[-1]
         tick = await symbol.info_tick()
         expected_profit = order.target_profit or order.expected_profit
         extend_start = tp_params['extend_start']
 
-        min_points = symbol.trade_stops_level + symbol.spread * (1 + extra)
+        min_points = symbol.trade_stops_level + symbol.spread
         min_value = round(min_points * symbol.point, symbol.digits)
         atr_value = current.atr * atr_factor
         if atr_value < min_value:
@@ -82,9 +86,17 @@ async def modify_stops(*, order: OpenOrder, extra: float = 0.0, tries: int = 4):
         if change_tp is False and change_sl is False:
             return
 
+        if stops_frozen(sym=symbol, position=position, tick=tick):
+            logger.debug(f"Stops of {position.symbol}:{position.ticket} are within the freeze level")
+            return
+        sl, tp = fit_stops(sym=symbol, order_type=position.type, tick=tick, sl=sl, tp=tp)
+        if sl == position.sl and tp == position.tp:
+            return
+
         res = await send_order(position=position, sl=sl, tp=tp)
         if res.retcode == 10009:
             order.track_profit_params['previous_profit'] = position.profit
+            order.modified()
             captured_profit = calc_profit(sym=symbol, open_price=position.price_open, close_price=sl,
                                           volume=position.volume, order_type=position.type)
             logger.debug(f"Changed stop_levels for"
@@ -95,9 +107,6 @@ async def modify_stops(*, order: OpenOrder, extra: float = 0.0, tries: int = 4):
                 order.expected_profit = new_profit
                 logger.debug(f"Changed expected profit to {new_profit} for"
                             f"{position.symbol}:{position.ticket}@{position.profit=}@{captured_profit=}")
-
-        elif res.retcode == 10016 and tries > 0:
-            await modify_stops(order=order, extra=(extra + 0.01), tries=tries - 1)
         else:
             logger.error(f"Unable to place order due to {res.comment} for {position.symbol}:{position.ticket}")
     except Exception as exe:
@@ -1,8 +1,12 @@
 from logging import getLogger
 
-from aiomql import Order, TradeAction, OrderType, TradePosition, Symbol, Positions, OrderSendResult, TimeFrame
+from aiomql import Order, TradeAction, OrderType, TradePosition, OrderSendResult, TimeFrame
 
-from ..utils.order_utils import calc_profit
+from ..utils.order_utils import calc_profit, fit_stops, stops_frozen
+from ..utils.candle_cache import candle_cache
+from ..utils.candle_view import CandleView
+from ..utils.indicators import indicator_engine
+from ..utils.symbol_registry import symbol_registry
 from .track_order import OpenOrder
 
 logger = getLogger(__name__)
@@ -25,25 +29,26 @@ async def chandelier_trailer(*, order: OpenOrder):
 
 async def chandelier(*, order: OpenOrder):
     try:
-        position = await Positions().position_get(ticket=order.position.ticket)
+        position = await order.get_position()
+        if position is None:
+            return
         tp_params = order.track_profit_params
         st_params = order.strategy_parameters
-        symbol = Symbol(name=position.symbol)
-        await symbol.init()
+        symbol = await symbol_registry.get(name=position.symbol)
         atr = 14
         atr_factor = st_params.get('atr_factor', 2)
         ce_period = tp_params['ce_period']
-        candles = await symbol.copy_rates_from_pos(timeframe=TimeFrame.D1, count=60)
-        candles.ta.atr(append=True, length=atr)
+        candles = await candle_cache.get(symbol=symbol, timeframe=TimeFrame.D1, count=60)
+        indicator_engine.apply(candles, symbol=symbol.name, timeframe=TimeFrame.D1, kind='atr', length=atr)
         candles.rename(inplace=True, **{f'ATRr_{atr}': 'atr'})
-        p_candles = candles[-ce_period:]
-        current = p_candles[-1]
+        view = CandleView(candles)
+        current = view[-1]
         expected_profit = order.target_profit or order.expected_profit
         extend_start = tp_params['extend_start']
         change_sl = change_tp = False
         trail_start = tp_params['trail_start']
         if position.type == OrderType.BUY:
-            sl = max(candles.high.iloc[-ce_period:]) - atr_factor * current.atr
+            sl = view.highest(ce_period) - atr_factor * current.atr
             if sl > position.sl and (trail_start == 0 or sl > position.price_open):
                 sl = round(sl, symbol.digits)
                 change_sl = True
@@ -57,7 +62,7 @@ async def chandelier(*, order: OpenOrder):
             else:
                 tp = position.tp
         else:
-            sl = min(candles.low.iloc[-ce_period:]) + atr_factor * current.atr
+            sl = view.lowest(ce_period) + atr_factor * current.atr
             if sl < position.sl and (trail_start == 0 or sl < position.price_open):
                 sl = round(sl, symbol.digits)
                 change_sl = True
@@ -74,9 +79,17 @@ async def chandelier(*, order: OpenOrder):
 
         if change_tp is False and change_sl is False:
             return
+        tick = await symbol.info_tick()
+        if stops_frozen(sym=symbol, position=position, tick=tick):
+            logger.debug(f"Stops of {position.symbol}:{position.ticket} are within the freeze level")
+            return
+        sl, tp = fit_stops(sym=symbol, order_type=position.type, tick=tick, sl=sl, tp=tp)
+        if sl == position.sl and tp == position.tp:
+            return
         res = await send_order(position=position, sl=sl, tp=tp)
         if res.retcode == 10009:
             order.track_profit_params['previous_profit'] = position.profit
+            order.modified()
             taken_profit = calc_profit(sym=symbol, open_price=position.price_open, close_price=sl,
                                        volume=position.volume, order_type=position.type)
             captured_profit = max(taken_profit, 0)
@@ -12,13 +12,16 @@ async def fixed_check_profit(*, order: OpenOrder):
         check_profit_params = order.check_profit_params
         check_points = check_profit_params['check_points']
         pos = Positions()
-        position = await pos.position_get(ticket=order.ticket)
+        position = await order.get_position()
+        if position is None:
+            return
         current_check_point = check_profit_params['check_point']
         if check_profit_params['close'] and position.profit < current_check_point:
             res = await pos.close_by(position)
             if res.retcode == 10009:
                 logger.info(f"Closed trade {position.ticket}:{position.symbol}@{position.profit=} at checkpoint")
                 order.config.state['tracked_orders'].pop(position.ticket, None)
+                order.closed()
                 return
             else:
                 logger.error(f"Unable to close order in check_profit due to {res.comment}")
@@ -41,13 +44,16 @@ async def ratio_check_profit(*, order: OpenOrder):
         check_profit_params = order.check_profit_params
         check_points = check_profit_params['check_points']
         pos = Positions()
-        position = await pos.position_get(ticket=order.ticket)
+        position = await order.get_position()
+        if position is None:
+            return
         current_check_point = check_profit_params['check_point']
         if check_profit_params['close'] and position.profit < current_check_point:
             res = await pos.close_by(position)
             if res.retcode == 10009:
                 logger.info(f"Closed trade {position.symbol}:{position.ticket}@{position.profit} at checkpoint")
                 order.config.state['tracked_orders'].pop(position.ticket, None)
+                order.closed()
                 return
             else:
                 logger.error(f"Unable to close order in check_profit due to {res.comment}")
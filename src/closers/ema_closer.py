@@ -1,8 +1,12 @@
 from logging import getLogger
 
-from aiomql import Positions, Symbol, OrderType
+from aiomql import Positions, OrderType
 
+from ..utils.candle_cache import candle_cache
+from ..utils.indicators import indicator_engine
+from ..utils import signals
 from .hedge import hedge_position
+from ..utils.symbol_registry import symbol_registry
 from .track_order import OpenOrder
 
 logger = getLogger(__name__)
@@ -13,15 +17,14 @@ async def ema_closer(*, order: OpenOrder):
         pos = Positions()
         position = order.position
         parameters = order.strategy_parameters
-        sym = Symbol(name=position.symbol)
-        await sym.init()
+        sym = await symbol_registry.get(name=position.symbol)
         exit_timeframe = parameters['exit_timeframe']
         exit_ema = parameters['exit_ema']
-        candles = await sym.copy_rates_from_pos(count=720, timeframe=exit_timeframe)
-        candles.ta.ema(length=exit_ema, append=True)
+        candles = await candle_cache.get(symbol=sym, count=720, timeframe=exit_timeframe)
+        indicator_engine.apply(candles, symbol=sym.name, timeframe=exit_timeframe, kind='ema', length=exit_ema)
         candles.rename(**{f"EMA_{exit_ema}": "ema"})
-        candles['cbe'] = candles.ta_lib.cross(candles.close, candles.ema, above=False, asint=False)
-        candles['cae'] = candles.ta_lib.cross(candles.close, candles.ema, asint=False)
+        candles['cbe'] = signals.cross(candles.close, candles.ema, above=False, asint=False, window=1)
+        candles['cae'] = signals.cross(candles.close, candles.ema, asint=False, window=1)
         current = candles[-1]
         if position.type == OrderType.BUY and current.cbe:
             ...
@@ -29,7 +32,7 @@ async def ema_closer(*, order: OpenOrder):
             ...
         else:
             return
-        position = await pos.position_get(ticket=position.ticket)
+        position = await order.get_position()
         if position is None:
             return
         if position.profit <= 0:
@@ -38,6 +41,7 @@ async def ema_closer(*, order: OpenOrder):
             res = await pos.close_by(position)
             if res.retcode == 10009:
                 order.config.state['tracked_orders'].pop(order.ticket, None)
+                order.closed()
                 logger.info(f"Exited trade {position.symbol}:{position.ticket} with ema_closer")
             else:
                 logger.error(f"Unable to close trade in ema_closer {res.comment}")
@@ -1,23 +1,28 @@
 import asyncio
 from logging import getLogger
 
-from aiomql import Order, OrderType, TradePosition, Symbol, Positions, OrderSendResult
+from aiomql import Order, OrderType, TradePosition, Positions, OrderSendResult
 
+from ..utils.account_state import account_state
+from ..utils.exposure import exposure_index
+from ..utils.symbol_registry import symbol_registry
 from .track_order import OpenOrder
-from ..utils.order_utils import calc_profit
+from .position_snapshot import PositionSnapshot
+from ..utils.order_utils import calc_profit, fit_stops, fit_volume
 
 logger = getLogger(__name__)
 
 
 async def hedge_position(*, order: OpenOrder):
     try:
-        position = await Positions().position_get(ticket=order.ticket)
+        position = await order.get_position()
+        if position is None:
+            return
         hedge_params = order.hedger_params
         hedge_point = hedge_params['hedge_point']
         if position.profit > hedge_point * (order.target_loss or order.expected_loss):
             return
-        sym = Symbol(name=position.symbol)
-        await sym.init()
+        sym = await symbol_registry.get(name=position.symbol)
         res = await make_hedge(position=position, hedge_params=hedge_params)
         if res is None:
             return
@@ -46,7 +51,8 @@ async def make_hedge(*, position: TradePosition, hedge_params: dict) -> OrderSen
         osl = abs(position.sl - position.price_open)
         otp = abs(position.tp - position.price_open)
 
-        tick = await Symbol(name=position.symbol).info_tick()
+        symbol = await symbol_registry.get(name=position.symbol)
+        tick = await symbol.info_tick()
         price = tick.bid if position.type == OrderType.BUY else tick.ask
 
         if position.type == OrderType.BUY:
@@ -56,10 +62,15 @@ async def make_hedge(*, position: TradePosition, hedge_params: dict) -> OrderSen
             sl = price - osl
             tp = price + otp
 
-        order = Order(symbol=position.symbol, price=price, sl=sl, tp=tp, type=position.type.opposite,
-                      volume=position.volume * hedge_params['hedge_vol'], comment=f"Rev{position.ticket}")
+        order_type = position.type.opposite
+        sl, tp = fit_stops(sym=symbol, order_type=order_type, tick=tick, sl=sl, tp=tp)
+        volume = fit_volume(sym=symbol, volume=position.volume * hedge_params['hedge_vol'])
+        order = Order(symbol=position.symbol, price=price, sl=sl, tp=tp, type=order_type, volume=volume,
+                      comment=f"Rev{position.ticket}")
         res = await order.send()
         if res.retcode == 10009:
+            account_state.invalidate()
+            exposure_index.opened(ticket=res.order, order=order, price=res.price)
             return res
         logger.error(f"Could not hedge {position.ticket} for {position.symbol} with {res.comment}")
     except Exception as exe:
@@ -71,9 +82,10 @@ async def track_hedge(*, hedge: OpenOrder):
         orders = hedge.config.state['tracked_orders']
         hedged_order = hedge.hedged_order
         pos = Positions()
+        snapshot = hedge.snapshot or await PositionSnapshot.take()
         hedged_ticket, hedge_ticket = hedged_order.ticket, hedge.ticket
-        hedged_pos, hedge_pos = await asyncio.gather(pos.position_get(ticket=hedged_ticket),
-                                                     pos.position_get(ticket=hedge_ticket), return_exceptions=True)
+        hedged_pos, hedge_pos = await asyncio.gather(snapshot.get(ticket=hedged_ticket),
+                                                     snapshot.get(ticket=hedge_ticket))
         if hedged_pos is None and hedge_pos is None:
             orders.pop(hedged_ticket, None)
             orders.pop(hedge_ticket, None)
@@ -84,6 +96,7 @@ async def track_hedge(*, hedge: OpenOrder):
             if hedged_pos.profit >= hedge_close:
                 if isinstance(hedge_pos, TradePosition):
                     await pos.close_by(hedge_pos)
+                    snapshot.discard(ticket=hedge_ticket)
                     logger.info(f"Closed {hedge_pos.ticket}:{hedged_pos.ticket}@"
                                  f"{hedge_pos.profit}:{hedged_pos.profit} hedged order in profit")
                 orders.pop(hedge_ticket, None)
@@ -101,6 +114,7 @@ async def track_hedge(*, hedge: OpenOrder):
                 hedge.check_profit = True
             else:
                 await pos.close_by(hedge_pos)
+                snapshot.discard(ticket=hedge_ticket)
                 logger.info(f"Closed {hedge_pos.ticket}:{hedged_order.ticket}@{hedge_pos.profit} hedge in loss")
                 orders.pop(hedge_ticket, None)
     except Exception as exe:
@@ -112,9 +126,10 @@ async def track_hedge_2(*, hedge: OpenOrder):
         orders = hedge.config.state['tracked_orders']
         hedged_order = hedge.hedged_order
         pos = Positions()
+        snapshot = hedge.snapshot or await PositionSnapshot.take()
         hedged_ticket, hedge_ticket = hedged_order.ticket, hedge.ticket
-        hedged_pos, hedge_pos = await asyncio.gather(pos.position_get(ticket=hedged_ticket),
-                                                     pos.position_get(ticket=hedge_ticket), return_exceptions=True)
+        hedged_pos, hedge_pos = await asyncio.gather(snapshot.get(ticket=hedged_ticket),
+                                                     snapshot.get(ticket=hedge_ticket))
         if hedged_pos is None and hedge_pos is None:
             orders.pop(hedged_ticket, None)
             orders.pop(hedge_ticket, None)
@@ -128,6 +143,7 @@ async def track_hedge_2(*, hedge: OpenOrder):
                 if isinstance(hedge_pos, TradePosition):
                     res = await pos.close_by(hedge_pos)
                     if res.retcode == 10009:
+                        snapshot.discard(ticket=hedge_ticket)
                         logger.info(f"Closed {hedge_pos.ticket}of{hedged_pos.ticket}:{hedge_pos.symbol}@"
                                     f"{hedge_pos.profit}:{hedged_pos.profit} hedged order profit above hedge close")
                         orders.pop(hedge_ticket, None)
@@ -148,6 +164,7 @@ async def track_hedge_2(*, hedge: OpenOrder):
                 hedge.check_profit = True
             else:
                 await pos.close_by(hedge_pos)
+                snapshot.discard(ticket=hedge_ticket)
                 logger.info(f"Closed {hedge_pos.ticket}:{hedged_order.ticket}@{hedge_pos.profit} hedge in loss")
                 orders.pop(hedge_ticket, None)
     except Exception as exe:
@@ -0,0 +1,75 @@
+from logging import getLogger
+
+from aiomql import Positions, TradePosition
+
+from ..utils.account_state import account_state
+from ..utils.exposure import exposure_index
+
+logger = getLogger(__name__)
+
+
+class PositionSnapshot:
+    """Open positions taken with a single query at the start of a monitor cycle.
+
+    Order trackers read positions from the snapshot instead of querying the terminal per order. A position is only
+    fetched again after it has been marked stale, which is done when a modification of the position succeeds. Every
+    snapshot also rebuilds the exposure index the limits of the RAM are checked against.
+
+    Attributes:
+        positions (dict[int, TradePosition]): Open positions by ticket.
+        stale (set[int]): Tickets whose positions have changed since the snapshot was taken.
+    """
+    positions: dict[int, TradePosition]
+    stale: set[int]
+
+    def __init__(self, *, positions: list[TradePosition] = None):
+        self.positions = {position.ticket: position for position in positions or []}
+        self.stale = set()
+        self.pos = Positions()
+
+    @classmethod
+    async def take(cls) -> 'PositionSnapshot':
+        since = exposure_index.clock()
+        positions = await Positions().positions_get()
+        exposure_index.update(positions=positions, since=since)
+        return cls(positions=positions)
+
+    def __iter__(self):
+        return iter(self.positions.values())
+
+    def __contains__(self, ticket: int) -> bool:
+        return ticket in self.positions
+
+    async def get(self, *, ticket: int) -> TradePosition | None:
+        """Get an open position by ticket, fetching it again only if it was marked stale.
+
+        Args:
+            ticket (int): Position ticket
+
+        Returns:
+            TradePosition | None: The position or None if it is no longer open
+        """
+        if ticket in self.stale:
+            await self.refresh(ticket=ticket)
+        return self.positions.get(ticket)
+
+    async def refresh(self, *, ticket: int):
+        positions = await self.pos.positions_get(ticket=ticket)
+        self.stale.discard(ticket)
+        if positions:
+            self.positions[ticket] = positions[0]
+            exposure_index.modified(position=positions[0])
+        else:
+            self.positions.pop(ticket, None)
+            exposure_index.closed(ticket=ticket)
+
+    def mark_stale(self, *, ticket: int):
+        """Mark a position as modified so the next read fetches it from the terminal."""
+        self.stale.add(ticket)
+
+    def discard(self, *, ticket: int):
+        """Remove a position that has been closed."""
+        self.positions.pop(ticket, None)
+        self.stale.discard(ticket)
+        account_state.invalidate()
+        exposure_index.closed(ticket=ticket)
@@ -3,7 +3,12 @@ from dataclasses import dataclass
 from copy import deepcopy
 from logging import getLogger
 
-from aiomql import TradePosition, Config
+from aiomql import TradePosition, Config, Positions
+
+from .position_snapshot import PositionSnapshot
+from ..utils.account_state import account_state
+from ..utils.exposure import exposure_index
+from ..utils.metrics import closer
 
 logger = getLogger(__name__)
 
@@ -42,13 +47,38 @@ class OpenOrder:
     target_loss: float = None
     base_profit: float = None
     position: TradePosition = None
+    snapshot: PositionSnapshot = None
     config: Config = Config()
 
     @property
     def data(self) -> dict:
-        exclude = {'hedged_order', 'position', 'config', 'ticket'}
+        exclude = {'hedged_order', 'position', 'snapshot', 'config', 'ticket'}
         return {k: deepcopy(v) for k, v in self.__dict__.items() if k not in exclude}
 
+    async def get_position(self) -> TradePosition | None:
+        """The open position of the order. Read from the snapshot of the current monitor cycle when there is one,
+        otherwise fetched from the terminal. Returns None if the position has been closed."""
+        if self.snapshot is not None:
+            position = await self.snapshot.get(ticket=self.ticket)
+        else:
+            positions = await Positions().positions_get(ticket=self.ticket)
+            position = positions[0] if positions else None
+        if position is not None:
+            self.position = position
+        return position
+
+    def modified(self):
+        """Mark the position as changed after a successful modification, so it is fetched again when next read."""
+        if self.snapshot is not None:
+            self.snapshot.mark_stale(ticket=self.ticket)
+
+    def closed(self):
+        if self.snapshot is not None:
+            self.snapshot.discard(ticket=self.ticket)
+        else:
+            account_state.invalidate()
+            exposure_index.closed(ticket=self.ticket)
+
     def update(self, **kwargs):
         [setattr(self, key, value) for key, value in kwargs.items() if key in self.__dict__]
 
@@ -59,24 +89,33 @@ class TrackOrder:
     def __init__(self, *, order: OpenOrder):
         self.order = order
 
-    async def track(self):
+    async def track(self, *, snapshot: PositionSnapshot = None):
         try:
+            if snapshot is not None:
+                self.order.snapshot = snapshot
+
             if self.order.position.profit < 0 and self.order.hedge_order and self.order.hedger is not None:
-                await self.order.hedger(order=self.order)
+                with closer(self.order.hedger, symbol=self.order.symbol):
+                    await self.order.hedger(order=self.order)
 
             if self.order.hedged and self.order.hedged_order is not None:
-                await self.order.hedge_tracker(hedge=self.order)
+                with closer(self.order.hedge_tracker, symbol=self.order.symbol):
+                    await self.order.hedge_tracker(hedge=self.order)
 
             if self.order.use_exit_signal and self.order.exit_function is not None:
-                await self.order.exit_function(order=self.order)
+                with closer(self.order.exit_function, symbol=self.order.symbol):
+                    await self.order.exit_function(order=self.order)
 
             if self.order.position.profit > 0 and self.order.track_profit and self.order.profit_tracker is not None:
-                await self.order.profit_tracker(order=self.order)
+                with closer(self.order.profit_tracker, symbol=self.order.symbol):
+                    await self.order.profit_tracker(order=self.order)
 
             if self.order.position.profit < 0 and self.order.track_loss and self.order.loss_tracker is not None:
-                await self.order.loss_tracker(order=self.order)
+                with closer(self.order.loss_tracker, symbol=self.order.symbol):
+                    await self.order.loss_tracker(order=self.order)
 
             if self.order.check_profit and self.order.profit_checker is not None:
-                await self.order.profit_checker(order=self.order)
+                with closer(self.order.profit_checker, symbol=self.order.symbol):
+                    await self.order.profit_checker(order=self.order)
         except Exception as exe:
             logger.error(f"Error tracking order: {exe}: {exe.__traceback__.tb_lineno}")
@@ -1,36 +1,81 @@
 import asyncio
 from logging import getLogger
+from time import time
 
-from aiomql import Positions
+from aiomql import Config, TradePosition
 
+from ..utils.account_state import account_state
 from ..utils.sleep import sleep
-from .track_order import TrackOrder
+from ..utils.symbol_registry import symbol_registry
+from .track_order import TrackOrder, OpenOrder
+from .position_snapshot import PositionSnapshot
 
 logger = getLogger(__name__)
 
 
-async def monitor(*, tf: int = 31):
+async def monitor(*, tf: int = 31, event_driven: bool = None, poll: float = 1, points: float = 10,
+                  profit_change: float = 0.05):
+    """Track open orders.
+
+    By default every tracked position is handed to its trackers every tf seconds. In event driven mode the positions
+    are polled every poll seconds and an order is tracked only when its price has moved by points, or its profit by
+    profit_change of its expected profit, since it was last tracked. An order that has not been tracked for tf seconds
+    is tracked regardless. Event driven mode can also be set with `event_monitor` in the config.
+
+    Args:
+        tf (int): Seconds between tracking cycles, the fallback interval in event driven mode
+        event_driven (bool): Use event driven mode
+        poll (float): Seconds between position polls in event driven mode
+        points (float): Price change in points that triggers tracking
+        profit_change (float): Change in profit, as a fraction of the expected profit, that triggers tracking
+    """
     print('Trade Monitoring started')
-    pos = Positions()
-    config = pos.mt5.config
+    config = Config()
+    event_driven = getattr(config, 'event_monitor', False) if event_driven is None else event_driven
+    last_tracked: dict[int, tuple[float, float, float]] = {}
     while True:
         try:
             tasks = []
-            positions = await pos.positions_get()
+            snapshot = await PositionSnapshot.take()
             track = getattr(config, 'track_orders', True)
             if track:
+                now = time()
                 tracked_orders = config.state['tracked_orders']
                 open_orders = {}
-                for position in positions:
+                for position in snapshot:
                     if (ticket := position.ticket) in tracked_orders:
                         open_order = tracked_orders[ticket]
-                        open_order.position = position
-                        tasks.append(TrackOrder(order=open_order).track())
                         open_orders[ticket] = open_order
+                        if event_driven and not await moved(order=open_order, position=position, now=now, tf=tf,
+                                                            last=last_tracked.get(ticket), points=points,
+                                                            profit_change=profit_change):
+                            continue
+                        last_tracked[ticket] = position.price_current, position.profit, now
+                        open_order.position = position
+                        tasks.append(TrackOrder(order=open_order).track(snapshot=snapshot))
+                # positions closed by the terminal, on their stop loss or take profit, have changed the account
+                if len(open_orders) < len(tracked_orders):
+                    account_state.invalidate()
                 config.state['tracked_orders'] = open_orders
+                last_tracked = {ticket: last for ticket, last in last_tracked.items() if ticket in open_orders}
 
             await asyncio.gather(*tasks, return_exceptions=True)
-            await sleep(tf)
+            await asyncio.sleep(poll) if event_driven else await sleep(tf)
         except Exception as exe:
             logger.error(f'An error occurred in function monitor {exe}')
-            await sleep(tf)
+            await asyncio.sleep(poll) if event_driven else await sleep(tf)
+
+
+async def moved(*, order: OpenOrder, position: TradePosition, last: tuple[float, float, float] | None, now: float,
+                tf: int, points: float, profit_change: float) -> bool:
+    """Check if a position has changed enough since it was last tracked to be tracked again."""
+    if last is None:
+        return True
+    price, profit, tracked = last
+    if now - tracked >= tf:
+        return True
+    expected_profit = abs(order.target_profit or order.expected_profit)
+    if expected_profit and abs(position.profit - profit) >= profit_change * expected_profit:
+        return True
+    symbol = await symbol_registry.get(name=position.symbol)
+    return abs(position.price_current - price) >= points * symbol.point
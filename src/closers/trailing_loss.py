@@ -1,8 +1,9 @@
 from logging import getLogger
 
-from aiomql import Positions, Symbol, OrderType, Order, TradeAction
+from aiomql import OrderType, Order, TradeAction
 
-from ..utils.order_utils import calc_profit
+from ..utils.order_utils import calc_profit, fit_stops, stops_frozen
+from ..utils.symbol_registry import symbol_registry
 from .track_order import OpenOrder
 
 logger = getLogger(__name__)
@@ -23,35 +24,39 @@ async def trail_sl(*, order: OpenOrder):
                      f'failed due to {exe}{exe.__traceback__.tb_lineno}')
 
 
-async def modify_sl(*, order: OpenOrder, extra: float = 0.0, tries: int = 4):
+async def modify_sl(*, order: OpenOrder):
     try:
         position = order.position
-        sym = Symbol(name=position.symbol)
-        await sym.init()
-        pos = Positions()
-        position = await pos.position_get(ticket=position.ticket)
+        sym = await symbol_registry.get(name=position.symbol)
+        position = await order.get_position()
         params = order.track_loss_params
         trail = 1 - params['trail_start']
         full_points = abs(position.price_open - position.sl) / sym.point
         sl_points = full_points * trail
-        min_points = sym.trade_stops_level + sym.spread * (1 + extra)
+        min_points = sym.trade_stops_level + sym.spread
         sl_points = max(sl_points*2, min_points)
         sl_value = round(sl_points * sym.point, sym.digits)
         if position.type == OrderType.BUY:
             sl = position.sl - sl_value
         else:
             sl = position.sl + sl_value
-        trade_order = Order(position=position.ticket, sl=sl, tp=position.tp, action=TradeAction.SLTP)
+        tick = await sym.info_tick()
+        if stops_frozen(sym=sym, position=position, tick=tick):
+            logger.debug(f"Stops of {position.symbol}:{position.ticket} are within the freeze level")
+            return
+        sl, tp = fit_stops(sym=sym, order_type=position.type, tick=tick, sl=sl, tp=position.tp)
+        if sl == position.sl and tp == position.tp:
+            return
+        trade_order = Order(position=position.ticket, sl=sl, tp=tp, action=TradeAction.SLTP)
         res = await trade_order.send()
         if res.retcode == 10009:
             params['previous_profit'] = position.profit
+            order.modified()
             req = res.request
             loss = calc_profit(sym=sym, open_price=position.price_open, close_price=req.sl, volume=position.volume,
                                order_type=position.type)
             order.expected_loss = loss
             logger.info(f"Trailing stop loss for {position.symbol}:{position.ticket} successful. New loss is {loss}")
-        elif res.retcode == 10016 and tries > 0:
-            await modify_sl(order=order, extra=extra + 0.01, tries=tries - 1)
         else:
             logger.error(f"Trailing stop loss failed due to {res.comment} for {position.symbol}:{position.ticket}")
     except Exception as exe:
@@ -1,8 +1,9 @@
 from logging import getLogger
 
-from aiomql import Order, TradeAction, OrderType, TradePosition, Symbol, Positions, OrderSendResult
+from aiomql import Order, TradeAction, OrderType, TradePosition, OrderSendResult
 
-from ..utils.order_utils import calc_profit
+from ..utils.order_utils import calc_profit, fit_stops, stops_frozen
+from ..utils.symbol_registry import symbol_registry
 from .track_order import OpenOrder
 logger = getLogger(__name__)
 
@@ -15,20 +16,18 @@ async def trail_tp(*, order: OpenOrder):
         trail_start = params['trail_start'] * order.expected_profit
         previous_profit = params['previous_profit']
         if start_trailing and (position.profit >= max(trail_start, previous_profit)):
-            symbol = Symbol(name=position.symbol)
-            await symbol.init()
             await modify_stops(order=order)
     except Exception as exe:
         logger.error(f"{exe}@{exe.__traceback__.tb_lineno} in modify_stop for {order.position.symbol}:{order.ticket}")
 
 
-async def modify_stops(*, order: OpenOrder, extra: float = 0.0, tries: int = 4):
+async def modify_stops(*, order: OpenOrder):
     try:
-        pos = Positions()
-        position = await pos.position_get(ticket=order.ticket)
+        position = await order.get_position()
+        if position is None:
+            return
         params = order.track_profit_params
-        sym = Symbol(name=position.symbol)
-        await sym.init()
+        sym = await symbol_registry.get(name=position.symbol)
         expected_profit = order.target_profit or order.expected_profit
         full_points = int(abs(position.price_open - position.tp) / sym.point)
         trail = params['trail']
@@ -36,7 +35,7 @@ async def modify_stops(*, order: OpenOrder, extra: float = 0.0, tries: int = 4):
         extend_start = params['extend_start']
         extend = 1 - extend_start
         sl_points = trail * captured_points
-        stops_level = int(sym.trade_stops_level + sym.spread * (1 + extra))
+        stops_level = sym.trade_stops_level + sym.spread
         sl_points = max(sl_points, stops_level)
         sl_value = round(sl_points * sym.point, sym.digits)
         tp_points = full_points * extend
@@ -73,9 +72,17 @@ async def modify_stops(*, order: OpenOrder, extra: float = 0.0, tries: int = 4):
         if change_sl is False and change_tp is False:
             return
 
+        if stops_frozen(sym=sym, position=position, tick=tick):
+            logger.debug(f"Stops of {position.symbol}:{position.ticket} are within the freeze level")
+            return
+        sl, tp = fit_stops(sym=sym, order_type=position.type, tick=tick, sl=sl, tp=tp)
+        if sl == position.sl and tp == position.tp:
+            return
+
         res = await send_order(position=position, sl=sl, tp=tp)
         if res.retcode == 10009:
             params['previous_profit'] = position.profit
+            order.modified()
             logger.info(f"Modified sl for {position.symbol}:{position.ticket} to {sl}")
             if change_tp:
                 new_profit = calc_profit(sym=sym, open_price=position.price_open, close_price=position.tp,
@@ -83,8 +90,6 @@ async def modify_stops(*, order: OpenOrder, extra: float = 0.0, tries: int = 4):
                 order.expected_profit = new_profit
                 logger.info(f"Extended take profit target for {position.symbol}:{position.ticket} to {tp}")
 
-        elif res.retcode == 10016 and tries > 0:
-            await modify_stops(order=order, extra=(extra + 0.01), tries=tries - 1)
         else:
             logger.error(f"Unable to place order due to {res.comment} for {position.symbol}:{position.ticket}")
     except Exception as exe:
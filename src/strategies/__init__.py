@@ -1,4 +1,4 @@
-from .finger_adx import FingerADX
+from .finger_adx import FingerADX, FingerADXBatch
 from .ffatr import FFATR
 from .adx_crossing import ADXCrossing
 from .finger_trap import FingerTrap
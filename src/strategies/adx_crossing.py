@@ -1,9 +1,13 @@
 from logging import getLogger
-import asyncio
 
 from aiomql import Symbol, Strategy, TimeFrame, Sessions, OrderType, Trader
 
 from ..utils.tracker import Tracker
+from ..utils.bar_scheduler import bar_scheduler
+from ..utils.candle_cache import candle_cache
+from ..utils.decision_journal import decision_journal
+from ..utils.indicators import indicator_engine
+from ..utils import signals, metrics
 from ..utils.top_bottom import double_top, double_bottom
 from ..closers.adx_closer import adx_closer
 from ..traders.sp_trader import SPTrader
@@ -36,17 +40,19 @@ class ADXCrossing(Strategy):
 
     async def check_trend(self):
         try:
-            candles = await self.symbol.copy_rates_from_pos(timeframe=self.etf, count=self.ecc)
+            candles = await candle_cache.get(symbol=self.symbol, timeframe=self.etf, count=self.ecc)
             if (current := candles[-1].time) < self.tracker.entry_time:
                 self.tracker.update(new=False, order_type=None)
                 return
             self.tracker.update(new=True, entry_time=current, order_type=None)
-            candles.ta.adx(length=self.adx, append=True, mamode='ema')
-            candles.ta.atr(append=True, length=self.atr_length)
+            indicator_engine.apply(candles, symbol=self.symbol.name, timeframe=self.etf,
+                                   kind='adx', length=self.adx, mamode='ema')
+            indicator_engine.apply(candles, symbol=self.symbol.name, timeframe=self.etf,
+                                   kind='atr', length=self.atr_length)
             candles.rename(inplace=True, **{f"ADX_{self.adx}": "adx", f"DMP_{self.adx}": "dmp",
                                             f"DMN_{self.adx}": "dmn", f"ATRr_{self.atr_length}": "atr"})
-            candles['pxn'] = candles.ta_lib.cross(candles.dmp, candles.dmn, asint=False)
-            candles['nxp'] = candles.ta_lib.cross(candles.dmn, candles.dmp, asint=False)
+            candles['pxn'] = signals.cross(candles.dmp, candles.dmn, asint=False, window=1)
+            candles['nxp'] = signals.cross(candles.dmn, candles.dmp, asint=False, window=1)
             current = candles[-1]
             if current.adx > self.adx_cutoff and current.pxn:
                 self.tracker.update(trend="bullish")
@@ -73,6 +79,9 @@ class ADXCrossing(Strategy):
             logger.error(f"{exe} for {self.symbol} in {self.__class__.__name__}.check_trend")
             self.tracker.update(snooze=self.interval.time, order_type=None)
 
+    async def sleep(self, secs: float):
+        await bar_scheduler.wait(symbol=self.symbol, secs=secs)
+
     async def trade(self):
         print(f"Trading {self.symbol} with {self.name}")
         async with self.sessions as sess:
@@ -80,15 +89,17 @@ class ADXCrossing(Strategy):
             while True:
                 await sess.check()
                 try:
-                    await self.check_trend()
+                    with metrics.cycle(self), decision_journal.evaluation(self):
+                        await self.check_trend()
                     if not self.tracker.new:
-                        await asyncio.sleep(2)
+                        await self.sleep(self.etf.time)
                         continue
                     if self.tracker.order_type is None:
                         await self.sleep(self.tracker.snooze)
                         continue
-                    await self.trader.place_trade(order_type=self.tracker.order_type, sl=self.tracker.sl,
-                                                  tp=self.tracker.tp, parameters=self.parameters)
+                    with metrics.timed(self, 'place_trade'):
+                        await self.trader.place_trade(order_type=self.tracker.order_type, sl=self.tracker.sl,
+                                                      tp=self.tracker.tp, parameters=self.parameters)
                     await self.sleep(self.tracker.snooze)
                 except Exception as err:
                     logger.error(f"{err} for {self.symbol} in {self.__class__.__name__}.trade")
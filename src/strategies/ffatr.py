@@ -1,9 +1,14 @@
 from logging import getLogger
-import asyncio
 
 from aiomql import Symbol, Strategy, TimeFrame, Sessions, OrderType, Trader
 
 from ..utils.tracker import Tracker
+from ..utils.bar_scheduler import bar_scheduler
+from ..utils.candle_cache import candle_cache
+from ..utils.decision_journal import decision_journal
+from ..utils.candle_view import CandleView
+from ..utils.indicators import indicator_engine
+from ..utils import signals, metrics
 from ..closers.adx_closer import adx_closer
 from ..closers.chandelier_exit import chandelier_trailer
 from ..traders.sp_trader import SPTrader
@@ -27,6 +32,7 @@ class FFATR(Strategy):
     hcc: int
     trader: Trader
     tracker: Tracker
+    requirements: list[tuple[TimeFrame, int]]
     lower_interval: TimeFrame
     higher_interval: TimeFrame
     timeout: TimeFrame = TimeFrame.H12
@@ -42,22 +48,25 @@ class FFATR(Strategy):
         super().__init__(symbol=symbol, params=params, sessions=sessions, name=name)
         self.trader = trader or SPTrader(symbol=self.symbol, profit_tracker=chandelier_trailer)
         self.tracker: Tracker = Tracker(snooze=self.ttf.time)
+        self.requirements = [(self.ttf, self.tcc), (self.htf, self.hcc), (self.etf, self.ecc)]
 
     async def check_trend(self):
         try:
-            candles = await self.symbol.copy_rates_from_pos(timeframe=self.ttf, count=self.tcc)
-            c_candles = await self.symbol.copy_rates_from_pos(timeframe=self.htf, count=self.hcc)
-            e_candles = await self.symbol.copy_rates_from_pos(timeframe=self.etf, count=self.ecc)
-            if (current := candles[-1].time) < self.tracker.trend_time:
+            frames = await candle_cache.frames(symbol=self.symbol, counts=self.requirements,
+                                               since=self.tracker.trend_time)
+            if not frames:
                 self.tracker.update(new=False, order_type=None)
                 return
+            candles, c_candles, e_candles = frames
+            current = candles[-1].time
             self.tracker.update(new=True, trend_time=current, order_type=None)
-            c_candles.ta.sma(length=self.trend_ema, append=True)
-            c_candles.ta.adx(append=True)
+            indicator_engine.apply(c_candles, symbol=self.symbol.name, timeframe=self.htf,
+                                   kind='sma', length=self.trend_ema)
+            indicator_engine.apply(c_candles, symbol=self.symbol.name, timeframe=self.htf, kind='adx')
             c_candles.rename(inplace=True, **{f"SMA_{self.trend_ema}": "ema", "ADX_14": "adx", "DMP_14": "dmp",
                                               "DMN_14": "dmn"})
-            c_candles['cae'] = c_candles.ta_lib.above(c_candles.close, c_candles.ema, asint=False)
-            c_candles['cbe'] = c_candles.ta_lib.below(c_candles.close, c_candles.ema, asint=False)
+            c_candles['cae'] = signals.above(c_candles.close, c_candles.ema, asint=False, window=1)
+            c_candles['cbe'] = signals.below(c_candles.close, c_candles.ema, asint=False, window=1)
 
             c_current = c_candles[-1]
             if c_current.cae and c_current.adx >= 25 and c_current.dmp > c_current.dmn:
@@ -68,19 +77,21 @@ class FFATR(Strategy):
                 self.tracker.update(trend="ranging", snooze=self.higher_interval.time, order_type=None)
                 return
 
-            candles.ta.ema(length=self.first_ema, append=True)
-            candles.ta.ema(length=self.second_ema, append=True)
-            candles.ta.atr(append=True)
-            candles.ta.adx(append=True)
-            e_candles.ta.adx(append=True)
+            indicator_engine.apply(candles, symbol=self.symbol.name, timeframe=self.ttf,
+                                   kind='ema', length=self.first_ema)
+            indicator_engine.apply(candles, symbol=self.symbol.name, timeframe=self.ttf,
+                                   kind='ema', length=self.second_ema)
+            indicator_engine.apply(candles, symbol=self.symbol.name, timeframe=self.ttf, kind='atr')
+            indicator_engine.apply(candles, symbol=self.symbol.name, timeframe=self.ttf, kind='adx')
+            indicator_engine.apply(e_candles, symbol=self.symbol.name, timeframe=self.etf, kind='adx')
             e_candles.rename(inplace=True, **{f"ADX_14": "adx", "DMP_14": "dmp", "DMN_14": "dmn"})
             candles.rename(inplace=True, **{f"EMA_{self.first_ema}": "first", f"EMA_{self.second_ema}": "second",
                                             "ADX_14": "adx", "DMP_14": "dmp", "DMN_14": "dmn",
                                             f"ATRr_{self.atr_length}": "atr"})
-            candles['caf'] = candles.ta_lib.above(candles.close, candles.first, asint=False)
-            candles['fas'] = candles.ta_lib.above(candles.first, candles.second, asint=False)
-            candles['cbf'] = candles.ta_lib.below(candles.close, candles.first, asint=False)
-            candles['fbs'] = candles.ta_lib.below(candles.first, candles.second, asint=False)
+            candles['caf'] = signals.above(candles.close, candles.first, asint=False, window=1)
+            candles['fas'] = signals.above(candles.first, candles.second, asint=False, window=1)
+            candles['cbf'] = signals.below(candles.close, candles.first, asint=False, window=1)
+            candles['fbs'] = signals.below(candles.first, candles.second, asint=False, window=1)
 
             current = candles[-1]
             prev = candles[-2]
@@ -91,26 +102,22 @@ class FFATR(Strategy):
             up_trend = current.adx >= 25 and current.dmp > current.dmn and higher_high and above
             down_trend = current.adx >= 25 and current.dmn > current.dmp and lower_low and below
             if self.tracker.bullish and up_trend:
-                e_candles['pxn'] = e_candles.ta_lib.cross(e_candles.dmp, e_candles.dmn, asint=False)
-                for candle in reversed(e_candles):
-                    if candle.pxn:
-                        sl = candle.low
-                        break
+                e_candles['pxn'] = signals.cross(e_candles.dmp, e_candles.dmn, asint=False)
+                if (candle := CandleView(e_candles).find_last('pxn')) is not None:
+                    sl = candle.low
                 else:
                     logger.info(f"No crossover entry found for {self.symbol} in {self.__class__.__name__}")
-                    sl = max(candles.high.iloc[-self.ce_period:]) - (self.atr_multiplier * current.atr)
+                    sl = CandleView(candles).highest(self.ce_period) - (self.atr_multiplier * current.atr)
                 tp = current.close + (current.close - sl) * self.trader.ram.risk_to_reward
                 self.tracker.update(snooze=self.timeout.time, order_type=OrderType.BUY, sl=sl, tp=tp)
 
             elif self.tracker.bearish and down_trend:
-                e_candles['nxp'] = e_candles.ta_lib.cross(e_candles.dmn, e_candles.dmp, asint=False)
-                for candle in reversed(e_candles):
-                    if candle.nxp:
-                        sl = candle.high
-                        break
+                e_candles['nxp'] = signals.cross(e_candles.dmn, e_candles.dmp, asint=False)
+                if (candle := CandleView(e_candles).find_last('nxp')) is not None:
+                    sl = candle.high
                 else:
                     logger.info(f"No crossover entry found for {self.symbol} in {self.__class__.__name__}")
-                    sl = min(candles.low.iloc[-self.ce_period:]) + (self.atr_multiplier * current.atr)
+                    sl = CandleView(candles).lowest(self.ce_period) + (self.atr_multiplier * current.atr)
                 tp = current.close - (sl - current.close) * self.trader.ram.risk_to_reward
                 self.tracker.update(snooze=self.timeout.time, order_type=OrderType.SELL, sl=sl, tp=tp)
             else:
@@ -119,6 +126,9 @@ class FFATR(Strategy):
             logger.error(f"{exe} for {self.symbol} in {self.__class__.__name__}.check_trend")
             self.tracker.update(snooze=self.lower_interval.time, order_type=None)
 
+    async def sleep(self, secs: float):
+        await bar_scheduler.wait(symbol=self.symbol, secs=secs)
+
     async def trade(self):
         logger.info(f"Trading {self.symbol} with {self.name}")
         async with self.sessions as sess:
@@ -126,15 +136,17 @@ class FFATR(Strategy):
             while True:
                 await sess.check()
                 try:
-                    await self.check_trend()
+                    with metrics.cycle(self), decision_journal.evaluation(self):
+                        await self.check_trend()
                     if not self.tracker.new:
-                        await asyncio.sleep(2)
+                        await self.sleep(self.ttf.time)
                         continue
                     if self.tracker.order_type is None:
                         await self.sleep(self.tracker.snooze)
                         continue
-                    await self.trader.place_trade(order_type=self.tracker.order_type, sl=self.tracker.sl,
-                                                  tp=self.tracker.tp, parameters=self.parameters)
+                    with metrics.timed(self, 'place_trade'):
+                        await self.trader.place_trade(order_type=self.tracker.order_type, sl=self.tracker.sl,
+                                                      tp=self.tracker.tp, parameters=self.parameters)
                     await self.sleep(self.tracker.snooze)
                 except Exception as err:
                     logger.error(f"{err} for {self.symbol} in {self.__class__.__name__}.trade")
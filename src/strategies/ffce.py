@@ -1,9 +1,14 @@
 from logging import getLogger
-import asyncio
 
 from aiomql import Symbol, Strategy, TimeFrame, Sessions, OrderType, Trader
 
 from ..utils.tracker import Tracker
+from ..utils.bar_scheduler import bar_scheduler
+from ..utils.candle_cache import candle_cache
+from ..utils.decision_journal import decision_journal
+from ..utils.candle_view import CandleView
+from ..utils.indicators import indicator_engine
+from ..utils import signals, metrics
 from ..closers.adx_closer import adx_closer
 from ..closers.chandelier_exit import chandelier_trailer
 from ..traders.sp_trader import SPTrader
@@ -29,6 +34,7 @@ class FFCE(Strategy):
     cecc: int
     trader: Trader
     tracker: Tracker
+    requirements: list[tuple[TimeFrame, int]]
     lower_interval: TimeFrame = TimeFrame.M15
     higher_interval: TimeFrame = TimeFrame.H2
     timeout: TimeFrame = TimeFrame.H12
@@ -44,22 +50,25 @@ class FFCE(Strategy):
         self.trader = trader or SPTrader(symbol=self.symbol, profit_tracker=chandelier_trailer, track_loss=False,
                                          hedge_order=False, track_profit_params={'trail_start': 0})
         self.tracker: Tracker = Tracker(snooze=self.ttf.time)
+        self.requirements = [(self.ttf, self.tcc), (self.htf, self.hcc), (self.cetf, self.cecc)]
 
     async def check_trend(self):
         try:
-            candles = await self.symbol.copy_rates_from_pos(timeframe=self.ttf, count=self.tcc)
-            c_candles = await self.symbol.copy_rates_from_pos(timeframe=self.htf, count=self.hcc)
-            ce_candles = await self.symbol.copy_rates_from_pos(timeframe=self.cetf, count=self.cecc)
-            if (current := candles[-1].time) < self.tracker.trend_time:
+            frames = await candle_cache.frames(symbol=self.symbol, counts=self.requirements,
+                                               since=self.tracker.trend_time)
+            if not frames:
                 self.tracker.update(new=False, order_type=None)
                 return
+            candles, c_candles, ce_candles = frames
+            current = candles[-1].time
             self.tracker.update(new=True, trend_time=current, order_type=None)
-            c_candles.ta.ema(length=self.trend_ema, append=True)
-            c_candles.ta.adx(append=True)
+            indicator_engine.apply(c_candles, symbol=self.symbol.name, timeframe=self.htf,
+                                   kind='ema', length=self.trend_ema)
+            indicator_engine.apply(c_candles, symbol=self.symbol.name, timeframe=self.htf, kind='adx')
             c_candles.rename(inplace=True, **{f"EMA_{self.trend_ema}": "ema", "ADX_14": "adx", "DMP_14": "dmp",
                                               "DMN_14": "dmn"})
-            c_candles['cae'] = c_candles.ta_lib.above(c_candles.close, c_candles.ema, asint=False)
-            c_candles['cbe'] = c_candles.ta_lib.below(c_candles.close, c_candles.ema, asint=False)
+            c_candles['cae'] = signals.above(c_candles.close, c_candles.ema, asint=False, window=1)
+            c_candles['cbe'] = signals.below(c_candles.close, c_candles.ema, asint=False, window=1)
 
             c_current = c_candles[-1]
             if c_current.cae and c_current.adx >= 25 and c_current.dmp > c_current.dmn:
@@ -70,19 +79,21 @@ class FFCE(Strategy):
                 self.tracker.update(trend="ranging", snooze=self.higher_interval.time, order_type=None)
                 return
 
-            candles.ta.ema(length=self.first_ema, append=True)
-            candles.ta.ema(length=self.second_ema, append=True)
-            candles.ta.atr(append=True)
-            candles.ta.adx(append=True)
+            indicator_engine.apply(candles, symbol=self.symbol.name, timeframe=self.ttf,
+                                   kind='ema', length=self.first_ema)
+            indicator_engine.apply(candles, symbol=self.symbol.name, timeframe=self.ttf,
+                                   kind='ema', length=self.second_ema)
+            indicator_engine.apply(candles, symbol=self.symbol.name, timeframe=self.ttf, kind='atr')
+            indicator_engine.apply(candles, symbol=self.symbol.name, timeframe=self.ttf, kind='adx')
             candles.rename(inplace=True, **{f"EMA_{self.first_ema}": "first", f"EMA_{self.second_ema}": "second",
                                             "ADX_14": "adx", "DMP_14": "dmp", "DMN_14": "dmn",
                                             f"ATRr_{self.atr_length}": "atr"})
-            candles['caf'] = candles.ta_lib.above(candles.close, candles.first, asint=False)
-            candles['fas'] = candles.ta_lib.above(candles.first, candles.second, asint=False)
-            candles['cbf'] = candles.ta_lib.below(candles.close, candles.first, asint=False)
-            candles['fbs'] = candles.ta_lib.below(candles.first, candles.second, asint=False)
+            candles['caf'] = signals.above(candles.close, candles.first, asint=False, window=1)
+            candles['fas'] = signals.above(candles.first, candles.second, asint=False, window=1)
+            candles['cbf'] = signals.below(candles.close, candles.first, asint=False, window=1)
+            candles['fbs'] = signals.below(candles.first, candles.second, asint=False, window=1)
 
-            ce_candles.ta.atr(append=True, mamode='ema')
+            indicator_engine.apply(ce_candles, symbol=self.symbol.name, timeframe=self.cetf, kind='atr', mamode='ema')
             ce_candles.rename(**{f"ATRe_{self.atr_length}": "atr"})
             current = candles[-1]
             prev = candles[-2]
@@ -92,13 +103,14 @@ class FFCE(Strategy):
             lower_low = current.low < prev.low or current.high < prev.high or current.dmn > prev.dmn
             up_trend = current.adx >= 25 and current.dmp > current.dmn and higher_high and above
             down_trend = current.adx >= 25 and current.dmn > current.dmp and lower_low and below
-            ce_current = ce_candles[-1]
+            ce_view = CandleView(ce_candles)
+            ce_current = ce_view[-1]
             if self.tracker.bullish and up_trend:
-                sl = max(ce_candles.high.iloc[-self.ce_period:]) - self.atr_multiplier * ce_current.atr
+                sl = ce_view.highest(self.ce_period) - self.atr_multiplier * ce_current.atr
                 tp = current.close + ((current.close - sl) * self.trader.ram.risk_to_reward)
                 self.tracker.update(snooze=self.timeout.time, order_type=OrderType.BUY, sl=sl, tp=tp)
             elif self.tracker.bearish and down_trend:
-                sl = min(ce_candles.low.iloc[-self.ce_period:]) + self.atr_multiplier * ce_current.atr
+                sl = ce_view.lowest(self.ce_period) + self.atr_multiplier * ce_current.atr
                 tp = current.close - ((sl - current.close) * self.trader.ram.risk_to_reward)
                 self.tracker.update(snooze=self.timeout.time, order_type=OrderType.SELL, sl=sl, tp=tp)
             else:
@@ -107,6 +119,9 @@ class FFCE(Strategy):
             logger.error(f"{exe} for {self.symbol} in {self.__class__.__name__}.check_trend")
             self.tracker.update(snooze=self.lower_interval.time, order_type=None)
 
+    async def sleep(self, secs: float):
+        await bar_scheduler.wait(symbol=self.symbol, secs=secs)
+
     async def trade(self):
         logger.info(f"Trading {self.symbol} with {self.name}")
         async with self.sessions as sess:
@@ -114,15 +129,17 @@ class FFCE(Strategy):
             while True:
                 await sess.check()
                 try:
-                    await self.check_trend()
+                    with metrics.cycle(self), decision_journal.evaluation(self):
+                        await self.check_trend()
                     if not self.tracker.new:
-                        await asyncio.sleep(2)
+                        await self.sleep(self.ttf.time)
                         continue
                     if self.tracker.order_type is None:
                         await self.sleep(self.tracker.snooze)
                         continue
-                    await self.trader.place_trade(order_type=self.tracker.order_type, sl=self.tracker.sl,
-                                                  tp=self.tracker.tp, parameters=self.parameters)
+                    with metrics.timed(self, 'place_trade'):
+                        await self.trader.place_trade(order_type=self.tracker.order_type, sl=self.tracker.sl,
+                                                      tp=self.tracker.tp, parameters=self.parameters)
                     await self.sleep(self.tracker.snooze)
                 except Exception as err:
                     logger.error(f"{err} for {self.symbol} in {self.__class__.__name__}.trade")
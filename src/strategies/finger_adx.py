@@ -1,9 +1,19 @@
-from logging import getLogger
 import asyncio
+from concurrent.futures import Future
+from dataclasses import dataclass
+from logging import getLogger
+from threading import Lock
 
+import numpy as np
 from aiomql import Symbol, Strategy, TimeFrame, Sessions, OrderType, Trader
 
 from ..utils.tracker import Tracker
+from ..utils.bar_scheduler import bar_scheduler
+from ..utils.candle_cache import candle_cache
+from ..utils.decision_journal import decision_journal
+from ..utils.indicators import indicator_engine
+from ..utils.batch_indicators import ema, sma, adx
+from ..utils import signals, metrics
 from ..utils.top_bottom import double_top, double_bottom
 from ..traders.p_trader import PTrader
 
@@ -23,46 +33,60 @@ class FingerADX(Strategy):
     tcc: int
     trader: Trader
     tracker: Tracker
+    requirements: list[tuple[TimeFrame, int]]
+    batch: 'FingerADXBatch'
     interval: TimeFrame = TimeFrame.M15
     timeout: TimeFrame = TimeFrame.H2
     parameters = {"first_ema": 8, "second_ema": 16, "third_ema": 32, "ttf": TimeFrame.H1, "tcc": 720, "price_sma": 50,
                   "adx_cutoff": 22, "ltf": TimeFrame.M5, "etf": TimeFrame.M30}
 
     def __init__(self, *, symbol: Symbol, params: dict | None = None, trader: Trader = None, sessions: Sessions = None,
-                 name: str = 'FingerADX'):
+                 name: str = 'FingerADX', batch: 'FingerADXBatch' = None):
         super().__init__(symbol=symbol, params=params, sessions=sessions, name=name)
         self.trader = trader or PTrader(symbol=self.symbol)
 
         self.tracker: Tracker = Tracker(snooze=self.ttf.time)
+        self.requirements = [(self.ttf, self.tcc), (self.ltf, self.tcc), (self.etf, self.tcc)]
+        self.batch = batch
+        if batch is not None:
+            batch.add(self)
 
     async def check_trend(self):
+        if self.batch is not None:
+            await self.check_batched_trend()
+            return
         try:
-            candles = await self.symbol.copy_rates_from_pos(timeframe=self.ttf, count=self.tcc)
-            if (current := candles[-1].time) < self.tracker.trend_time:
+            frames = await candle_cache.frames(symbol=self.symbol, counts=self.requirements,
+                                               since=self.tracker.trend_time)
+            if not frames:
                 self.tracker.update(new=False, order_type=None)
                 return
-            l_candles = await self.symbol.copy_rates_from_pos(timeframe=self.ltf, count=self.tcc)
-            e_candles = await self.symbol.copy_rates_from_pos(timeframe=self.etf, count=self.tcc)
+            candles, l_candles, e_candles = frames
+            current = candles[-1].time
             self.tracker.update(new=True, trend_time=current, order_type=None)
-            l_candles.ta.adx(append=True, mamode='ema')
+            indicator_engine.apply(l_candles, symbol=self.symbol.name, timeframe=self.ltf, kind='adx', mamode='ema')
             l_candles.rename(inplace=True, **{"ADX_14": "adx", "DMP_14": "dmp", "DMN_14": "dmn"})
-            candles.ta.ema(length=self.first_ema, append=True)
-            candles.ta.ema(length=self.second_ema, append=True)
-            candles.ta.ema(length=self.third_ema, append=True)
-            candles.ta.sma(close='close', length=self.price_sma, append=True)
-            candles.ta.adx(append=True, mamode='ema')
+            indicator_engine.apply(candles, symbol=self.symbol.name, timeframe=self.ttf,
+                                   kind='ema', length=self.first_ema)
+            indicator_engine.apply(candles, symbol=self.symbol.name, timeframe=self.ttf,
+                                   kind='ema', length=self.second_ema)
+            indicator_engine.apply(candles, symbol=self.symbol.name, timeframe=self.ttf,
+                                   kind='ema', length=self.third_ema)
+            indicator_engine.apply(candles, symbol=self.symbol.name, timeframe=self.ttf,
+                                   kind='sma', close='close', length=self.price_sma)
+            indicator_engine.apply(candles, symbol=self.symbol.name, timeframe=self.ttf, kind='adx', mamode='ema')
             candles.rename(inplace=True, **{f"EMA_{self.first_ema}": "first", f"EMA_{self.second_ema}": "second",
                                             f"ADX_14": "adx", f"SMA_{self.price_sma}": "sma",
                                             f"EMA_{self.third_ema}": "third", "DMP_14": "dmp", "DMN_14": "dmn"})
 
-            candles['cas'] = candles.ta_lib.above(candles.close, candles.sma)
-            candles['fas'] = candles.ta_lib.above(candles.first, candles.second)
-            candles['sat'] = candles.ta_lib.above(candles.second, candles.third)
-            candles['cbs'] = candles.ta_lib.below(candles.close, candles.sma)
-            candles['fbs'] = candles.ta_lib.below(candles.first, candles.second)
-            candles['sbt'] = candles.ta_lib.below(candles.second, candles.third)
-            l_candles['pxn'] = l_candles.ta_lib.above(l_candles.dmp, l_candles.dmn)
-            l_candles['nxp'] = l_candles.ta_lib.above(l_candles.dmn, l_candles.dmp)
+            candles['cas'] = signals.above(candles.close, candles.sma, window=1)
+            candles['fas'] = signals.above(candles.first, candles.second, window=1)
+            candles['sat'] = signals.above(candles.second, candles.third, window=1)
+            candles['cbs'] = signals.below(candles.close, candles.sma, window=1)
+            candles['fbs'] = signals.below(candles.first, candles.second, window=1)
+            candles['sbt'] = signals.below(candles.second, candles.third, window=1)
+            l_candles['pxn'] = signals.above(l_candles.dmp, l_candles.dmn, window=1)
+            l_candles['nxp'] = signals.above(l_candles.dmn, l_candles.dmp, window=1)
             l_current = l_candles[-1]
             current = candles[-1]
             prev = candles[-2]
@@ -92,6 +116,30 @@ class FingerADX(Strategy):
             logger.error(f"{exe} for {self.symbol} in {self.__class__.__name__}.check_trend")
             self.tracker.update(snooze=self.interval.time, order_type=None)
 
+    async def check_batched_trend(self):
+        try:
+            signal = await self.batch.signal(symbol=self.symbol, since=self.tracker.trend_time)
+            if signal is None:
+                self.tracker.update(new=False, order_type=None)
+                return
+            if signal.rates is not None:
+                decision_journal.inputs(symbol=self.symbol, rates=signal.rates)
+            self.tracker.update(new=True, trend_time=signal.time, order_type=None)
+            if signal.order_type == OrderType.BUY:
+                tp = signal.close + (signal.close - signal.sl) * self.trader.ram.risk_to_reward
+                self.tracker.update(snooze=self.timeout.time, order_type=OrderType.BUY, sl=signal.sl, tp=tp)
+            elif signal.order_type == OrderType.SELL:
+                tp = signal.close - (signal.sl - signal.close) * self.trader.ram.risk_to_reward
+                self.tracker.update(snooze=self.timeout.time, order_type=OrderType.SELL, sl=signal.sl, tp=tp)
+            else:
+                self.tracker.update(trend="ranging", snooze=self.interval.time, order_type=None)
+        except Exception as exe:
+            logger.error(f"{exe} for {self.symbol} in {self.__class__.__name__}.check_batched_trend")
+            self.tracker.update(snooze=self.interval.time, order_type=None)
+
+    async def sleep(self, secs: float):
+        await bar_scheduler.wait(symbol=self.symbol, secs=secs)
+
     async def trade(self):
         logger.info(f"Trading {self.symbol} with {self.name}")
         async with self.sessions as sess:
@@ -99,16 +147,213 @@ class FingerADX(Strategy):
             while True:
                 await sess.check()
                 try:
-                    await self.check_trend()
+                    with metrics.cycle(self), decision_journal.evaluation(self):
+                        await self.check_trend()
                     if not self.tracker.new:
-                        await asyncio.sleep(2)
+                        await self.sleep(self.ttf.time)
                         continue
                     if self.tracker.order_type is None:
                         await self.sleep(self.tracker.snooze)
                         continue
-                    await self.trader.place_trade(order_type=self.tracker.order_type, parameters=self.parameters,
-                                                  sl=self.tracker.sl, tp=self.tracker.tp)
+                    with metrics.timed(self, 'place_trade'):
+                        await self.trader.place_trade(order_type=self.tracker.order_type, parameters=self.parameters,
+                                                      sl=self.tracker.sl, tp=self.tracker.tp)
                     await self.sleep(self.tracker.snooze)
                 except Exception as err:
                     logger.error(f"{err} for {self.symbol} in {self.__class__.__name__}.trade")
                     await self.sleep(self.tracker.snooze)
+
+
+@dataclass
+class Signal:
+    """The outcome of FingerADX on the current bar of a symbol.
+
+    Attributes:
+        time (int): Open time of the current bar of the trend timeframe.
+        updated (int): Open time of the last bar of the lowest timeframe the signal was computed from.
+        close (float): Close of the current bar.
+        order_type (OrderType | None): The order to place, None when there is none.
+        sl (float): Stop loss of the order.
+        rates (list[np.ndarray] | None): The rates of the symbol the signal was computed from.
+    """
+    time: int
+    updated: int
+    close: float
+    order_type: OrderType | None = None
+    sl: float = 0
+    rates: list[np.ndarray] | None = None
+
+
+class FingerADXBatch:
+    """Evaluates FingerADX for every symbol of a bot at once.
+
+    The strategies of a batch share their indicator and signal logic. The first of them to ask for the signal of a
+    bar fetches the candles of all the symbols of the batch and computes the indicators and the signals over
+    matrices with a row per symbol, so the cost of a bar grows with the width of the vectors rather than with a
+    pandas pipeline per symbol. The strategies asking later, from any thread, read their row until the lowest
+    timeframe opens a new bar. Each strategy still sizes and places its own orders. The rows are cut to the length of
+    the shortest series, which only changes the warm-up of the indicators.
+
+    Attributes:
+        params (dict): The parameters of the strategies that the signals depend on, taken from the first one added.
+        symbols (dict[str, Symbol]): The symbols of the batch by name.
+        signals (dict[str, Signal]): The latest signal of each symbol.
+    """
+    keys = ('first_ema', 'second_ema', 'third_ema', 'price_sma', 'adx_cutoff', 'ttf', 'ltf', 'etf', 'tcc')
+    params: dict | None
+    symbols: dict[str, Symbol]
+    signals: dict[str, Signal]
+
+    def __init__(self):
+        self.params = None
+        self.symbols = {}
+        self.signals = {}
+        self.pending: Future | None = None
+        self.lock = Lock()
+
+    def add(self, strategy: FingerADX):
+        params = {key: strategy.parameters[key] for key in self.keys}
+        with self.lock:
+            if self.params is None:
+                self.params = params
+            elif params != self.params:
+                raise ValueError(f"{strategy} does not have the parameters of the other strategies in the batch")
+            self.symbols[strategy.symbol.name] = strategy.symbol
+
+    @property
+    def requirements(self) -> list[tuple[TimeFrame, int]]:
+        return [(self.params['ttf'], self.params['tcc']), (self.params['ltf'], self.params['tcc']),
+                (self.params['etf'], self.params['tcc'])]
+
+    @property
+    def warmup(self) -> list[int]:
+        """The fewest bars of each timeframe of the requirements the indicators of a signal need."""
+        p = self.params
+        # the ADX of 14 bars smooths the directional movement of 14 bars
+        adx_bars = 2 * 14
+        return [max(p['first_ema'], p['second_ema'], p['third_ema'], p['price_sma'], adx_bars), adx_bars, 3]
+
+    async def signal(self, *, symbol: Symbol, since: float = 0) -> Signal | None:
+        """The signal of the current bar of a symbol, evaluating the batch when the latest one is older than the last
+        bar of the lowest timeframe. Concurrent requests share a single evaluation.
+
+        Args:
+            symbol (Symbol): The financial instrument
+            since (float): Time the current bar of the trend timeframe must have opened at or after
+
+        Returns:
+            Signal | None: The signal, None if the current bar opened before since
+
+        Raises:
+            ValueError: If the evaluation left the symbol without a signal of its current bar
+        """
+        requirements = self.requirements
+        if since and await candle_cache.opened(symbol=symbol, timeframe=requirements[0][0]) < since:
+            return None
+        base = min((timeframe for timeframe, _ in requirements), key=lambda timeframe: timeframe.time)
+        latest = await candle_cache.opened(symbol=symbol, timeframe=base)
+        while True:
+            with self.lock:
+                # a symbol dropped after a failed fetch rejoins when its strategy asks again
+                self.symbols.setdefault(symbol.name, symbol)
+                signal = self.signals.get(symbol.name)
+                if signal is not None and signal.updated >= latest:
+                    return signal
+                future = self.pending
+                owner = future is None
+                if owner:
+                    future = self.pending = Future()
+
+            if not owner:
+                await asyncio.wrap_future(future)
+                continue
+
+            try:
+                await self.evaluate()
+                future.set_result(None)
+            except Exception as err:
+                future.set_exception(err)
+                raise
+            finally:
+                with self.lock:
+                    self.pending = None
+            with self.lock:
+                signal = self.signals.get(symbol.name)
+            # a symbol whose bars could not be fetched or were too few keeps the signal of an earlier bar
+            if signal is None or signal.updated < latest:
+                raise ValueError(f"No signal of the current bar for {symbol.name}")
+            return signal
+
+    async def evaluate(self):
+        """Compute the signals of every symbol of the batch from their latest candles."""
+        with self.lock:
+            symbols = list(self.symbols.values())
+        requirements, warmup = self.requirements, self.warmup
+        base = min(range(len(requirements)), key=lambda i: requirements[i][0].time)
+        results = await asyncio.gather(*(candle_cache.bars(symbol=symbol, counts=requirements) for symbol in symbols),
+                                       return_exceptions=True)
+        names, rows = [], []
+        for symbol, result in zip(symbols, results):
+            if isinstance(result, Exception):
+                logger.error(f"{result} for {symbol} in {self.__class__.__name__}.evaluate")
+                with self.lock:
+                    self.symbols.pop(symbol.name, None)
+            # the rows are cut to the shortest series, so a symbol with too few bars is left out of the batch
+            elif all(len(rates) >= bars for rates, bars in zip(result, warmup)):
+                names.append(symbol.name)
+                rows.append(result)
+        if not rows:
+            return
+        candles, l_candles, e_candles = (self.matrix([row[i] for row in rows]) for i in range(len(requirements)))
+        signals = self.compute(candles, l_candles, e_candles)
+        updated = self.matrix([row[base] for row in rows])['time'][:, -1]
+        with self.lock:
+            for name, time, signal, row in zip(names, updated, signals, rows):
+                signal.updated, signal.rates = int(time), row
+                self.signals[name] = signal
+
+    @staticmethod
+    def matrix(rates: list[np.ndarray]) -> dict[str, np.ndarray]:
+        """Stack the last bars of each symbol into a matrix per column, as many bars as the shortest series has."""
+        width = min(len(rows) for rows in rates)
+        return {column: np.stack([rows[column][len(rows) - width:] for rows in rates])
+                for column in ('time', 'open', 'high', 'low', 'close')}
+
+    @metrics.phase('indicators')
+    def compute(self, candles: dict[str, np.ndarray], l_candles: dict[str, np.ndarray],
+                e_candles: dict[str, np.ndarray]) -> list[Signal]:
+        """The check of FingerADX.check_trend over matrices of the trend, lower and entry timeframes."""
+        p = self.params
+        close, high, low = candles['close'], candles['high'], candles['low']
+        first, second, third = (ema(close, p[key])[:, -1] for key in ('first_ema', 'second_ema', 'third_ema'))
+        price_sma = sma(close, p['price_sma'])[:, -1]
+        trend_adx, dmp, dmn = (values[:, -1] for values in adx(high, low, close, mamode='ema'))
+        _, l_dmp, l_dmn = (values[:, -1] for values in adx(l_candles['high'], l_candles['low'], l_candles['close'],
+                                                           mamode='ema'))
+        current, open_ = close[:, -1], candles['open'][:, -1]
+        e_open, e_close = e_candles['open'], e_candles['close']
+
+        # double_bottom and double_top of the two entry bars before the current one
+        gap = 1 - np.minimum(e_close[:, -3], e_open[:, -2]) / np.maximum(e_close[:, -3], e_open[:, -2]) <= 0.005
+        db = (e_open[:, -3] > e_close[:, -3]) & (e_close[:, -2] >= e_open[:, -2]) & gap
+        dt = (e_close[:, -3] >= e_open[:, -3]) & (e_open[:, -2] > e_close[:, -2]) & gap
+
+        higher_high = (high[:, -1] > high[:, -2]) | ((low[:, -1] > low[:, -2]) & (dmp > dmn) & (l_dmp >= l_dmn))
+        lower_low = (low[:, -1] < low[:, -2]) | ((high[:, -1] < high[:, -2]) & (dmn > dmp) & (l_dmn >= l_dmp))
+        strong = trend_adx >= p['adx_cutoff']
+        uptrend = (current >= price_sma) & (first >= second) & (second >= third) & strong & db
+        downtrend = (current <= price_sma) & (first <= second) & (second <= third) & strong & dt
+        buy = (current >= open_) & uptrend & higher_high
+        sell = ~buy & (open_ > current) & downtrend & lower_low
+        buy_sl = current - (current - np.minimum(low[:, -2], low[:, -3])) * 2
+        sell_sl = current + (np.maximum(high[:, -2], high[:, -3]) - current) * 2
+
+        signals = []
+        for row in range(len(current)):
+            signal = Signal(time=int(candles['time'][row, -1]), updated=0, close=float(current[row]))
+            if buy[row]:
+                signal.order_type, signal.sl = OrderType.BUY, float(buy_sl[row])
+            elif sell[row]:
+                signal.order_type, signal.sl = OrderType.SELL, float(sell_sl[row])
+            signals.append(signal)
+        return signals
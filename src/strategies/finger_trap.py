@@ -1,9 +1,14 @@
-import asyncio
 import logging
 
 from aiomql import Tracker, ForexSymbol, TimeFrame, OrderType, Sessions, Strategy, Candles, Trader
 
 from ..utils.ram import RAM
+from ..utils.bar_scheduler import bar_scheduler
+from ..utils.candle_cache import candle_cache
+from ..utils.decision_journal import decision_journal
+from ..utils.candle_view import CandleView
+from ..utils.indicators import indicator_engine
+from ..utils import signals, metrics
 from ..traders.sp_trader import SPTrader
 from ..closers.ema_closer import ema_closer
 from ..closers.chandelier_exit import chandelier_trailer
@@ -41,25 +46,28 @@ class FingerTrap(Strategy):
 
     async def check_trend(self):
         try:
-            candles: Candles = await self.symbol.copy_rates_from_pos(timeframe=self.ttf, count=self.tcc) 
+            candles: Candles = await candle_cache.get(symbol=self.symbol, timeframe=self.ttf, count=self.tcc)
             if (current := candles[-1].time) < self.tracker.trend_time:
                 self.tracker.update(new=False, order_type=None)
                 return
 
             self.tracker.update(new=True, trend_time=current, order_type=None)
-            candles.ta.ema(length=self.slow_ema, append=True)
-            candles.ta.ema(length=self.fast_ema, append=True)
-            candles.ta.ema(length=self.exit_ema, append=True)
-            candles.ta.adx(append=True)
+            indicator_engine.apply(candles, symbol=self.symbol.name, timeframe=self.ttf,
+                                   kind='ema', length=self.slow_ema)
+            indicator_engine.apply(candles, symbol=self.symbol.name, timeframe=self.ttf,
+                                   kind='ema', length=self.fast_ema)
+            indicator_engine.apply(candles, symbol=self.symbol.name, timeframe=self.ttf,
+                                   kind='ema', length=self.exit_ema)
+            indicator_engine.apply(candles, symbol=self.symbol.name, timeframe=self.ttf, kind='adx')
             candles.rename(inplace=True, **{f"EMA_{self.fast_ema}": "fast", f"EMA_{self.slow_ema}": "slow",
                                             "ADX_14": "adx", "DMP_14": "dmp", "DMN_14": "dmn",
                                             f"EMA_{self.exit_ema}": "exit_ema"})
 
-            candles['caf'] = candles.ta_lib.above(candles.close, candles.fast, asint=False)
-            candles['fas'] = candles.ta_lib.above(candles.fast, candles.slow, asint=False)
+            candles['caf'] = signals.above(candles.close, candles.fast, asint=False, window=1)
+            candles['fas'] = signals.above(candles.fast, candles.slow, asint=False, window=1)
 
-            candles['fbs'] = candles.ta_lib.below(candles.fast, candles.slow, asint=False)
-            candles['cbf'] = candles.ta_lib.below(candles.close, candles.fast, asint=False)
+            candles['fbs'] = signals.below(candles.fast, candles.slow, asint=False, window=1)
+            candles['cbf'] = signals.below(candles.close, candles.fast, asint=False, window=1)
 
             current = candles[-1]
             prev = candles[-2]
@@ -69,11 +77,11 @@ class FingerTrap(Strategy):
             lower_low = current.low < prev.low or current.high < prev.low
 
             if current.is_bullish() and uptrend and higher_high:
-                candles['cxf'] = candles.ta_lib.cross(candles.close, candles.fast, asint=False)
+                candles['cxf'] = signals.cross(candles.close, candles.fast, asint=False)
                 self.trend_candles = candles
                 self.tracker.update(trend="bullish")
             elif current.is_bearish() and downtrend and lower_low:
-                candles['cxf'] = candles.ta_lib.cross(candles.close, candles.fast, asint=False, above=False)
+                candles['cxf'] = signals.cross(candles.close, candles.fast, asint=False, above=False)
                 self.trend_candles = candles
                 self.tracker.update(trend="bearish")
             else:
@@ -84,33 +92,30 @@ class FingerTrap(Strategy):
 
     async def confirm_trend(self):
         try:
-            candles = await self.symbol.copy_rates_from_pos(timeframe=self.etf, count=self.ecc)
+            candles = await candle_cache.get(symbol=self.symbol, timeframe=self.etf, count=self.ecc)
             if (current := candles[-1].time) < self.tracker.entry_time:
                 self.tracker.update(new=False, order_type=None)  
                 return
 
             self.tracker.update(new=True, entry_time=current, order_type=None)
-            candles.ta.ema(length=self.entry_ema, append=True)
+            indicator_engine.apply(candles, symbol=self.symbol.name, timeframe=self.etf,
+                                   kind='ema', length=self.entry_ema)
             candles.rename(**{f"EMA_{self.entry_ema}": "ema"})
-            candles['cxe'] = candles.ta_lib.cross(candles.close, candles.ema, asint=False)
-            candles['exc'] = candles.ta_lib.cross(candles.close, candles.ema, above=False, asint=False)
+            candles['cxe'] = signals.cross(candles.close, candles.ema, asint=False, window=1)
+            candles['exc'] = signals.cross(candles.close, candles.ema, above=False, asint=False, window=1)
 
             current = candles[-1]
             if self.tracker.bullish and current.cxe:
-                for candle in reversed(self.trend_candles):
-                    if candle.cxf:
-                        sl = candle.low
-                        break
+                if (candle := CandleView(self.trend_candles).find_last('cxf')) is not None:
+                    sl = candle.low
                 else:
                     sl = candles[-2].low
                 tp = current.close + (current.close - sl) * self.trader.ram.risk_to_reward
                 price = current.close
                 self.tracker.update(snooze=self.timeout.time, order_type=OrderType.BUY, sl=sl, tp=tp, price=price)
             elif self.tracker.bearish and current.exc:
-                for candle in reversed(self.trend_candles):
-                    if candle.cxf:
-                        sl = candle.high
-                        break
+                if (candle := CandleView(self.trend_candles).find_last('cxf')) is not None:
+                    sl = candle.high
                 else:
                     sl = candles[-2].low
                 tp = current.close - (sl - current.close) * self.trader.ram.risk_to_reward
@@ -127,6 +132,9 @@ class FingerTrap(Strategy):
         if not self.tracker.ranging:
             await self.confirm_trend()
 
+    async def sleep(self, secs: float):
+        await bar_scheduler.wait(symbol=self.symbol, secs=secs)
+
     async def trade(self):
         logger.info(f"Trading {self.symbol} with {self.name}")
         async with self.sessions as sess:
@@ -134,15 +142,17 @@ class FingerTrap(Strategy):
             while True:
                 await sess.check()
                 try:
-                    await self.watch_market()
+                    with metrics.cycle(self), decision_journal.evaluation(self):
+                        await self.watch_market()
                     if self.tracker.new is False:
-                        await asyncio.sleep(2)
+                        await self.sleep(self.ttf.time)
                         continue
                     if self.tracker.order_type is None:
                         await self.sleep(self.tracker.snooze)
                         continue
-                    await self.trader.place_trade(order_type=self.tracker.order_type, parameters=self.parameters,
-                                                  sl=self.tracker.sl, tp=self.tracker.tp)
+                    with metrics.timed(self, 'place_trade'):
+                        await self.trader.place_trade(order_type=self.tracker.order_type, parameters=self.parameters,
+                                                      sl=self.tracker.sl, tp=self.tracker.tp)
                     await self.sleep(self.tracker.snooze)
                 except Exception as err:
                     logger.error(f"{err} For {self.symbol} in {self.__class__.__name__}.trade")
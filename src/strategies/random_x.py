@@ -1,9 +1,13 @@
 from logging import getLogger
-import asyncio
 
 from aiomql import Symbol, Strategy, TimeFrame, Sessions, OrderType, Trader
 
 from ..utils.tracker import Tracker
+from ..utils.bar_scheduler import bar_scheduler
+from ..utils.candle_cache import candle_cache
+from ..utils.decision_journal import decision_journal
+from ..utils.indicators import indicator_engine
+from ..utils import signals, metrics
 from ..utils.top_bottom import double_top, double_bottom
 from ..traders.sp_trader import SPTrader
 from ..closers.adx_closer import adx_closer
@@ -25,6 +29,7 @@ class Chaos(Strategy):
     tcc: int
     trader: Trader
     tracker: Tracker
+    requirements: list[tuple[TimeFrame, int]]
     interval: TimeFrame = TimeFrame.M15
     timeout: TimeFrame = TimeFrame.H2
     parameters = {"first_ema": 8, "second_ema": 13, "third_ema": 34, "ttf": TimeFrame.H1, "tcc": 720, "price_sma": 50,
@@ -38,35 +43,41 @@ class Chaos(Strategy):
         self.trader = trader or SPTrader(symbol=self.symbol, ram=ram, hedge_order=True, track_loss=False,
                                          use_exit_signal=True)
         self.tracker: Tracker = Tracker(snooze=self.ttf.time)
+        self.requirements = [(self.ttf, self.tcc), (self.ltf, self.tcc), (self.etf, self.tcc)]
 
     async def check_trend(self):
         try:
-            candles = await self.symbol.copy_rates_from_pos(timeframe=self.ttf, count=self.tcc)
-            if (current := candles[-1].time) < self.tracker.trend_time:
+            frames = await candle_cache.frames(symbol=self.symbol, counts=self.requirements,
+                                               since=self.tracker.trend_time)
+            if not frames:
                 self.tracker.update(new=False, order_type=None)
                 return
-            l_candles = await self.symbol.copy_rates_from_pos(timeframe=self.ltf, count=self.tcc)
-            e_candles = await self.symbol.copy_rates_from_pos(timeframe=self.etf, count=self.tcc)
+            candles, l_candles, e_candles = frames
+            current = candles[-1].time
             self.tracker.update(new=True, trend_time=current, order_type=None)
-            l_candles.ta.adx(append=True, mamode='ema')
+            indicator_engine.apply(l_candles, symbol=self.symbol.name, timeframe=self.ltf, kind='adx', mamode='ema')
             l_candles.rename(inplace=True, **{"ADX_14": "adx", "DMP_14": "dmp", "DMN_14": "dmn"})
-            candles.ta.ema(length=self.first_ema, append=True)
-            candles.ta.ema(length=self.second_ema, append=True)
-            candles.ta.ema(length=self.third_ema, append=True)
-            candles.ta.sma(close='close', length=self.price_sma, append=True)
-            candles.ta.adx(append=True, mamode='ema')
+            indicator_engine.apply(candles, symbol=self.symbol.name, timeframe=self.ttf,
+                                   kind='ema', length=self.first_ema)
+            indicator_engine.apply(candles, symbol=self.symbol.name, timeframe=self.ttf,
+                                   kind='ema', length=self.second_ema)
+            indicator_engine.apply(candles, symbol=self.symbol.name, timeframe=self.ttf,
+                                   kind='ema', length=self.third_ema)
+            indicator_engine.apply(candles, symbol=self.symbol.name, timeframe=self.ttf,
+                                   kind='sma', close='close', length=self.price_sma)
+            indicator_engine.apply(candles, symbol=self.symbol.name, timeframe=self.ttf, kind='adx', mamode='ema')
             candles.rename(inplace=True, **{f"EMA_{self.first_ema}": "first", f"EMA_{self.second_ema}": "second",
                                             f"ADX_14": "adx", f"SMA_{self.price_sma}": "sma",
                                             f"EMA_{self.third_ema}": "third", "DMP_14": "dmp", "DMN_14": "dmn"})
 
-            candles['cas'] = candles.ta_lib.above(candles.close, candles.sma)
-            candles['fas'] = candles.ta_lib.above(candles.first, candles.second)
-            candles['sat'] = candles.ta_lib.above(candles.second, candles.third)
-            candles['cbs'] = candles.ta_lib.below(candles.close, candles.sma)
-            candles['fbs'] = candles.ta_lib.below(candles.first, candles.second)
-            candles['sbt'] = candles.ta_lib.below(candles.second, candles.third)
-            l_candles['pxn'] = l_candles.ta_lib.above(l_candles.dmp, l_candles.dmn)
-            l_candles['nxp'] = l_candles.ta_lib.above(l_candles.dmn, l_candles.dmp)
+            candles['cas'] = signals.above(candles.close, candles.sma, window=1)
+            candles['fas'] = signals.above(candles.first, candles.second, window=1)
+            candles['sat'] = signals.above(candles.second, candles.third, window=1)
+            candles['cbs'] = signals.below(candles.close, candles.sma, window=1)
+            candles['fbs'] = signals.below(candles.first, candles.second, window=1)
+            candles['sbt'] = signals.below(candles.second, candles.third, window=1)
+            l_candles['pxn'] = signals.above(l_candles.dmp, l_candles.dmn, window=1)
+            l_candles['nxp'] = signals.above(l_candles.dmn, l_candles.dmp, window=1)
             l_current = l_candles[-1]
             current = candles[-1]
             prev = candles[-2]
@@ -96,6 +107,9 @@ class Chaos(Strategy):
             logger.error(f"{exe} for {self.symbol} in {self.__class__.__name__}.check_trend")
             self.tracker.update(snooze=self.interval.time, order_type=None)
 
+    async def sleep(self, secs: float):
+        await bar_scheduler.wait(symbol=self.symbol, secs=secs)
+
     async def trade(self):
         logger.info(f"Trading {self.symbol} with {self.name}")
         async with self.sessions as sess:
@@ -103,15 +117,17 @@ class Chaos(Strategy):
             while True:
                 await sess.check()
                 try:
-                    await self.check_trend()
+                    with metrics.cycle(self), decision_journal.evaluation(self):
+                        await self.check_trend()
                     if not self.tracker.new:
-                        await asyncio.sleep(2)
+                        await self.sleep(self.ttf.time)
                         continue
                     if self.tracker.order_type is None:
                         await self.sleep(self.tracker.snooze)
                         continue
-                    await self.trader.place_trade(order_type=self.tracker.order_type, parameters=self.parameters,
-                                                  sl=self.tracker.sl, tp=self.tracker.tp)
+                    with metrics.timed(self, 'place_trade'):
+                        await self.trader.place_trade(order_type=self.tracker.order_type, parameters=self.parameters,
+                                                      sl=self.tracker.sl, tp=self.tracker.tp)
                     await self.sleep(self.tracker.snooze)
                 except Exception as err:
                     logger.error(f"{err} for {self.symbol} in {self.__class__.__name__}.trade")
@@ -1,9 +1,13 @@
 from logging import getLogger
-import asyncio
 
 from aiomql import Symbol, Strategy, TimeFrame, Sessions, OrderType, Trader
 
 from ..utils.tracker import Tracker
+from ..utils.bar_scheduler import bar_scheduler
+from ..utils.candle_cache import candle_cache
+from ..utils.decision_journal import decision_journal
+from ..utils.indicators import indicator_engine
+from ..utils import signals, metrics
 from ..closers.adx_closer import adx_closer
 from ..traders.point_trader import PointTrader
 
@@ -29,17 +33,17 @@ class RA(Strategy):
 
     async def confirm_trend(self):
         try:
-            candles = await self.symbol.copy_rates_from_pos(timeframe=self.ttf, count=self.tcc)
+            candles = await candle_cache.get(symbol=self.symbol, timeframe=self.ttf, count=self.tcc)
             if not ((current := candles[-1].time) >= self.tracker.entry_time):
                 self.tracker.update(new=False, order_type=None)
                 return
             self.tracker.update(new=True, trend_time=current, order_type=None)
-            candles.ta.ema(length=self.ema, append=True)
-            candles.ta.adx(append=True, length=5)
-            candles.ta.rsi(append=True, length=3)
+            indicator_engine.apply(candles, symbol=self.symbol.name, timeframe=self.ttf, kind='ema', length=self.ema)
+            indicator_engine.apply(candles, symbol=self.symbol.name, timeframe=self.ttf, kind='adx', length=5)
+            indicator_engine.apply(candles, symbol=self.symbol.name, timeframe=self.ttf, kind='rsi', length=3)
             candles.rename(inplace=True, **{f"EMA_{self.ema}": "ema", "ADX_5": "adx", f"RSI_3": "rsi"})
-            candles['cae'] = candles.ta_lib.above(candles.close, candles.ema)
-            candles['cbe'] = candles.ta_lib.below(candles.close, candles.ema)
+            candles['cae'] = signals.above(candles.close, candles.ema, window=12)
+            candles['cbe'] = signals.below(candles.close, candles.ema, window=12)
             trend = candles[-1: -13]
 
             current = candles[-1]
@@ -71,6 +75,9 @@ class RA(Strategy):
         if not self.tracker.ranging:
             await self.confirm_trend()
 
+    async def sleep(self, secs: float):
+        await bar_scheduler.wait(symbol=self.symbol, secs=secs)
+
     async def trade(self):
         print(f"Trading {self.symbol} with {self.name}")
         async with self.sessions as sess:
@@ -78,14 +85,16 @@ class RA(Strategy):
             while True:
                 await sess.check()
                 try:
-                    await self.confirm_trend()
+                    with metrics.cycle(self), decision_journal.evaluation(self):
+                        await self.confirm_trend()
                     if not self.tracker.new:
-                        await asyncio.sleep(2)
+                        await self.sleep(self.ttf.time)
                         continue
                     if self.tracker.order_type is None:
                         await self.sleep(self.tracker.snooze)
                         continue
-                    await self.trader.place_trade(order_type=self.tracker.order_type, parameters=self.parameters)
+                    with metrics.timed(self, 'place_trade'):
+                        await self.trader.place_trade(order_type=self.tracker.order_type, parameters=self.parameters)
                     # await asyncio.sleep(self.timeout)
                     await self.sleep(self.tracker.snooze)
                 except Exception as err:
@@ -1 +1,3 @@
 from .tele_bot import TelegramBot
+from .dispatcher import UpdateDispatcher
+from .notifier import Notifier
@@ -0,0 +1,146 @@
+import asyncio
+from collections import OrderedDict
+from concurrent.futures import Future
+from logging import getLogger
+from threading import Lock, Thread, Event
+from typing import Coroutine
+
+from telegram import Bot, Message, Update
+
+logger = getLogger(__name__)
+
+
+class UpdateDispatcher:
+    """The single consumer of the updates of a telegram bot in the process, routing replies to the messages waiting
+    for them.
+
+    The dispatcher runs its own event loop on a daemon thread, started on first use, and owns the Bot the requests
+    are made with, so every strategy thread shares one connection. While any message is waiting for a reply it polls
+    for the latest updates every interval seconds. A reply resolves the future of the message it replies to as soon
+    as it is seen, so any number of confirmations can be pending at once. A reply arriving before its message is
+    registered is held until it is claimed.
+
+    The bots started together by app.py run in separate processes and share a token, so the updates are never
+    acknowledged to telegram, which would hide them from the other processes, and there is no long poll, which
+    telegram ends with a conflict when another process polls. Each poll asks for the last 100 updates and the ones
+    already seen are skipped by their update_id.
+
+    Attributes:
+        bot (Bot): The bot the updates are polled and messages sent with.
+        interval (float): Seconds between polls.
+        retry (float): Seconds to wait after a failed poll.
+    """
+    dispatchers: dict[str, 'UpdateDispatcher'] = {}
+    registry_lock = Lock()
+    bot: Bot
+    interval: float
+    retry: float
+    # number of the latest updates each poll asks for
+    LATEST = 100
+
+    def __init__(self, *, token: str, interval: float = 2, retry: float = 5, held: int = 100):
+        self.bot = Bot(token)
+        self.interval = interval
+        self.retry = retry
+        self.held = held
+        # message ids are only unique within a chat, so replies are matched on both
+        self.waiting: dict[tuple[int, int], Future] = {}
+        self.replies: OrderedDict[tuple[int, int], str] = OrderedDict()
+        self.seen = -1
+        self.lock = Lock()
+        self.loop: asyncio.AbstractEventLoop | None = None
+        self.wanted: asyncio.Event | None = None
+        self.ready = Event()
+        self.thread: Thread | None = None
+
+    @classmethod
+    def get(cls, *, token: str) -> 'UpdateDispatcher':
+        """The dispatcher of a bot token, created on first request."""
+        with cls.registry_lock:
+            if (dispatcher := cls.dispatchers.get(token)) is None:
+                dispatcher = cls.dispatchers[token] = cls(token=token)
+            return dispatcher
+
+    def start(self):
+        with self.lock:
+            if self.thread is None:
+                self.thread = Thread(target=self.run, name='telegram-updates', daemon=True)
+                self.thread.start()
+        self.ready.wait()
+
+    def run(self):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        self.wanted = asyncio.Event()
+        self.ready.set()
+        self.loop.run_until_complete(self.poll())
+
+    async def poll(self):
+        while True:
+            await self.wanted.wait()
+            try:
+                # a negative offset only drops the updates older than the latest ones, which every process has seen
+                updates = await self.bot.get_updates(offset=-self.LATEST, limit=self.LATEST, timeout=0,
+                                                     allowed_updates=['message'])
+            except Exception as err:
+                logger.error(f"{err} in {self.__class__.__name__}.poll")
+                await asyncio.sleep(self.retry)
+                continue
+            for update in updates:
+                if update.update_id > self.seen:
+                    self.seen = update.update_id
+                    self.route(update)
+            with self.lock:
+                if not self.waiting:
+                    self.wanted.clear()
+                    continue
+            await asyncio.sleep(self.interval)
+
+    def route(self, update: Update):
+        message = update.message
+        if message is None or message.reply_to_message is None:
+            return
+        key, text = (message.chat_id, message.reply_to_message.message_id), message.text or ''
+        with self.lock:
+            future = self.waiting.pop(key, None)
+            if future is None:
+                self.replies[key] = text
+                while len(self.replies) > self.held:
+                    self.replies.popitem(last=False)
+        if future is not None and not future.done():
+            future.set_result(text)
+
+    async def call(self, coroutine: Coroutine):
+        """Run a request of the bot on the loop of the dispatcher and await its result from any loop."""
+        self.start()
+        return await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(coroutine, self.loop))
+
+    async def send(self, *, chat_id: int | str, text: str) -> Message:
+        return await self.call(self.bot.send_message(chat_id=chat_id, text=text))
+
+    async def reply(self, *, chat_id: int, message_id: int, timeout: float) -> str | None:
+        """Wait for the reply to a message.
+
+        Args:
+            chat_id (int): The id of the chat of the message, as in the message sent
+            message_id (int): The message replied to
+            timeout (float): Seconds to wait for the reply
+
+        Returns:
+            str | None: The text of the reply, None if there was none in time
+        """
+        self.start()
+        key = chat_id, message_id
+        with self.lock:
+            if (text := self.replies.pop(key, None)) is not None:
+                return text
+            future = self.waiting.setdefault(key, Future())
+        self.loop.call_soon_threadsafe(self.wanted.set)
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(future), timeout)
+        except asyncio.TimeoutError:
+            return None
+        finally:
+            with self.lock:
+                if self.waiting.get(key) is future:
+                    self.waiting.pop(key)
@@ -0,0 +1,133 @@
+import asyncio
+from collections import OrderedDict
+from logging import getLogger
+from threading import Lock
+from time import monotonic
+
+from telegram.error import RetryAfter
+
+from .dispatcher import UpdateDispatcher
+
+logger = getLogger(__name__)
+
+
+class Notifier:
+    """Sends the notifications of a chat as digests, within the rate limits of telegram.
+
+    Posting a message only adds it to the pending messages of the chat, so it never blocks the strategy or closer
+    posting it. The first message posted after a digest was sent starts a window, and everything posted within the
+    window goes out as one digest, with repeated messages merged into one line counting them. The digests are sent
+    from the loop of the dispatcher of the bot, and each takes a token from a bucket refilled at rate tokens a
+    second, holding at most burst tokens. While the bucket is empty the messages keep gathering into the next
+    digest. When more than max_pending distinct messages are waiting the oldest are dropped.
+
+    Attributes:
+        dispatcher (UpdateDispatcher): The dispatcher of the bot, whose loop sends the digests.
+        chat_id (int | str): The chat the digests are sent to.
+        window (float): Seconds messages are gathered for before a digest is sent.
+        rate (float): Digests a second allowed on average.
+        burst (int): Digests allowed in a row.
+        max_pending (int): Number of distinct messages kept waiting.
+        dropped (int): Number of messages dropped so far.
+    """
+    notifiers: dict[tuple[str, int | str], 'Notifier'] = {}
+    registry_lock = Lock()
+    # longest text telegram accepts in a single message
+    LIMIT = 4096
+    dispatcher: UpdateDispatcher
+    chat_id: int | str
+    window: float
+    rate: float
+    burst: int
+    max_pending: int
+    dropped: int
+
+    def __init__(self, *, dispatcher: UpdateDispatcher, chat_id: int | str, window: float = 2, rate: float = 1 / 3,
+                 burst: int = 3, max_pending: int = 200):
+        self.dispatcher = dispatcher
+        self.chat_id = chat_id
+        self.window = window
+        self.rate = rate
+        self.burst = burst
+        self.max_pending = max_pending
+        self.dropped = 0
+        self.pending: OrderedDict[str, int] = OrderedDict()
+        self.tokens = float(burst)
+        self.stamp = monotonic()
+        self.scheduled = False
+        self.task: asyncio.Task | None = None
+        self.lock = Lock()
+
+    @classmethod
+    def get(cls, *, token: str, chat_id: int | str) -> 'Notifier':
+        """The notifier of a chat of a bot, created on first request."""
+        with cls.registry_lock:
+            if (notifier := cls.notifiers.get((token, chat_id))) is None:
+                notifier = cls(dispatcher=UpdateDispatcher.get(token=token), chat_id=chat_id)
+                cls.notifiers[(token, chat_id)] = notifier
+            return notifier
+
+    def post(self, msg: str):
+        """Add a message to the next digest. Safe to call from any thread."""
+        with self.lock:
+            self.pending[msg] = self.pending.get(msg, 0) + 1
+            while len(self.pending) > self.max_pending:
+                _, count = self.pending.popitem(last=False)
+                self.dropped += count
+            idle = not self.scheduled
+            self.scheduled = True
+        if idle:
+            self.dispatcher.start()
+            self.dispatcher.loop.call_soon_threadsafe(self.schedule)
+
+    def schedule(self):
+        self.task = asyncio.get_running_loop().create_task(self.flush())
+
+    async def flush(self):
+        await asyncio.sleep(self.window)
+        while True:
+            await self.acquire()
+            with self.lock:
+                text = self.digest()
+                if not text:
+                    self.scheduled = False
+                    return
+            try:
+                await self.dispatcher.bot.send_message(chat_id=self.chat_id, text=text)
+            except RetryAfter as err:
+                logger.warning(f"Telegram asked to wait {err.retry_after} seconds before notifying {self.chat_id}")
+                self.requeue(text)
+                await asyncio.sleep(err.retry_after)
+            except Exception as err:
+                logger.error(f"{err} in {self.__class__.__name__}.flush for {self.chat_id}")
+
+    def digest(self) -> str:
+        """Take as many of the pending messages as fit in a telegram message, with repeats counted."""
+        lines, size = [], 0
+        while self.pending:
+            msg, count = next(iter(self.pending.items()))
+            line = msg if count == 1 else f"{msg} (x{count})"
+            if lines and size + len(line) + 1 > self.LIMIT:
+                break
+            lines.append(line[:self.LIMIT])
+            size += len(line) + 1
+            self.pending.popitem(last=False)
+        return '\n'.join(lines)
+
+    def requeue(self, text: str):
+        with self.lock:
+            pending = OrderedDict((line, 1) for line in text.split('\n'))
+            for msg, count in self.pending.items():
+                pending[msg] = pending.get(msg, 0) + count
+            self.pending = pending
+
+    async def acquire(self):
+        """Take a token from the bucket, waiting for one to be refilled when it is empty."""
+        while True:
+            now = monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.stamp) * self.rate)
+            self.stamp = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return
+            await asyncio.sleep((1 - self.tokens) / self.rate)
@@ -1,19 +1,18 @@
-import asyncio
 from logging import getLogger
-import random
 
-from telegram import Bot
+from .dispatcher import UpdateDispatcher
+from .notifier import Notifier
 
 logger = getLogger(__name__)
 
-all_updates = list()
-
 
 class TelegramBot:
     def __init__(self, *, token=None, confirmation_timeout=60, chat_id=0, order_format=''):
-        self.bot = Bot(token)
+        self.dispatcher = UpdateDispatcher.get(token=token)
+        self.bot = self.dispatcher.bot
         self.confirmation_timeout = confirmation_timeout
         self.chat_id = chat_id
+        self.notifier = Notifier.get(token=token, chat_id=chat_id)
         self.order_format = order_format or "symbol: {symbol}\norder_type: {order_type}\npips: {pips}\n" \
                                             "volume: {volume}\nrisk_to_reward: {risk_to_reward}\n" \
                                             "hint: reply with 'ok' to confirm or 'cancel' to cancel in {timeout}" \
@@ -32,32 +31,14 @@ class TelegramBot:
         except Exception as exe:
             raise RuntimeError(f'Could not extract order from your response: {msg} due to {exe}')
 
-    async def get_updates(self, tries=3):
-        if tries == 0:
-            await asyncio.sleep(random.random())
-            return await self.bot.get_updates()
-
-        ups = await self.bot.get_updates()
-        if len(ups) == 1:
-            await asyncio.sleep(random.random())
-            return await self.get_updates(tries=tries-1)
-        return ups
-
     async def notify(self, msg):
-        await self.bot.send_message(chat_id=self.chat_id, text=msg)
+        self.notifier.post(msg)
 
     async def confirm_order(self, *, order: dict):
         order_msg = self.order_format.format(timeout=self.confirmation_timeout, **order)
-        msg = await self.bot.send_message(chat_id=self.chat_id, text=order_msg)
-        msg_id = msg.message_id
-        reply = 'cancel'
-        await asyncio.sleep(self.confirmation_timeout)
-        updates = await self.get_updates()
-        for update in updates[::-1]:
-            if reply_to_message := getattr(update.message, 'reply_to_message'):
-                if msg_id == reply_to_message.message_id:
-                    reply = update.message.text
-                    break
+        msg = await self.dispatcher.send(chat_id=self.chat_id, text=order_msg)
+        reply = await self.dispatcher.reply(chat_id=msg.chat_id, message_id=msg.message_id,
+                                            timeout=self.confirmation_timeout) or 'cancel'
         if reply.lower() == 'ok':
             return order
 
@@ -70,24 +51,18 @@ class TelegramBot:
         try:
             order_format = order_format or self.order_format
             order_msg = order_format.format(timeout=self.confirmation_timeout, **order)
-            reply = 'cancel'
             while tries > 0:
-                msg = await self.bot.send_message(chat_id=self.chat_id, text=order_msg)
-                msg_id = msg.message_id
-                await asyncio.sleep(self.confirmation_timeout)
-                updates = await self.get_updates()
-                for update in updates[::-1]:
-                    if reply_to_message := getattr(update.message, 'reply_to_message'):
-                        if msg_id == reply_to_message.message_id:
-                            reply = update.message.text
-                            break
-                if reply.lower() == 'ok':
+                msg = await self.dispatcher.send(chat_id=self.chat_id, text=order_msg)
+                reply = await self.dispatcher.reply(chat_id=msg.chat_id, message_id=msg.message_id,
+                                                    timeout=self.confirmation_timeout)
+                # like any reply other than ok, no reply asks for the order again, only cancel stops asking
+                reply = (reply or '').strip().lower()
+                if reply == 'ok':
                     return True
-                else:
-                    tries -= 1
-
-            if reply.lower() == 'cancel':
-                return False
+                if reply == 'cancel':
+                    return False
+                tries -= 1
+            return False
         except Exception as exe:
             logger.error(f"Could not confirm order due to {exe}")
             return False
@@ -1,9 +1,13 @@
+import asyncio
 from logging import getLogger
 from functools import cache
 
 from aiomql import OrderType, Trader, ForexSymbol, OrderSendResult
 from ..utils.ram import RAM
-from ..utils.order_utils import calc_profit
+from ..utils.account_state import account_state
+from ..utils.exposure import exposure_index
+from ..utils.order_utils import calc_profit, fit_stops, fit_volume
+from ..utils.symbol_registry import symbol_registry
 from ..closers.track_order import OpenOrder
 from ..closers.atr_trailer import atr_trailer
 from ..closers.trailing_loss import trail_sl
@@ -80,7 +84,7 @@ class BaseTrader(Trader):
     async def notify(self, msg: str = ''):
         try:
             if self.use_telegram and getattr(self.config, 'use_telegram', True):
-                self.config.task_queue.add_task(self.telebot.notify, msg=msg)
+                self.telebot.notifier.post(msg)
         except Exception as err:
             logger.error(f"{err} for {self.order.symbol} in {self.__class__.__name__}.notify")
 
@@ -100,11 +104,12 @@ class BaseTrader(Trader):
         try:
             if self.track_orders is False:
                 return
-            profit = result.profit or calc_profit(sym=self.symbol, open_price=self.order.price,
-                                                  close_price=self.order.tp,
-                                                  volume=self.order.volume, order_type=self.order.type)
-            loss = result.loss or calc_profit(sym=self.symbol, open_price=self.order.price, close_price=self.order.sl,
-                                              volume=self.order.volume, order_type=self.order.type)
+            profit = getattr(result, 'profit', 0) or calc_profit(sym=self.symbol, open_price=self.order.price,
+                                                                 close_price=self.order.tp, volume=self.order.volume,
+                                                                 order_type=self.order.type)
+            loss = getattr(result, 'loss', 0) or calc_profit(sym=self.symbol, open_price=self.order.price,
+                                                             close_price=self.order.sl, volume=self.order.volume,
+                                                             order_type=self.order.type)
 
             self.open_order.update(ticket=result.order, expected_loss=loss, expected_profit=profit,
                                    strategy_parameters=self.parameters.copy())
@@ -131,10 +136,27 @@ class BaseTrader(Trader):
     async def check_ram(self) -> bool:
         if self.use_ram is False:
             return True
-        positions = await self.ram.get_open_positions(symbol=self.symbol.name)
-        self.open_trades = [position.ticket for position in positions if position.ticket in self.open_trades]
+        tickets = await exposure_index.tickets(symbol=self.symbol.name)
+        self.open_trades = [ticket for ticket in self.open_trades if ticket in tickets]
         return len(self.open_trades) < self.ram.symbol_limit
 
+    async def prepare(self, *, check_ram: bool = True) -> tuple[bool, float]:
+        """Run concurrently the lookups an order needs before it is priced, as none of them depends on another. These
+        are the limits of the RAM, the amount to risk and the info of the symbol, which is served from the registry
+        while it is fresh. The tick is left for the caller to fetch last, so the price is as close to the send as it
+        can be.
+
+        Args:
+            check_ram (bool): Check the limits of the RAM
+
+        Returns:
+            tuple[bool, float]: Whether the RAM allows the trade and the amount to risk
+        """
+        checks = [self.check_ram()] if check_ram else []
+        *ok, amount, _ = await asyncio.gather(*checks, self.ram.get_amount(),
+                                              symbol_registry.refresh(symbol=self.symbol))
+        return all(ok), amount
+
     async def create_order_points(self, order_type: OrderType, points: float = 0, amount: float = 0, **volume_kwargs):
         self.order.type = order_type
         volume, points = await self.symbol.compute_volume_points(amount=amount, points=points, **volume_kwargs)
@@ -152,12 +174,26 @@ class BaseTrader(Trader):
                                   comment=self.parameters.get('name', self.__class__.__name__))
         self.set_trade_stop_levels(points=points, tick=tick)
 
+    def fit_order(self):
+        """Bring the volume of the order within the limits of the symbol, and its stops to levels the server accepts
+        against the tick the order was priced with."""
+        self.order.volume = fit_volume(sym=self.symbol, volume=self.order.volume)
+        if (tick := getattr(self.symbol, 'tick', None)) is not None:
+            self.order.sl, self.order.tp = fit_stops(sym=self.symbol, order_type=self.order.type, tick=tick,
+                                                     sl=getattr(self.order, 'sl', 0), tp=getattr(self.order, 'tp', 0))
+
+    async def check_order(self) -> bool:
+        self.fit_order()
+        return await super().check_order()
+
     async def send_order(self) -> OrderSendResult:
         ok = await self.confirm_order()
         if not ok:
             raise RuntimeError("Order not confirmed")
         res = await super().send_order()
         if res.retcode == 10009:
+            account_state.invalidate()
+            exposure_index.opened(ticket=res.order, order=self.order, price=res.price)
             await self.notify(msg=f"Placed Trade for {self.symbol}")
             self.open_trades.append(res.order)
             self.track_order(result=res)
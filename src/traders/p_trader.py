@@ -25,12 +25,12 @@ class PTrader(BaseTrader):
                          check_profit_params=check_profit_params, profit_checker=profit_checker,
                          hedger_params=hedger_params, use_exit_signal=use_exit_signal, **kwargs)
 
-    async def create_order(self, *, order_type: OrderType, sl: float, tp: float):
+    async def create_order(self, *, order_type: OrderType, sl: float, tp: float, amount: float = None):
         try:
-            await self.symbol.info()
+            if amount is None:
+                _, amount = await self.prepare(check_ram=False)
             tick = await self.symbol.info_tick()
             price = tick.ask if order_type == OrderType.BUY else tick.bid
-            amount = await self.ram.get_amount()
             volume, sl = await self.symbol.compute_volume_sl(price=price, amount=amount, sl=sl, round_down=True,
                                                              use_limits=True, adjust=False)
             self.order.set_attributes(volume=volume, type=order_type, price=price, sl=sl, tp=tp,
@@ -42,11 +42,12 @@ class PTrader(BaseTrader):
         try:
             self.parameters |= parameters or {}
 
-            if await self.check_ram() is False:
+            ok, amount = await self.prepare()
+            if ok is False:
                 logger.warning(f'Could not place trade due to RAM for {self.symbol}')
                 return
 
-            await self.create_order(order_type=order_type, sl=sl, tp=tp)
+            await self.create_order(order_type=order_type, sl=sl, tp=tp, amount=amount)
             if await self.check_order() is False:
                 return
             await self.send_order()
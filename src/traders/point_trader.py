@@ -10,10 +10,9 @@ logger = getLogger(__name__)
 class PointTrader(BaseTrader):
     async def create_order(self, *, order_type: OrderType, points: int):
         try:
-            await self.symbol.info()
             self.ram.risk_to_reward = 1/3
+            _, amount = await self.prepare(check_ram=False)
             tick = await self.symbol.info_tick()
-            amount = await self.ram.get_amount()
             comment = self.parameters.get('name', self.__class__.__name__)
             sl_points = points / self.ram.risk_to_reward
             sl_points = max(sl_points, self.symbol.trade_stops_level + self.symbol.spread)
@@ -14,9 +14,9 @@ class SPTrader(BaseTrader):
         ram = kwargs.pop('ram', ram)
         super().__init__(symbol=symbol, hedge_order=hedge_order, track_loss=track_loss, ram=ram, **kwargs)
 
-    async def create_order(self, *, order_type: OrderType, sl: float, tp: float):
-        amount = await self.ram.get_amount()
-        await self.symbol.info()
+    async def create_order(self, *, order_type: OrderType, sl: float, tp: float, amount: float = None):
+        if amount is None:
+            _, amount = await self.prepare(check_ram=False)
         tick = await self.symbol.info_tick()
         price = tick.ask if order_type == OrderType.BUY else tick.bid
         volume, sl = await self.symbol.compute_volume_sl(price=price, amount=amount, sl=sl, round_down=True,
@@ -31,11 +31,12 @@ class SPTrader(BaseTrader):
         try:
             self.parameters |= parameters or {}
 
-            if await self.check_ram() is False:
+            ok, amount = await self.prepare()
+            if ok is False:
                 logger.warning(f'Could not place trade due to RAM for {self.symbol}')
                 return
 
-            await self.create_order(order_type=order_type, sl=sl, tp=tp)
+            await self.create_order(order_type=order_type, sl=sl, tp=tp, amount=amount)
             if await self.check_order() is False:
                 return
             await self.send_order()
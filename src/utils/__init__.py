@@ -1,6 +1,18 @@
 from .sleep import sleep
 from .tracker import Tracker
+from .account_state import AccountState, account_state
+from .exposure import ExposureIndex, exposure_index
 from .ram import RAM
-from .find_fractals import find_bearish_fractals, find_bullish_fractals
-from .order_utils import calc_profit
+from .find_fractals import (find_bearish_fractals, find_bullish_fractals, bearish_fractal_indices,
+                            bullish_fractal_indices)
+from .order_utils import calc_profit, fit_stops, fit_volume, stops_frozen
 from .top_bottom import flat_top, flat_bottom, double_top, double_bottom
+from .candle_buffer import CandleBuffer
+from .limiter import Limiter
+from .candle_cache import CandleCache, candle_cache
+from .candle_view import CandleView, CandleRow
+from .indicators import IndicatorEngine, indicator_engine
+from .symbol_registry import SymbolRegistry, symbol_registry
+from .bar_scheduler import BarScheduler, bar_scheduler
+from .resample import resample, Resampled
+from .decision_journal import DecisionJournal, decision_journal, JournalRecord
@@ -0,0 +1,82 @@
+import asyncio
+from concurrent.futures import Future
+from logging import getLogger
+from threading import Lock
+from time import time
+from typing import Callable
+
+from aiomql import Account
+
+logger = getLogger(__name__)
+
+
+class AccountState:
+    """A process wide snapshot of the account, shared by the RAM of every trader.
+
+    The account details, such as equity, balance and margin, are pulled from the terminal only when the snapshot is
+    older than ttl, or after it has been invalidated by a deal, such as an order placed or a position closed.
+    Concurrent requests for a stale snapshot share a single refresh, even when they come from strategies running on
+    different threads, so a burst of signals on the close of a bar costs one request to the terminal.
+
+    Attributes:
+        ttl (float): Seconds after which the account is refreshed.
+        clock (Callable): Source of the current time in seconds.
+        refreshed (float): Time of the last refresh, zero when the snapshot has been invalidated.
+    """
+    ttl: float
+    clock: Callable[[], float]
+    refreshed: float
+
+    def __init__(self, *, ttl: float = 5, clock: Callable[[], float] = time):
+        self.ttl = ttl
+        self.clock = clock
+        self.refreshed = 0
+        self.pending: Future | None = None
+        self.lock = Lock()
+
+    async def get(self) -> Account:
+        """Get the account, refreshed if the snapshot is stale.
+
+        Returns:
+            Account: The account singleton
+        """
+        account = Account()
+        while True:
+            with self.lock:
+                now = self.clock()
+                if self.refreshed and now - self.refreshed < self.ttl:
+                    return account
+                future = self.pending
+                owner = future is None
+                if owner:
+                    future = self.pending = Future()
+
+            if not owner:
+                await asyncio.wrap_future(future)
+                # the refresh may have been invalidated by a deal while it was in flight, so check again
+                continue
+
+            try:
+                await account.refresh()
+                with self.lock:
+                    # a deal since the refresh started leaves it invalidated
+                    if self.pending is future:
+                        self.refreshed = now
+                future.set_result(None)
+            except Exception as err:
+                future.set_exception(err)
+                raise
+            finally:
+                with self.lock:
+                    if self.pending is future:
+                        self.pending = None
+            return account
+
+    def invalidate(self):
+        """Force a refresh on the next request, after a deal has changed the account."""
+        with self.lock:
+            self.refreshed = 0
+            self.pending = None
+
+
+account_state = AccountState()
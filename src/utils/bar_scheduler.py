@@ -0,0 +1,127 @@
+import asyncio
+from concurrent.futures import Future
+from logging import getLogger
+from threading import Lock
+from time import time
+from typing import Callable
+
+from aiomql import Symbol
+
+logger = getLogger(__name__)
+
+# time zones, and with them the offsets of trade servers from the local clock, come in quarter hours
+ZONE = 900
+
+
+class BarScheduler:
+    """A process wide scheduler that wakes strategies when a new bar opens on the trade server.
+
+    Bars open on multiples of their length in the time of the trade server, which can be hours away from the local
+    clock. The offset of the server from the local clock is estimated from the time of the last tick of a symbol,
+    rounded to the quarter hour, and kept up to date with every tick the scheduler sees. After sleeping until the bar
+    should have opened the scheduler confirms the bar has opened, with a single request for the last tick of the
+    symbol, and retries at a growing interval while the tick is older than the bar. Every waiter on the same bar of
+    a symbol shares the confirmation, even when the strategies run on different threads.
+
+    Attributes:
+        retry (float): Seconds to wait before the first retry. Doubles with every retry.
+        max_retry (float): Longest wait between retries.
+        timeout (float): Seconds after the bar should have opened to give up on confirming it.
+        clock (Callable): Source of the current time in seconds.
+        offset (float): Server time minus local time in seconds.
+        synced (bool): The offset has been estimated.
+    """
+    retry: float
+    max_retry: float
+    timeout: float
+    clock: Callable[[], float]
+    offset: float
+    synced: bool
+
+    def __init__(self, *, retry: float = 0.25, max_retry: float = 5, timeout: float = 60,
+                 clock: Callable[[], float] = time):
+        self.retry = retry
+        self.max_retry = max_retry
+        self.timeout = timeout
+        self.clock = clock
+        self.offset = 0.0
+        self.synced = False
+        self.pending: dict[tuple[str, int], Future] = {}
+        self.lock = Lock()
+
+    def server_time(self) -> float:
+        return self.clock() + self.offset
+
+    def next_open(self, secs: float) -> int:
+        """Server time of the next multiple of secs."""
+        now = self.server_time()
+        return int(now - now % secs + secs)
+
+    def observe(self, tick_time: float, now: float):
+        """Estimate the offset from the time of a tick seen at a local time. The tick can lag by up to half a zone."""
+        offset = round((tick_time - now) / ZONE) * ZONE
+        # offsets beyond fourteen hours come from stale ticks of a closed market, not from time zones
+        if abs(offset) > 14 * 3600:
+            return
+        with self.lock:
+            if offset != self.offset:
+                logger.debug(f"Trade server time is {offset} seconds ahead of the local time")
+            self.offset, self.synced = offset, True
+
+    async def wait(self, *, symbol: Symbol, secs: float) -> int:
+        """Sleep until the next multiple of secs in server time and until the terminal has a tick of the symbol at or
+        after it.
+
+        Args:
+            symbol (Symbol): The financial instrument
+            secs (float): Length of the interval in seconds, usually that of the timeframe traded on
+
+        Returns:
+            int: Server time of the bar open waited for
+        """
+        if not self.synced:
+            now = self.clock()
+            tick = await symbol.info_tick()
+            self.observe(tick.time, now)
+        opens = self.next_open(secs)
+        await asyncio.sleep(max(0.0, opens - self.server_time()))
+        await self.confirm(symbol=symbol, opens=opens)
+        return opens
+
+    async def confirm(self, *, symbol: Symbol, opens: int):
+        """Wait until the terminal has a tick of the symbol at or after the given server time, sharing the requests
+        with every other waiter on the same time."""
+        key = (symbol.name, opens)
+        with self.lock:
+            future = self.pending.get(key)
+            owner = future is None
+            if owner:
+                future = self.pending[key] = Future()
+
+        if not owner:
+            await asyncio.wrap_future(future)
+            return
+
+        try:
+            retry, deadline = self.retry, self.clock() + self.timeout
+            while True:
+                now = self.clock()
+                tick = await symbol.info_tick()
+                if tick.time >= opens:
+                    self.observe(tick.time, now)
+                    break
+                if now >= deadline:
+                    logger.debug(f"No tick of {symbol.name} after {opens}, the market may be closed")
+                    break
+                await asyncio.sleep(retry)
+                retry = min(retry * 2, self.max_retry)
+            future.set_result(opens)
+        except Exception as err:
+            future.set_exception(err)
+            raise
+        finally:
+            with self.lock:
+                self.pending.pop(key, None)
+
+
+bar_scheduler = BarScheduler()
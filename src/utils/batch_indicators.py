@@ -0,0 +1,105 @@
+"""The indicators of src/utils/indicators.py computed over a matrix of bars, one row per symbol.
+
+Every function takes arrays of shape (symbols, bars) and returns values of the same shape equal, up to floating point
+error, to those of the streaming indicator started on the first column. The recurrences run along the rows in
+scipy's lfilter, so a batch costs a few passes in C whatever the number of symbols. A row of an EMA with missing
+values after the start of its mean, which only happens on bars without any price movement, is computed by the
+streaming EMA.
+"""
+import numpy as np
+from scipy.signal import lfilter
+
+from .indicators import EMA
+
+
+def sma(values: np.ndarray, length: int) -> np.ndarray:
+    """Rolling mean over length columns, missing until length values in a row are present."""
+    valid = ~np.isnan(values)
+    sums = np.cumsum(np.where(valid, values, 0.0), axis=1)
+    counts = np.cumsum(valid, axis=1)
+    result = np.full(values.shape, np.nan)
+    if length <= values.shape[1]:
+        total = sums[:, length - 1:] - np.pad(sums, ((0, 0), (1, 0)))[:, :values.shape[1] - length + 1]
+        present = counts[:, length - 1:] - np.pad(counts, ((0, 0), (1, 0)))[:, :values.shape[1] - length + 1]
+        result[:, length - 1:] = np.where(present >= length, total / length, np.nan)
+    return result
+
+
+def ema(values: np.ndarray, length: int) -> np.ndarray:
+    """pandas-ta EMA seeded with the mean of the first length values that are present. A row with none starts its
+    mean at the next value present."""
+    rows, size = values.shape
+    result = np.full(values.shape, np.nan)
+    if size < length:
+        return result
+    head = values[:, :length]
+    present = (~np.isnan(head)).sum(axis=1)
+    seeded = values.copy()
+    seeded[:, :length - 1] = np.nan
+    seeded[:, length - 1] = np.where(present > 0, np.nansum(head, axis=1) / np.maximum(present, 1), np.nan)
+    valid = ~np.isnan(seeded)
+    start = np.where(valid.any(axis=1), valid.argmax(axis=1), size)
+    alpha = 2 / (length + 1)
+    streamed = []
+    # rows starting on the same column are filtered together
+    for first in np.unique(start[start < size]):
+        group = np.flatnonzero(start == first)
+        rest = seeded[group, first + 1:]
+        gaps = np.isnan(rest).any(axis=1)
+        streamed.extend(group[gaps])
+        group, rest = group[~gaps], rest[~gaps]
+        if not len(group):
+            continue
+        result[group, first] = seeded[group, first]
+        if rest.shape[1]:
+            result[group, first + 1:], _ = lfilter([alpha], [1, alpha - 1], rest, axis=1,
+                                                   zi=(1 - alpha) * seeded[group, first][:, None])
+    for row in streamed:
+        stream = EMA(length=length)
+        result[row] = [stream.update(value) for value in values[row]]
+    return result
+
+
+def rma(values: np.ndarray, length: int) -> np.ndarray:
+    """Wilder's moving average, an adjusted exponential mean that needs length values and skips missing ones."""
+    alpha = 1 / length
+    valid = ~np.isnan(values)
+    # the adjusted mean is the ratio of the decayed sum of the values to the decayed sum of their weights
+    weighted = lfilter([1], [1, alpha - 1], np.where(valid, values, 0.0), axis=1)
+    weights = lfilter([1], [1, alpha - 1], valid.astype(float), axis=1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        result = weighted / weights
+    return np.where(np.cumsum(valid, axis=1) >= length, result, np.nan)
+
+
+def moving_average(mamode: str, values: np.ndarray, length: int) -> np.ndarray:
+    averages = {'ema': ema, 'sma': sma, 'rma': rma}
+    return averages[mamode](values, length)
+
+
+def true_range(high: np.ndarray, low: np.ndarray, close: np.ndarray) -> np.ndarray:
+    prev = np.pad(close, ((0, 0), (1, 0)), constant_values=np.nan)[:, :-1]
+    return np.maximum.reduce([np.abs(high - low), np.abs(high - prev), np.abs(prev - low)])
+
+
+def atr(high: np.ndarray, low: np.ndarray, close: np.ndarray, length: int = 14, mamode: str = 'rma') -> np.ndarray:
+    return moving_average(mamode.lower(), true_range(high, low, close), length)
+
+
+def adx(high: np.ndarray, low: np.ndarray, close: np.ndarray, length: int = 14, lensig: int = None,
+        mamode: str = 'rma', scalar: float = 100) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """ADX, DMP and DMN in the order of the columns of ADXIndicator."""
+    lensig = lensig or length
+    pad = ((0, 0), (1, 0))
+    up = high - np.pad(high, pad, constant_values=np.nan)[:, :-1]
+    dn = np.pad(low, pad, constant_values=np.nan)[:, :-1] - low
+    pos = np.where(np.isnan(up), np.nan, np.where((up > dn) & (up > 0), up, 0.0))
+    neg = np.where(np.isnan(dn), np.nan, np.where((dn > up) & (dn > 0), dn, 0.0))
+    range_ = atr(high, low, close, length=length)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        k = np.where(range_ != 0, scalar / range_, np.nan)
+        dmp = k * moving_average(mamode, pos, length)
+        dmn = k * moving_average(mamode, neg, length)
+        total = dmp + dmn
+        dx = np.where(total != 0, scalar * np.abs(dmp - dmn) / total, np.nan)
+    return moving_average(mamode, dx, lensig), dmp, dmn
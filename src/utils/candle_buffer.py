@@ -0,0 +1,81 @@
+import numpy as np
+from pandas import DataFrame
+
+
+class CandleBuffer:
+    """A preallocated ring of rates for one symbol and timeframe.
+
+    Every row is written twice, at its position and one capacity further, so the most recent rows are always
+    available as a single contiguous slice without reordering the ring.
+
+    Attributes:
+        capacity (int): Maximum number of rows held.
+        count (int): Number of rows currently held.
+        expires (float): Time after which the buffer should be brought up to date.
+        updated (float): Time of the last update from the terminal.
+    """
+    capacity: int
+    count: int
+    expires: float
+    updated: float
+
+    def __init__(self, *, capacity: int, dtype: np.dtype):
+        self.capacity = capacity
+        self.rates = np.zeros(capacity * 2, dtype=dtype)
+        self.end = 0
+        self.count = 0
+        self.expires = 0
+        self.updated = 0
+
+    @classmethod
+    def from_rates(cls, rates: np.ndarray, *, capacity: int = 0) -> 'CandleBuffer':
+        buffer = cls(capacity=max(capacity, len(rates)), dtype=rates.dtype)
+        buffer.push(rates)
+        return buffer
+
+    @property
+    def last_time(self) -> int:
+        return int(self.rates['time'][self.end + self.capacity - 1]) if self.count else 0
+
+    def push(self, rates: np.ndarray):
+        """Append rows at the end of the ring, overwriting the oldest rows once it is full."""
+        rates = rates[-self.capacity:]
+        while len(rates):
+            size = min(len(rates), self.capacity - self.end)
+            chunk, rates = rates[:size], rates[size:]
+            self.rates[self.end: self.end + size] = chunk
+            self.rates[self.end + self.capacity: self.end + self.capacity + size] = chunk
+            self.end = (self.end + size) % self.capacity
+            self.count = min(self.capacity, self.count + size)
+
+    def extend(self, rates: np.ndarray) -> bool:
+        """Merge newly fetched rows into the buffer. The rows must overlap the last held bar, which is replaced since
+        it was still forming when it was stored.
+
+        Args:
+            rates (np.ndarray): Rows in chronological order as returned by the terminal
+
+        Returns:
+            bool: False if the rows do not reach back to the last held bar and the buffer needs a full reload.
+        """
+        if not len(rates):
+            return True
+        last = self.last_time
+        if self.count == 0 or rates['time'][0] > last:
+            return False
+        rates = rates[rates['time'] >= last]
+        if len(rates) and rates['time'][0] == last:
+            pos = (self.end - 1) % self.capacity
+            self.rates[pos] = self.rates[pos + self.capacity] = rates[0]
+            rates = rates[1:]
+        self.push(rates)
+        return True
+
+    def tail(self, count: int) -> np.ndarray:
+        """A copy of the most recent rows in chronological order."""
+        count = min(count, self.count)
+        stop = self.end + self.capacity
+        return self.rates[stop - count: stop].copy()
+
+    def frame(self, count: int) -> DataFrame:
+        return DataFrame(self.tail(count))
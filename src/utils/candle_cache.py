@@ -0,0 +1,211 @@
+import asyncio
+from collections import OrderedDict
+from concurrent.futures import Future
+from logging import getLogger
+from threading import Lock
+from time import time
+from typing import Callable, Sequence
+
+import numpy as np
+from pandas import DataFrame
+from aiomql import Symbol, TimeFrame, Candles
+
+from .bar_scheduler import bar_scheduler
+from .candle_buffer import CandleBuffer
+from .decision_journal import decision_journal
+from .limiter import Limiter
+from .metrics import phase
+from .resample import resample, nests, span, bar_times
+
+logger = getLogger(__name__)
+
+
+class CandleCache:
+    """A process wide store of candles keyed by (symbol, timeframe).
+
+    Each key is backed by a CandleBuffer holding the largest count requested so far. Any smaller count is served from
+    memory until the bar that was current at fetch time closes, in the time of the trade server as estimated by the
+    bar scheduler. After that only the bars opened since the last update
+    are requested from the terminal and appended to the buffer. Concurrent requests for the same key share a single
+    terminal fetch, even when they come from strategies running on different threads. The least recently used
+    buffers are evicted once max_size is exceeded. No more than concurrency requests for rates are in flight to the
+    terminal at once across all threads.
+
+    Attributes:
+        max_size (int): Maximum number of (symbol, timeframe) buffers to keep.
+        retry (float): Seconds to wait before fetching again when the terminal has not yet opened a new bar.
+        clock (Callable): Source of the current time in seconds.
+        limiter (Limiter): Limits the requests for rates in flight.
+    """
+    max_size: int
+    retry: float
+    clock: Callable[[], float]
+    limiter: Limiter
+
+    def __init__(self, *, max_size: int = 64, retry: float = 1, clock: Callable[[], float] = time,
+                 concurrency: int = 4):
+        self.max_size = max_size
+        self.retry = retry
+        self.clock = clock
+        self.limiter = Limiter(concurrency)
+        self.entries: OrderedDict[tuple[str, TimeFrame], CandleBuffer] = OrderedDict()
+        self.pending: dict[tuple[str, TimeFrame], tuple[Future, int]] = {}
+        self.lock = Lock()
+
+    @phase('fetch')
+    async def get(self, *, symbol: Symbol, timeframe: TimeFrame, count: int = 500) -> Candles:
+        """Get the most recent candles of a symbol, going to the terminal only when the cached bars are stale
+        or fewer than requested.
+
+        Args:
+            symbol (Symbol): The financial instrument
+            timeframe (TimeFrame): Timeframe of the candles
+            count (int): Number of candles to return
+
+        Returns:
+            Candles: A new Candles object that can be modified without affecting the cache
+        """
+        return self.candles(symbol=symbol, rates=[await self.rates(symbol=symbol, timeframe=timeframe, count=count)])[0]
+
+    @phase('fetch')
+    async def frames(self, *, symbol: Symbol, counts: Sequence[tuple[TimeFrame, int]],
+                     since: float = 0) -> list[Candles]:
+        """Get candles of several timeframes of a symbol from a single cached series of the lowest of them.
+
+        The first timeframe is the one the strategy acts on. When its current bar opened before since, nothing is
+        fetched and an empty list is returned, so a strategy waiting for a new bar pays for a single tick at most.
+        The bars of the higher timeframes are built from the bars of the lowest timeframe, so one request to the
+        terminal brings every timeframe up to date and all of them end with the same bar. Timeframes whose bars are
+        not made of whole bars of the lowest timeframe are fetched on their own, concurrently with the lowest.
+
+        Args:
+            symbol (Symbol): The financial instrument
+            counts (Sequence[tuple[TimeFrame, int]]): Pairs of timeframe and number of candles to return
+            since (float): Time the current bar of the first timeframe must have opened at or after
+
+        Returns:
+            list[Candles]: New Candles objects in the order of counts, empty if there is no bar since
+        """
+        if since and await self.opened(symbol=symbol, timeframe=counts[0][0]) < since:
+            return []
+        return self.candles(symbol=symbol, rates=await self.bars(symbol=symbol, counts=counts))
+
+    @staticmethod
+    def candles(*, symbol: Symbol, rates: list[np.ndarray]) -> list[Candles]:
+        """Candles of the rates served to a strategy, noted in the decision journal when an evaluation is journaled."""
+        rates = decision_journal.inputs(symbol=symbol, rates=rates)
+        return decision_journal.watch([Candles(data=DataFrame(rate)) for rate in rates])
+
+    @phase('fetch')
+    async def bars(self, *, symbol: Symbol, counts: Sequence[tuple[TimeFrame, int]]) -> list[np.ndarray]:
+        """The rates behind frames, as copies of the cached rows or resampled bars in the order of counts."""
+        base = min((timeframe for timeframe, _ in counts), key=lambda timeframe: timeframe.time)
+        built = [(timeframe, count) for timeframe, count in counts if nests(base, timeframe)]
+        own = [(timeframe, count) for timeframe, count in counts if not nests(base, timeframe)]
+        # one more bar of every timeframe, as the first one built can be cut short by the start of the series
+        size = max(span(base, timeframe) * (count + 1) for timeframe, count in built)
+        rates, *fetched = await asyncio.gather(self.rates(symbol=symbol, timeframe=base, count=size),
+                                               *(self.rates(symbol=symbol, timeframe=timeframe, count=count)
+                                                 for timeframe, count in own))
+        bars = {timeframe: rates if timeframe == base else resample(rates, timeframe, complete=True)
+                for timeframe, _ in built}
+        fetched = iter(fetched)
+        return [bars[timeframe][-count:] if timeframe in bars else next(fetched) for timeframe, count in counts]
+
+    @phase('fetch')
+    async def opened(self, *, symbol: Symbol, timeframe: TimeFrame) -> int:
+        """Open time of the current bar of a timeframe, from a cached series it is built from while that is up to
+        date, else from the time of the last tick of the symbol."""
+        with self.lock:
+            now = self.clock()
+            times = [entry.last_time for (name, base), entry in self.entries.items()
+                     if name == symbol.name and now < entry.expires and entry.count and nests(base, timeframe)]
+        if not times:
+            tick = await symbol.info_tick()
+            times = [tick.time]
+        return int(bar_times(np.array(times[:1], dtype=np.int64), timeframe)[0])
+
+    async def rates(self, *, symbol: Symbol, timeframe: TimeFrame, count: int = 500) -> np.ndarray:
+        """Get the most recent rates of a symbol as a copy of the cached rows."""
+        key = (symbol.name, timeframe)
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and entry.count >= count and self.clock() < entry.expires:
+                self.entries.move_to_end(key)
+                return entry.tail(count)
+
+            future, size = self.pending.get(key, (None, 0))
+            owner = future is None or size < count
+            if owner:
+                size = max(count, entry.count if entry is not None else 0)
+                future = Future()
+                self.pending[key] = future, size
+
+        if not owner:
+            entry = await asyncio.wrap_future(future)
+            return self.tail(entry, count)
+
+        try:
+            entry = await self.update(key=key, symbol=symbol, timeframe=timeframe, count=size, entry=entry)
+            future.set_result(entry)
+        except Exception as err:
+            future.set_exception(err)
+            raise
+        finally:
+            with self.lock:
+                if self.pending.get(key, (None, 0))[0] is future:
+                    self.pending.pop(key)
+        return self.tail(entry, count)
+
+    async def update(self, *, key: tuple[str, TimeFrame], symbol: Symbol, timeframe: TimeFrame, count: int,
+                     entry: CandleBuffer | None) -> CandleBuffer:
+        now = self.clock()
+        secs = timeframe.time
+        last_time, expired = (entry.last_time, now >= entry.expires) if entry is not None else (0, False)
+        if entry is not None and entry.capacity >= count:
+            new = int((now - entry.updated) // secs) + 2
+            rates = await self.fetch(symbol=symbol, timeframe=timeframe, count=min(new, count))
+            with self.lock:
+                extended = entry.extend(rates)
+            if not extended:
+                logger.debug(f"Reloading {count} {timeframe} bars for {symbol.name} after a gap")
+                entry = CandleBuffer.from_rates(await self.fetch(symbol=symbol, timeframe=timeframe, count=count))
+        else:
+            entry = CandleBuffer.from_rates(await self.fetch(symbol=symbol, timeframe=timeframe, count=count),
+                                            capacity=count)
+
+        entry.updated = now
+        # bars close on multiples of their length in server time, which can be hours away from the local clock
+        offset = bar_scheduler.offset
+        server = now + offset
+        entry.expires = server - server % secs + secs - offset
+        # the local clock rolled over before the terminal opened the new bar, so check again shortly
+        if expired and entry.last_time <= last_time:
+            entry.expires = min(entry.expires, now + self.retry)
+
+        with self.lock:
+            self.entries[key] = entry
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+        return entry
+
+    async def fetch(self, *, symbol: Symbol, timeframe: TimeFrame, count: int) -> np.ndarray:
+        async with self.limiter:
+            candles = await symbol.copy_rates_from_pos(timeframe=timeframe, count=count)
+        return candles.data.to_records(index=False)
+
+    def tail(self, entry: CandleBuffer, count: int) -> np.ndarray:
+        with self.lock:
+            return entry.tail(count)
+
+    def invalidate(self, *, symbol: str = '', timeframe: TimeFrame = None):
+        """Drop cached buffers. Filter by symbol name and or timeframe, drops everything if neither is given."""
+        with self.lock:
+            keys = [key for key in self.entries if (not symbol or key[0] == symbol)
+                    and (timeframe is None or key[1] == timeframe)]
+            for key in keys:
+                self.entries.pop(key)
+
+
+candle_cache = CandleCache()
@@ -0,0 +1,119 @@
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from pandas import DataFrame
+from aiomql import Candles
+
+
+class CandleRow:
+    """A candle of a CandleView. Its values are read from the columns of the view when accessed, so creating one
+    costs no more than the two slots it holds.
+
+    Attributes:
+        view (CandleView): The view the candle belongs to.
+        index (int): Position of the candle in the view.
+    """
+    __slots__ = ('view', 'index')
+    view: 'CandleView'
+    index: int
+
+    def __init__(self, view: 'CandleView', index: int):
+        self.view = view
+        self.index = index
+
+    def __getattr__(self, name):
+        try:
+            return self.view.columns[name][self.index]
+        except KeyError:
+            raise AttributeError(f"Attribute {name} not defined on class {self.__class__.__name__}") from None
+
+    def __getitem__(self, name):
+        return self.view.columns[name][self.index]
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}({', '.join(f'{k}={v[self.index]}' for k, v in self.view.columns.items())})"
+
+    def is_bullish(self) -> bool:
+        return self.close >= self.open
+
+    def is_bearish(self) -> bool:
+        return self.open > self.close
+
+
+class CandleView:
+    """A read only view of candles as NumPy arrays, one per column.
+
+    The arrays share memory with the DataFrame of the candles wherever pandas allows, and slices of the view share
+    memory with the view, so lookups over many candles run in NumPy instead of creating a Candle object per row.
+    Columns added to the candles after the view was made are not part of it.
+
+    Attributes:
+        columns (dict[str, np.ndarray]): The values of each column.
+    """
+    __slots__ = ('columns',)
+    columns: dict[str, np.ndarray]
+
+    def __init__(self, candles: Candles | DataFrame | dict[str, np.ndarray]):
+        if isinstance(candles, dict):
+            self.columns = candles
+            return
+        data = candles.data if isinstance(candles, Candles) else candles
+        self.columns = {name: data[name].to_numpy() for name in data.columns}
+
+    def __len__(self):
+        return len(next(iter(self.columns.values()), ()))
+
+    def __getitem__(self, index: int) -> CandleRow:
+        size = len(self)
+        if not -size <= index < size:
+            raise IndexError(f"Index {index} out of range for {size} candles")
+        return CandleRow(self, index % size)
+
+    def __getattr__(self, name) -> np.ndarray:
+        try:
+            return self.columns[name]
+        except KeyError:
+            raise AttributeError(f"Attribute {name} not defined on class {self.__class__.__name__}") from None
+
+    def tail(self, count: int) -> 'CandleView':
+        """A view of the last count candles."""
+        return CandleView({name: values[-count:] if count else values[:0] for name, values in self.columns.items()})
+
+    def last(self, mask: str | np.ndarray) -> int:
+        """Position of the last candle for which mask, a boolean array or the name of a boolean column, is true.
+
+        Returns:
+            int: The position, or -1 if there is none
+        """
+        mask = np.asarray(self.columns[mask] if isinstance(mask, str) else mask, dtype=bool)
+        if not len(mask):
+            return -1
+        # argmax stops at the first true value, so only the candles after the last match are scanned
+        pos = int(np.argmax(mask[::-1]))
+        return len(mask) - 1 - pos if mask[-1 - pos] else -1
+
+    def find_last(self, mask: str | np.ndarray) -> CandleRow | None:
+        """The last candle for which mask is true, None if there is none."""
+        return self[pos] if (pos := self.last(mask)) >= 0 else None
+
+    def highest(self, period: int, column: str = 'high') -> float:
+        """Highest value of a column over the last period candles."""
+        return float(self.columns[column][-period:].max())
+
+    def lowest(self, period: int, column: str = 'low') -> float:
+        """Lowest value of a column over the last period candles."""
+        return float(self.columns[column][-period:].min())
+
+    def rolling_highest(self, period: int, column: str = 'high') -> np.ndarray:
+        """Highest value of a column over the period candles up to each candle, NaN before the first full period."""
+        return self.rolling(period, column, np.max)
+
+    def rolling_lowest(self, period: int, column: str = 'low') -> np.ndarray:
+        """Lowest value of a column over the period candles up to each candle, NaN before the first full period."""
+        return self.rolling(period, column, np.min)
+
+    def rolling(self, period: int, column: str, func) -> np.ndarray:
+        values = self.columns[column].astype(float)
+        result = np.full(len(values), np.nan)
+        if 0 < period <= len(values):
+            result[period - 1:] = func(sliding_window_view(values, period), axis=1)
+        return result
@@ -0,0 +1,344 @@
+import hashlib
+import mmap
+import os
+import pickle
+import struct
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from enum import Enum
+from logging import getLogger
+from pathlib import Path
+from threading import Lock
+from time import time
+from typing import Iterator, Sequence
+
+import numpy as np
+from pandas import isna
+from aiomql import Candles, Symbol, Strategy
+
+logger = getLogger(__name__)
+
+# the columns of the bars that are hashed and stored, volumes are left out as no strategy reads them
+PRICES = ('time', 'open', 'high', 'low', 'close')
+ROW = ('time', 'open', 'high', 'low', 'close', 'tick_volume', 'spread', 'real_volume')
+STRATEGY, EVALUATION = 1, 2
+DIGITS = 8
+
+
+def digest(rates: np.ndarray) -> bytes:
+    """Hash of the prices of the closed bars of rates, all but the last one."""
+    closed = rates[:-1]
+    hashed = hashlib.blake2b(digest_size=8)
+    # column by column as float64, so the hash does not depend on the layout or the integer types of the rates, and
+    # rounded past the digits of any symbol, as bars read back from csv files can be off in the last bit
+    for name in PRICES:
+        hashed.update(np.round(np.asarray(closed[name], dtype=np.float64), DIGITS))
+    return hashed.digest()
+
+
+def last_row(rates: np.ndarray) -> tuple:
+    """The bar still forming when the rates were fetched, which no stored history can give back."""
+    if not len(rates):
+        return ()
+    row = rates[-1]
+    return tuple(row[name].item() if name in rates.dtype.names else 0 for name in ROW)
+
+
+def scalar(value):
+    return None if isna(value) else value.item() if hasattr(value, 'item') else value
+
+
+def tracker_state(tracker) -> dict:
+    return {key: value.value if isinstance(value, Enum) else value for key, value in vars(tracker).items()}
+
+
+@dataclass
+class Evaluation:
+    """The inputs and outputs of one evaluation of a strategy, collected while it runs.
+
+    Attributes:
+        strategy (Strategy): The strategy evaluated.
+        before (dict): State of the tracker of the strategy before the evaluation.
+        frames (list[tuple[bytes, tuple]]): Hash of the closed bars and the forming bar of every set of rates read.
+        candles (list[Candles]): The candles read, their last rows give the indicator values.
+        replay (deque | None): Frames of a journaled evaluation to feed back in place of the ones read.
+        mismatches (int): Number of frames read in a replay that differ from the journaled ones.
+    """
+    strategy: Strategy
+    before: dict
+    frames: list[tuple[bytes, tuple]] = field(default_factory=list)
+    candles: list[Candles] = field(default_factory=list)
+    replay: deque | None = None
+    mismatches: int = 0
+
+
+@dataclass
+class JournalRecord:
+    """A journaled evaluation.
+
+    Attributes:
+        time (float): Local time at the end of the evaluation.
+        strategy (str): Import path of the class of the strategy.
+        name (str): Name of the strategy.
+        symbol (str): Name of the symbol.
+        params (dict): Parameters of the strategy.
+        frames (list[tuple[bytes, tuple]]): Hash of the closed bars and the forming bar of every set of rates read.
+        before (dict): State of the tracker before the evaluation.
+        after (dict): State of the tracker after the evaluation, with the decision.
+        indicators (list[dict]): Values on the last row of every set of candles read, other than the bar itself.
+    """
+    time: float
+    strategy: str
+    name: str
+    symbol: str
+    params: dict
+    frames: list[tuple[bytes, tuple]]
+    before: dict
+    after: dict
+    indicators: list[dict]
+
+
+current_evaluation: ContextVar[Evaluation | None] = ContextVar('current_evaluation', default=None)
+
+
+class DecisionJournal:
+    """An append only journal of strategy evaluations in rotating memory mapped files.
+
+    An evaluation is wrapped in evaluation around the call that checks the market. The candle cache passes the
+    rates it serves through inputs, keeping a hash of the closed bars and a copy of the forming bar, and the candles
+    made from them through watch, whose last rows give the indicator values once the evaluation ends. Evaluations
+    that read no bars, as there was no new one yet, are not journaled. A record is copied into the mapped segment
+    and the end offset in its header moved past it, so writing costs no system call. When a segment is full the next
+    one is started and the oldest segments beyond the limit are deleted. Each segment starts with the strategies its
+    records refer to, so every segment can be read on its own. The journal is closed, and costs nothing, until
+    opened. The names of the segments carry the name the journal was opened with, the id of the process by default,
+    and a journal only ever creates, rotates and deletes segments of its own name, so bots running in separate
+    processes can share a directory.
+
+    Attributes:
+        directory (Path | None): Directory of the segments, None while closed.
+        name (str): Name of the segments of the journal.
+        segment_size (int): Size in bytes of a segment.
+        segments (int): Number of segments to keep.
+    """
+    MAGIC = b'DJNL'
+    HEADER = struct.Struct('<4sHQ')
+    RECORD = struct.Struct('<IB')
+    directory: Path | None
+    name: str
+    segment_size: int
+    segments: int
+
+    def __init__(self):
+        self.directory = None
+        self.name = ''
+        self.segment_size = 0
+        self.segments = 0
+        self.file = None
+        self.map: mmap.mmap | None = None
+        self.index = 0
+        self.offset = 0
+        self.ids: dict[int, int] = {}
+        self.lock = Lock()
+
+    def open(self, *, directory: str | Path, name: str = '', segment_size: int = 16 * 1024 * 1024,
+             segments: int = 8):
+        """Start journaling into a new segment in directory, after any segments of the same name already there."""
+        self.close()
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        with self.lock:
+            self.directory, self.segment_size, self.segments = directory, segment_size, segments
+            self.name = name or str(os.getpid())
+            existing = self.paths(directory, name=self.name)
+            self.index = int(existing[-1].stem.rpartition('-')[2]) + 1 if existing else 0
+            self.start_segment()
+
+    def close(self):
+        with self.lock:
+            if self.map is not None:
+                self.map.flush()
+                self.map.close()
+                self.file.close()
+            self.map = self.file = self.directory = None
+
+    @staticmethod
+    def paths(directory: Path, *, name: str = '') -> list[Path]:
+        """The segments in a directory, of a name if one is given."""
+        return sorted(directory.glob(f"journal-{name}-*.bin" if name else 'journal-*.bin'))
+
+    def start_segment(self):
+        while True:
+            path = self.directory / f"journal-{self.name}-{self.index:06d}.bin"
+            try:
+                # a segment is never opened again, as another journal may have it mapped
+                self.file = open(path, 'x+b')
+                break
+            except FileExistsError:
+                self.index += 1
+        self.file.truncate(self.segment_size)
+        self.map = mmap.mmap(self.file.fileno(), self.segment_size)
+        self.offset = self.HEADER.size
+        self.HEADER.pack_into(self.map, 0, self.MAGIC, 1, self.offset)
+        self.ids = {}
+        for old in self.paths(self.directory, name=self.name)[:-self.segments]:
+            old.unlink(missing_ok=True)
+
+    def rotate(self):
+        self.map.flush()
+        self.map.close()
+        self.file.close()
+        self.index += 1
+        self.start_segment()
+
+    def write(self, kind: int, payload: bytes) -> bool:
+        """Append a record to the current segment. When it does not fit, the next segment is started and False
+        returned, as the record must follow the strategies it refers to there."""
+        size = self.RECORD.size + len(payload)
+        if self.HEADER.size + size > self.segment_size:
+            raise ValueError(f"A journal record of {size} bytes does not fit in a segment")
+        if self.offset + size > self.segment_size:
+            self.rotate()
+            return False
+        self.RECORD.pack_into(self.map, self.offset, len(payload), kind)
+        self.map[self.offset + self.RECORD.size: self.offset + size] = payload
+        self.offset += size
+        # the end offset is moved last, so a reader never sees a partly written record
+        struct.pack_into('<Q', self.map, 6, self.offset)
+        return True
+
+    def strategy_id(self, strategy: Strategy) -> int:
+        """Id of a strategy in the current segment, writing its record first if it has none yet."""
+        if (sid := self.ids.get(id(strategy))) is not None:
+            return sid
+        sid = len(self.ids)
+        cls = type(strategy)
+        params = strategy.parameters
+        try:
+            data = pickle.dumps(params, protocol=5)
+        except Exception:
+            data = pickle.dumps({key: value for key, value in params.items() if picklable(value)}, protocol=5)
+        payload = pickle.dumps((sid, f"{cls.__module__}.{cls.__qualname__}", strategy.name, strategy.symbol.name,
+                                data), protocol=5)
+        if not self.write(STRATEGY, payload):
+            # a new segment was started, its first record is this strategy
+            return self.strategy_id(strategy)
+        self.ids[id(strategy)] = sid
+        return sid
+
+    def record(self, state: Evaluation):
+        after = state.strategy.tracker
+        if not state.frames:
+            return
+        indicators = [{name: scalar(data[name].iat[-1]) for name in data.columns if name not in ROW}
+                      for data in (candles.data for candles in state.candles) if len(data)]
+        with self.lock:
+            if self.map is None:
+                return
+            written = False
+            while not written:
+                sid = self.strategy_id(state.strategy)
+                payload = pickle.dumps((sid, time(), state.frames, state.before, tracker_state(after), indicators),
+                                       protocol=5)
+                written = self.write(EVALUATION, payload)
+
+    @contextmanager
+    def evaluation(self, strategy: Strategy):
+        """Journal the evaluation of a strategy run in the block."""
+        if self.map is None:
+            yield None
+            return
+        state = Evaluation(strategy=strategy, before=tracker_state(strategy.tracker))
+        token = current_evaluation.set(state)
+        try:
+            yield state
+        finally:
+            current_evaluation.reset(token)
+            try:
+                self.record(state)
+            except Exception as err:
+                logger.error(f"{err}: Unable to journal {strategy.name} for {strategy.symbol}")
+
+    @staticmethod
+    @contextmanager
+    def replaying(strategy: Strategy, frames: Sequence[tuple[bytes, tuple]]):
+        """Feed the forming bars of journaled frames to the evaluation of a strategy run in the block."""
+        state = Evaluation(strategy=strategy, before=tracker_state(strategy.tracker), replay=deque(frames))
+        token = current_evaluation.set(state)
+        try:
+            yield state
+        finally:
+            current_evaluation.reset(token)
+
+    @staticmethod
+    def inputs(*, symbol: Symbol, rates: list[np.ndarray]) -> list[np.ndarray]:
+        """Note the rates read by the evaluation in progress. In a replay the forming bar of each is replaced with the
+        journaled one and the closed bars are checked against the journaled hash."""
+        state = current_evaluation.get()
+        if state is None or state.strategy.symbol.name != symbol.name:
+            return rates
+        if state.replay is None:
+            state.frames.extend((digest(frame), last_row(frame)) for frame in rates)
+            return rates
+        replayed = []
+        for frame in rates:
+            if not state.replay:
+                state.mismatches += 1
+                replayed.append(frame)
+                continue
+            hashed, row = state.replay.popleft()
+            frame = frame.copy()
+            if digest(frame) != hashed or not len(frame) or not row or frame['time'][-1] != row[0]:
+                state.mismatches += 1
+            if len(frame) and row:
+                for name, value in zip(ROW, row):
+                    if name in frame.dtype.names:
+                        frame[name][-1] = value
+            replayed.append(frame)
+        return replayed
+
+    @staticmethod
+    def watch(candles: list[Candles]) -> list[Candles]:
+        """Keep the candles read by the evaluation in progress, to journal their indicator values at its end."""
+        if (state := current_evaluation.get()) is not None:
+            state.candles.extend(candles)
+        return candles
+
+    @classmethod
+    def read(cls, directory: str | Path) -> Iterator[JournalRecord]:
+        """The evaluations journaled in a directory, oldest first."""
+        for path in cls.paths(Path(directory)):
+            data = path.read_bytes()
+            # a segment another process has only just created can still be empty
+            if len(data) < cls.HEADER.size:
+                continue
+            magic, _, end = cls.HEADER.unpack_from(data, 0)
+            if magic != cls.MAGIC:
+                continue
+            strategies = {}
+            offset = cls.HEADER.size
+            while offset < end:
+                size, kind = cls.RECORD.unpack_from(data, offset)
+                payload = pickle.loads(data[offset + cls.RECORD.size: offset + cls.RECORD.size + size])
+                offset += cls.RECORD.size + size
+                if kind == STRATEGY:
+                    sid, strategy, name, symbol, params = payload
+                    strategies[sid] = strategy, name, symbol, pickle.loads(params)
+                elif kind == EVALUATION:
+                    sid, at, frames, before, after, indicators = payload
+                    strategy, name, symbol, params = strategies[sid]
+                    yield JournalRecord(time=at, strategy=strategy, name=name, symbol=symbol, params=params,
+                                        frames=frames, before=before, after=after, indicators=indicators)
+
+
+def picklable(value) -> bool:
+    try:
+        pickle.dumps(value, protocol=5)
+        return True
+    except Exception:
+        return False
+
+
+decision_journal = DecisionJournal()
@@ -0,0 +1,175 @@
+import asyncio
+from concurrent.futures import Future
+from logging import getLogger
+from threading import Lock
+from time import time
+from typing import Callable, Iterable
+
+from aiomql import Order, OrderType, Positions, TradePosition
+
+logger = getLogger(__name__)
+
+
+class ExposureIndex:
+    """A process wide index of the open positions by symbol, by comment and by direction, with the losing ones.
+
+    The index is rebuilt from the single query for every open position made by the trade monitor on each cycle, and
+    by the first request after it is older than ttl when the monitor has not run since. In between, positions opened
+    and closed by the bot are added and removed as their orders succeed, so the limits of the RAM are checked
+    against memory instead of the terminal. A position opened or closed after a bulk query was made is not undone
+    by the query arriving later. Concurrent requests for a stale index share a single query, even when they come
+    from strategies running on different threads.
+
+    Attributes:
+        ttl (float): Seconds after which the positions are queried again on request.
+        clock (Callable): Source of the current time in seconds.
+        positions (dict[int, TradePosition]): Open positions by ticket.
+        symbols (dict[str, set[int]]): Tickets by symbol.
+        comments (dict[str, set[int]]): Tickets by comment, the name of the strategy that opened them.
+        types (dict[OrderType, set[int]]): Tickets by direction.
+        losing (dict[str, set[int]]): Tickets of the positions in loss by symbol.
+    """
+    ttl: float
+    clock: Callable[[], float]
+    positions: dict[int, TradePosition]
+    symbols: dict[str, set[int]]
+    comments: dict[str, set[int]]
+    types: dict[OrderType, set[int]]
+    losing: dict[str, set[int]]
+
+    def __init__(self, *, ttl: float = 15, clock: Callable[[], float] = time):
+        self.ttl = ttl
+        self.clock = clock
+        self.lock = Lock()
+        self.pending: Future | None = None
+        self.clear()
+
+    def clear(self):
+        """Drop every position, so the next request queries the terminal."""
+        with self.lock:
+            self.positions = {}
+            self.symbols, self.comments, self.types, self.losing = {}, {}, {}, {}
+            # tickets opened or closed by the bot since, by the time they were
+            self.opened_at: dict[int, float] = {}
+            self.closed_at: dict[int, float] = {}
+            self.updated = 0.0
+
+    def index(self, position: TradePosition):
+        ticket = position.ticket
+        self.unindex(ticket)
+        self.positions[ticket] = position
+        self.symbols.setdefault(position.symbol, set()).add(ticket)
+        self.comments.setdefault(position.comment, set()).add(ticket)
+        self.types.setdefault(OrderType(position.type), set()).add(ticket)
+        if position.profit < 0:
+            self.losing.setdefault(position.symbol, set()).add(ticket)
+
+    def unindex(self, ticket: int):
+        if (position := self.positions.pop(ticket, None)) is None:
+            return
+        self.symbols.get(position.symbol, set()).discard(ticket)
+        self.comments.get(position.comment, set()).discard(ticket)
+        self.types.get(OrderType(position.type), set()).discard(ticket)
+        self.losing.get(position.symbol, set()).discard(ticket)
+
+    def update(self, *, positions: Iterable[TradePosition], since: float):
+        """Rebuild the index from the open positions returned by a query made at since."""
+        positions = {position.ticket: position for position in positions}
+        with self.lock:
+            kept = [position for ticket, position in self.positions.items()
+                    if ticket not in positions and self.opened_at.get(ticket, -1) >= since]
+            self.positions = {}
+            self.symbols, self.comments, self.types, self.losing = {}, {}, {}, {}
+            for position in [*positions.values(), *kept]:
+                if self.closed_at.get(position.ticket, -1) < since:
+                    self.index(position)
+            self.opened_at = {ticket: at for ticket, at in self.opened_at.items() if at >= since}
+            self.closed_at = {ticket: at for ticket, at in self.closed_at.items() if at >= since}
+            self.updated = max(self.updated, since)
+
+    def modified(self, *, position: TradePosition):
+        """Replace a single position with a newer copy, such as after its stops were modified."""
+        with self.lock:
+            if position.ticket not in self.closed_at:
+                self.index(position)
+
+    def opened(self, *, ticket: int, order: Order, price: float = 0):
+        """Add the position opened by an order that succeeded."""
+        now = self.clock()
+        price = price or order.price
+        position = TradePosition(ticket=ticket, symbol=order.symbol, type=order.type, volume=order.volume,
+                                 price_open=price, price_current=price, sl=order.sl, tp=order.tp, profit=0,
+                                 comment=order.comment, time=int(now))
+        with self.lock:
+            self.index(position)
+            self.opened_at[ticket] = now
+
+    def closed(self, *, ticket: int):
+        """Remove a position that has been closed."""
+        with self.lock:
+            self.unindex(ticket)
+            self.closed_at[ticket] = self.clock()
+
+    async def refresh(self):
+        """Query the open positions if the index is older than ttl."""
+        with self.lock:
+            now = self.clock()
+            if self.updated and now - self.updated < self.ttl:
+                return
+            future = self.pending
+            owner = future is None
+            if owner:
+                future = self.pending = Future()
+
+        if not owner:
+            await asyncio.wrap_future(future)
+            return
+
+        try:
+            positions = await Positions().positions_get()
+            self.update(positions=positions, since=now)
+            future.set_result(None)
+        except Exception as err:
+            future.set_exception(err)
+            raise
+        finally:
+            with self.lock:
+                if self.pending is future:
+                    self.pending = None
+
+    async def get(self, *, symbol: str = '') -> list[TradePosition]:
+        """The open positions, of a symbol if one is given."""
+        await self.refresh()
+        with self.lock:
+            if not symbol:
+                return list(self.positions.values())
+            return [self.positions[ticket] for ticket in self.symbols.get(symbol, ())]
+
+    async def tickets(self, *, symbol: str = '') -> set[int]:
+        """Tickets of the open positions, of a symbol if one is given."""
+        await self.refresh()
+        with self.lock:
+            return set(self.symbols.get(symbol, ())) if symbol else set(self.positions)
+
+    async def count(self, *, symbol: str = '', comment: str = '', order_type: OrderType = None) -> int:
+        """Number of open positions, narrowed down by symbol, comment and direction when given."""
+        await self.refresh()
+        with self.lock:
+            groups = [group.get(key, set()) for group, key in ((self.symbols, symbol), (self.comments, comment),
+                                                                (self.types, order_type)) if key not in ('', None)]
+            if not groups:
+                return len(self.positions)
+            if len(groups) == 1:
+                return len(groups[0])
+            return len(set.intersection(*groups))
+
+    async def losing_count(self, *, symbol: str = '') -> int:
+        """Number of open positions in loss as of the last query, of a symbol if one is given."""
+        await self.refresh()
+        with self.lock:
+            if symbol:
+                return len(self.losing.get(symbol, ()))
+            return sum(len(tickets) for tickets in self.losing.values())
+
+
+exposure_index = ExposureIndex()
@@ -1,41 +1,58 @@
+import numpy as np
 from aiomql import Candle, Candles
 
 
 class Fractal:
-    middle: Candle
-    first_left: Candle
-    first_right: Candle
-    second_left: Candle
-    second_right: Candle
+    """A five candle fractal. The candles are only taken from the source candles when they are accessed."""
+    candles: Candles
+    index: int
+
+    def __init__(self, *, candles: Candles, index: int):
+        self.candles = candles
+        self.index = index
+
+    @property
+    def middle(self) -> Candle:
+        return self.candles[self.index]
+
+    @property
+    def first_left(self) -> Candle:
+        return self.candles[self.index - 1]
+
+    @property
+    def first_right(self) -> Candle:
+        return self.candles[self.index + 1]
+
+    @property
+    def second_left(self) -> Candle:
+        return self.candles[self.index - 2]
+
+    @property
+    def second_right(self) -> Candle:
+        return self.candles[self.index + 2]
+
+
+def bearish_fractal_indices(highs: np.ndarray) -> np.ndarray:
+    """Indices of the bars with a high above the highs of the two bars on either side, most recent first."""
+    highs = np.asarray(highs, dtype=float)
+    mid = highs[2:-2]
+    mask = (mid > highs[:-4]) & (mid > highs[1:-3]) & (mid > highs[3:-1]) & (mid > highs[4:])
+    return np.flatnonzero(mask)[::-1] + 2
+
+
+def bullish_fractal_indices(lows: np.ndarray) -> np.ndarray:
+    """Indices of the bars with a low below the lows of the two bars on either side, most recent first."""
+    lows = np.asarray(lows, dtype=float)
+    mid = lows[2:-2]
+    mask = (mid < lows[:-4]) & (mid < lows[1:-3]) & (mid < lows[3:-1]) & (mid < lows[4:])
+    return np.flatnonzero(mask)[::-1] + 2
 
 
 def find_bearish_fractals(candles: Candles, count: int = None) -> list[Fractal]:
-    fractals = []
-    for i in range(len(candles) - 3, 1, -1):
-        if candles[i].high > max(candles[i - 1].high, candles[i + 1].high, candles[i - 2].high, candles[i + 2].high):
-            fractal = Fractal()
-            fractal.middle = candles[i]
-            fractal.first_left = candles[i - 1]
-            fractal.first_right = candles[i + 1]
-            fractal.second_left = candles[i - 2]
-            fractal.second_right = candles[i + 2]
-            fractals.append(fractal)
-        if count and len(fractals) == count:
-            return fractals
-    return fractals
+    indices = bearish_fractal_indices(candles.data['high'].to_numpy())
+    return [Fractal(candles=candles, index=int(i)) for i in indices[:count or None]]
 
 
 def find_bullish_fractals(candles: Candles, count: int = None) -> list[Fractal]:
-    fractals = []
-    for i in range(len(candles) - 3, 1, -1):
-        if candles[i].low < min(candles[i - 1].low, candles[i + 1].low, candles[i - 2].low, candles[i + 2].low):
-            fractal = Fractal()
-            fractal.middle = candles[i]
-            fractal.first_left = candles[i - 1]
-            fractal.first_right = candles[i + 1]
-            fractal.second_left = candles[i - 2]
-            fractal.second_right = candles[i + 2]
-            fractals.append(fractal)
-        if count and len(fractals) == count:
-            return fractals
-    return fractals
+    indices = bullish_fractal_indices(candles.data['low'].to_numpy())
+    return [Fractal(candles=candles, index=int(i)) for i in indices[:count or None]]
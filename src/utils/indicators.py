@@ -0,0 +1,399 @@
+"""Streaming versions of the pandas-ta indicators used by the strategies and closers.
+
+Each indicator keeps the running state needed to produce its next value from the next bar alone, so bringing an
+indicator up to date costs O(1) per new bar instead of a pass over the whole window. The recurrences follow pandas-ta,
+including its warm-up, so values agree with `candles.ta.<indicator>` on the same window up to floating point error,
+and to within the decay of the warm-up when the state has been running for longer than the window. Windows too short
+for that decay to be negligible are computed from their first candle.
+"""
+from bisect import bisect_right, insort
+from collections import deque, OrderedDict
+from functools import partial, cache
+from inspect import signature
+from math import nan, isnan
+from pickle import dumps, loads
+from threading import Lock
+from typing import Callable
+
+import numpy as np
+from aiomql import Candles, TimeFrame
+
+from .metrics import phase
+
+
+class EWM:
+    """Exponentially weighted mean with the semantics of pandas `Series.ewm(...).mean()` and ignore_na=False."""
+    def __init__(self, *, alpha: float, adjust: bool = True, min_periods: int = 0):
+        self.alpha = alpha
+        self.adjust = adjust
+        self.min_periods = max(min_periods, 1)
+        self.weighted = nan
+        self.old_wt = 1.0
+        self.nobs = 0
+
+    def update(self, value: float) -> float:
+        observed = not isnan(value)
+        self.nobs += observed
+        if not isnan(self.weighted):
+            self.old_wt *= 1 - self.alpha
+            if observed:
+                new_wt = 1.0 if self.adjust else self.alpha
+                if self.weighted != value:
+                    self.weighted = (self.old_wt * self.weighted + new_wt * value) / (self.old_wt + new_wt)
+                self.old_wt = self.old_wt + new_wt if self.adjust else 1.0
+        elif observed:
+            self.weighted = value
+        return self.weighted if self.nobs >= self.min_periods else nan
+
+
+class RMA(EWM):
+    """Wilder's moving average as computed by pandas-ta."""
+    def __init__(self, *, length: int = 10):
+        super().__init__(alpha=1 / length, min_periods=length)
+
+
+class EMA:
+    """pandas-ta EMA. The first value is the mean of the first length values that are present, missing if none is,
+    in which case the mean starts at the next value present."""
+    def __init__(self, *, length: int = 10):
+        self.length = length
+        self.seen = 0
+        self.total = 0.0
+        self.valid = 0
+        self.ewm = EWM(alpha=2 / (length + 1), adjust=False)
+
+    def update(self, value: float) -> float:
+        self.seen += 1
+        if self.seen <= self.length and not isnan(value):
+            self.total += value
+            self.valid += 1
+        if self.seen < self.length:
+            return nan
+        if self.seen == self.length:
+            value = self.total / self.valid if self.valid else nan
+        return self.ewm.update(value)
+
+
+class SMA:
+    """Rolling mean with min_periods equal to length."""
+    def __init__(self, *, length: int = 10):
+        self.length = length
+        self.window = deque(maxlen=length)
+        self.total = 0.0
+        self.valid = 0
+
+    def update(self, value: float) -> float:
+        if len(self.window) == self.length:
+            old = self.window[0]
+            if not isnan(old):
+                self.total -= old
+                self.valid -= 1
+        self.window.append(value)
+        if not isnan(value):
+            self.total += value
+            self.valid += 1
+        return self.total / self.valid if self.valid >= self.length else nan
+
+
+def moving_average(mamode: str, length: int) -> EMA | SMA | RMA:
+    averages = {'ema': EMA, 'sma': SMA, 'rma': RMA}
+    return averages[mamode](length=length)
+
+
+class Indicator:
+    """Base class of the streaming indicators. Subclasses set `columns` and implement `update`, which takes a bar as
+    (open, high, low, close) and returns one value per column."""
+    columns: tuple[str, ...]
+
+    def update(self, open_: float, high: float, low: float, close: float) -> tuple[float, ...]:
+        raise NotImplementedError
+
+    def peek(self, open_: float, high: float, low: float, close: float) -> tuple[float, ...]:
+        """Values for a bar that is still forming, without committing it to the state."""
+        # a pickle round trip is a few times faster than deepcopy for these small object graphs
+        return loads(dumps(self, -1)).update(open_, high, low, close)
+
+
+class EMAIndicator(Indicator):
+    def __init__(self, *, length: int = 10, close: str = 'close'):
+        self.columns = (f"EMA_{length}",)
+        self.source = close
+        self.ema = EMA(length=length)
+
+    def update(self, open_, high, low, close):
+        return self.ema.update(open_ if self.source == 'open' else close),
+
+
+class SMAIndicator(Indicator):
+    def __init__(self, *, length: int = 10, close: str = 'close'):
+        self.columns = (f"SMA_{length}",)
+        self.source = close
+        self.sma = SMA(length=length)
+
+    def update(self, open_, high, low, close):
+        return self.sma.update(open_ if self.source == 'open' else close),
+
+
+class TrueRange:
+    def __init__(self):
+        self.prev_close = nan
+
+    def update(self, high: float, low: float, close: float) -> float:
+        prev, self.prev_close = self.prev_close, close
+        if isnan(prev):
+            return nan
+        return max(abs(high - low), abs(high - prev), abs(prev - low))
+
+
+class ATRIndicator(Indicator):
+    def __init__(self, *, length: int = 14, mamode: str = 'rma'):
+        mamode = mamode.lower()
+        self.columns = (f"ATR{mamode[0]}_{length}",)
+        self.tr = TrueRange()
+        self.ma = moving_average(mamode, length)
+
+    def update(self, open_, high, low, close):
+        return self.ma.update(self.tr.update(high, low, close)),
+
+
+class ADXIndicator(Indicator):
+    def __init__(self, *, length: int = 14, lensig: int = None, mamode: str = 'rma', scalar: float = 100):
+        lensig = lensig or length
+        self.columns = (f"ADX_{lensig}", f"DMP_{length}", f"DMN_{length}")
+        self.scalar = scalar
+        self.atr = ATRIndicator(length=length)
+        self.pos = moving_average(mamode, length)
+        self.neg = moving_average(mamode, length)
+        self.adx = moving_average(mamode, lensig)
+        self.prev_high = nan
+        self.prev_low = nan
+
+    def update(self, open_, high, low, close):
+        atr, = self.atr.update(open_, high, low, close)
+        up, dn = high - self.prev_high, self.prev_low - low
+        self.prev_high, self.prev_low = high, low
+        pos = up if up > dn and up > 0 else nan if isnan(up) else 0.0
+        neg = dn if dn > up and dn > 0 else nan if isnan(dn) else 0.0
+        k = self.scalar / atr if atr else nan
+        dmp = k * self.pos.update(pos)
+        dmn = k * self.neg.update(neg)
+        total = dmp + dmn
+        dx = self.scalar * abs(dmp - dmn) / total if total else nan
+        return self.adx.update(dx), dmp, dmn
+
+
+class RSIIndicator(Indicator):
+    def __init__(self, *, length: int = 14, scalar: float = 100):
+        self.columns = (f"RSI_{length}",)
+        self.scalar = scalar
+        self.prev_close = nan
+        self.pos = RMA(length=length)
+        self.neg = RMA(length=length)
+
+    def update(self, open_, high, low, close):
+        diff, self.prev_close = close - self.prev_close, close
+        pos = self.pos.update(max(diff, 0.0) if not isnan(diff) else nan)
+        neg = self.neg.update(min(diff, 0.0) if not isnan(diff) else nan)
+        total = pos + abs(neg)
+        return self.scalar * pos / total if total else nan,
+
+
+class IndicatorState:
+    """The running state of one indicator for one symbol and timeframe, with the values of the committed bars kept in
+    a ring so full columns can be returned without recomputation."""
+    def __init__(self, factory: Callable[[], Indicator], capacity: int):
+        self.factory = factory
+        self.capacity = capacity
+        self.lock = Lock()
+        self.reset()
+
+    def reset(self):
+        self.indicator = self.factory()
+        self.values = np.full((self.capacity * 2, len(self.indicator.columns)), nan)
+        self.end = 0
+        self.count = 0
+        self.last_time = None
+
+    def restore(self, indicator: Indicator, values: np.ndarray, time: int):
+        """Continue from an indicator that has committed the bars with the given values, the last of them at time."""
+        count = min(len(values), self.capacity)
+        self.indicator = indicator
+        self.values[:count] = self.values[self.capacity: self.capacity + count] = values[len(values) - count:]
+        self.end = count % self.capacity
+        self.count = count
+        self.last_time = time
+
+    def commit(self, bar: tuple[float, float, float, float], time: int):
+        values = self.indicator.update(*bar)
+        self.values[self.end] = self.values[self.end + self.capacity] = values
+        self.end = (self.end + 1) % self.capacity
+        self.count = min(self.capacity, self.count + 1)
+        self.last_time = time
+
+    def tail(self, count: int) -> np.ndarray:
+        stop = self.end + self.capacity
+        return self.values[stop - count: stop]
+
+
+class IndicatorJournal:
+    """The values of the committed bars of one indicator in time order, with the indicator saved after the last
+    commit of every `apply` call. A later pass over the same bars, such as another backtest over the same history,
+    resumes from the latest saved indicator within its candles instead of starting over from the first candle."""
+    def __init__(self, width: int):
+        self.times = np.empty(0, dtype=np.int64)
+        self.values = np.empty((0, width))
+        self.size = 0
+        self.saved: dict[int, bytes] = {}
+        self.saved_times: list[int] = []
+
+    def resume(self, times: np.ndarray) -> tuple[Indicator, np.ndarray, int] | None:
+        """The latest saved indicator within the given bar times, the values of the bars up to it and their number.
+        None if the journal does not start at or before the first of the bars."""
+        journal = self.times[:self.size]
+        first = int(np.searchsorted(journal, times[0])) if len(times) else self.size
+        if first == self.size or journal[first] != times[0]:
+            return None
+        covered = min(len(times), self.size - first)
+        if journal[first + covered - 1] != times[covered - 1]:
+            return None
+        i = bisect_right(self.saved_times, int(times[covered - 1])) - 1
+        if i < 0 or self.saved_times[i] < times[0]:
+            return None
+        done = int(np.searchsorted(times, self.saved_times[i])) + 1
+        return loads(self.saved[self.saved_times[i]]), self.values[first: first + done], done
+
+    def record(self, times: np.ndarray, values: np.ndarray, indicator: Indicator):
+        """Add the values of bars after the last one held and save the indicator as of the last bar. Bars that do not
+        continue from the last bar held are ignored."""
+        if not len(times):
+            return
+        start = 0
+        if self.size:
+            start = int(np.searchsorted(times, self.times[self.size - 1], side='right'))
+            if start == 0 or times[start - 1] != self.times[self.size - 1]:
+                return
+        new = len(times) - start
+        if self.size + new > len(self.times):
+            capacity = max(self.size + new, 2 * len(self.times))
+            self.times = np.resize(self.times, capacity)
+            self.values = np.resize(self.values, (capacity, self.values.shape[1]))
+        self.times[self.size: self.size + new] = times[start:]
+        self.values[self.size: self.size + new] = values[start:]
+        self.size += new
+        if (last := int(times[-1])) not in self.saved:
+            self.saved[last] = dumps(indicator, -1)
+            insort(self.saved_times, last)
+
+
+class IndicatorEngine:
+    """A process wide store of streaming indicator states keyed by (symbol, timeframe, kind, parameters).
+
+    `apply` brings the state up to date with the closed bars of a Candles object, evaluates the last bar as a forming
+    bar and appends the resulting columns to the candles under the names pandas-ta would use. Only bars newer than the
+    last committed bar are processed. The state is rebuilt from the candles when they do not contain the last
+    committed bar or when they are longer than the values held. A window shorter than warmup times the length of the
+    indicator is computed from its first candle on every call, as a state warmed on earlier bars would move its values
+    away from those of pandas-ta on the same window by more than rounding. The SMA keeps no memory of earlier bars, so
+    it is always streamed.
+
+    Setting `journals` to a dict keeps an IndicatorJournal for every key, so repeated backtests over the same history
+    in one process, such as the runs of a parameter sweep, share the indicator columns they have in common. Values
+    served from a journal agree with a fresh state up to the decay of the warm-up. Journals are not thread safe and
+    are meant for backtests, which run on a single thread.
+
+    Attributes:
+        max_size (int): Maximum number of indicator states to keep.
+        warmup (int): Multiple of the length of an indicator below which a window is computed from its first candle.
+        kinds (dict): Supported indicators by name.
+        journals (dict[tuple, IndicatorJournal] | None): Journals by key, None to keep no journals.
+    """
+    kinds = {'ema': EMAIndicator, 'sma': SMAIndicator, 'atr': ATRIndicator, 'adx': ADXIndicator,
+             'rsi': RSIIndicator}
+
+    def __init__(self, *, max_size: int = 512, warmup: int = 10):
+        self.max_size = max_size
+        self.warmup = warmup
+        self.states: OrderedDict[tuple, IndicatorState] = OrderedDict()
+        self.journals: dict[tuple, IndicatorJournal] | None = None
+        self.lock = Lock()
+
+    def state(self, *, key: tuple, kind: str, capacity: int, params: dict) -> IndicatorState:
+        with self.lock:
+            state = self.states.get(key)
+            if state is None or state.capacity < capacity:
+                # grow geometrically so candles that lengthen bar by bar do not rebuild the state on every bar
+                capacity = max(capacity, 2 * state.capacity) if state is not None else capacity
+                state = IndicatorState(partial(self.kinds[kind], **params), capacity=capacity)
+                self.states[key] = state
+            self.states.move_to_end(key)
+            while len(self.states) > self.max_size:
+                self.states.popitem(last=False)
+            return state
+
+    @classmethod
+    @cache
+    def parameters(cls, kind: str, params: tuple) -> tuple:
+        """The parameters of an indicator completed with its defaults."""
+        bound = signature(cls.kinds[kind]).bind(**dict(params))
+        bound.apply_defaults()
+        return tuple(bound.arguments.items())
+
+    @phase('indicators')
+    def apply(self, candles: Candles, *, symbol: str, timeframe: TimeFrame, kind: str, append: bool = True,
+              **params) -> dict[str, np.ndarray]:
+        """Compute an indicator over candles using the stored state.
+
+        Args:
+            candles (Candles): Candles in chronological order, the last one is treated as still forming
+            symbol (str): Name of the symbol the candles belong to
+            timeframe (TimeFrame): Timeframe of the candles
+            kind (str): One of ema, sma, atr, adx or rsi
+            append (bool): Add the columns to the candles
+            **params: Parameters of the indicator as accepted by pandas-ta
+
+        Returns:
+            dict[str, np.ndarray]: The indicator columns aligned with the candles
+        """
+        data = candles.data
+        size = len(data.index)
+        params = self.parameters(kind, tuple(sorted(params.items())))
+        key = (symbol, timeframe, kind, params)
+        times = data['time'].to_numpy()
+        bars = np.column_stack([data[column].to_numpy(dtype=float) for column in ('open', 'high', 'low', 'close')])
+        state = self.state(key=key, kind=kind, capacity=size, params=dict(params))
+        length = max(value for name, value in params if name in ('length', 'lensig') and value)
+        fresh = kind != 'sma' and size < self.warmup * length
+        journal = self.journals.get(key) if self.journals is not None and not fresh else None
+        with state.lock:
+            start = 0
+            if state.last_time is not None and not fresh:
+                last = int(np.searchsorted(times, state.last_time))
+                # the last committed bar must be a closed bar of these candles and the values held must reach back
+                # to the first candle, otherwise start over from the first candle
+                if last < size - 1 and times[last] == state.last_time and state.count > last:
+                    start = last + 1
+            if start == 0:
+                if journal is not None and (resumed := journal.resume(times[:size - 1])) is not None:
+                    indicator, values, start = resumed
+                    state.restore(indicator, values, times[start - 1])
+                else:
+                    state.reset()
+
+            for i in range(start, size - 1):
+                state.commit(bars[i], times[i])
+
+            closed = state.tail(size - 1) if size > 1 else np.empty((0, len(state.indicator.columns)))
+            current = state.indicator.peek(*bars[-1])
+            if self.journals is not None and not fresh:
+                journal = journal or self.journals.setdefault(key, IndicatorJournal(len(state.indicator.columns)))
+                journal.record(times[:size - 1], closed, state.indicator)
+
+        values = np.vstack([closed, current])
+        columns = {name: values[:, i] for i, name in enumerate(state.indicator.columns)}
+        if append:
+            for name, column in columns.items():
+                data[name] = column
+        return columns
+
+
+indicator_engine = IndicatorEngine()
@@ -0,0 +1,60 @@
+import asyncio
+from collections import deque
+from concurrent.futures import Future
+from threading import Lock
+
+
+class Limiter:
+    """A semaphore shared by coroutines running on different event loops.
+
+    The strategies of a bot run on threads of their own, each with its own event loop, so an asyncio.Semaphore cannot
+    limit them together. A slot freed by one thread is handed to the longest waiting coroutine, whatever its loop.
+
+    Attributes:
+        limit (int): Maximum number of coroutines inside the limiter at once.
+        active (int): Number of coroutines inside the limiter.
+    """
+    limit: int
+    active: int
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.active = 0
+        self.waiters: deque[Future] = deque()
+        self.lock = Lock()
+
+    async def acquire(self):
+        with self.lock:
+            if self.active < self.limit and not self.waiters:
+                self.active += 1
+                return
+            future = Future()
+            self.waiters.append(future)
+        try:
+            await asyncio.wrap_future(future)
+        except asyncio.CancelledError:
+            with self.lock:
+                waiting = future in self.waiters
+                if waiting:
+                    self.waiters.remove(future)
+                granted = not waiting and not future.cancelled()
+            # the slot was handed over just before the cancellation, so pass it on
+            if granted:
+                self.release()
+            raise
+
+    def release(self):
+        with self.lock:
+            while self.waiters:
+                future = self.waiters.popleft()
+                if future.set_running_or_notify_cancel():
+                    future.set_result(None)
+                    return
+            self.active -= 1
+
+    async def __aenter__(self) -> 'Limiter':
+        await self.acquire()
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        self.release()
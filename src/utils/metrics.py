@@ -0,0 +1,130 @@
+"""Timings of strategy cycles and of the closers of open orders, exported as Prometheus histograms.
+
+A cycle of a strategy is timed with cycle. While it runs, the time spent getting rates from the candle cache and
+computing indicators is added up with phase, and the rest of the cycle is recorded as the decision phase. Phases nest
+and only the outermost one is timed, so rates fetched concurrently for one request are counted once. Placing a trade
+and running a closer are timed with timed and closer. Every bot runs in a process of its own, so each one serves its
+metrics on a port of its own with serve.
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from inspect import iscoroutinefunction
+from logging import getLogger
+from time import perf_counter
+
+from prometheus_client import Histogram, start_http_server
+
+logger = getLogger(__name__)
+
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+strategy_phase_seconds = Histogram('strategy_phase_seconds', 'Time spent in each phase of a strategy cycle',
+                                   ['strategy', 'symbol', 'phase'], buckets=BUCKETS)
+closer_seconds = Histogram('closer_seconds', 'Time spent in a closer tracking an open order', ['closer', 'symbol'],
+                           buckets=BUCKETS)
+
+
+class Cycle:
+    """The phases timed so far in a cycle of a strategy.
+
+    Attributes:
+        spent (dict[str, float]): Seconds spent in each phase.
+        depth (int): Number of phases currently entered.
+    """
+    __slots__ = ('spent', 'depth')
+    spent: dict[str, float]
+    depth: int
+
+    def __init__(self):
+        self.spent = {'fetch': 0.0, 'indicators': 0.0}
+        self.depth = 0
+
+
+current_cycle: ContextVar[Cycle | None] = ContextVar('current_cycle', default=None)
+
+
+@contextmanager
+def cycle(strategy):
+    """Time a cycle of a strategy, recording the fetch, indicators and decision phases on exit."""
+    state = Cycle()
+    token = current_cycle.set(state)
+    start = perf_counter()
+    try:
+        yield state
+    finally:
+        total = perf_counter() - start
+        current_cycle.reset(token)
+        name, symbol = strategy.name, strategy.symbol.name
+        for phase_name, secs in state.spent.items():
+            strategy_phase_seconds.labels(name, symbol, phase_name).observe(secs)
+        strategy_phase_seconds.labels(name, symbol, 'decision').observe(max(total - sum(state.spent.values()), 0))
+
+
+class phase:
+    """Add the time spent in a block, or in each call of a decorated function, to a phase of the current cycle.
+    Does nothing outside a cycle."""
+    __slots__ = ('name', 'cycle', 'start')
+
+    def __init__(self, name: str):
+        self.name = name
+        self.cycle = None
+        self.start = 0.0
+
+    def __enter__(self) -> 'phase':
+        self.cycle = current_cycle.get()
+        if self.cycle is not None:
+            self.cycle.depth += 1
+            self.start = perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if self.cycle is None:
+            return
+        self.cycle.depth -= 1
+        if not self.cycle.depth:
+            self.cycle.spent[self.name] = self.cycle.spent.get(self.name, 0.0) + perf_counter() - self.start
+
+    def __call__(self, func):
+        name = self.name
+        if iscoroutinefunction(func):
+            @wraps(func)
+            async def wrapper(*args, **kwargs):
+                with phase(name):
+                    return await func(*args, **kwargs)
+        else:
+            @wraps(func)
+            def wrapper(*args, **kwargs):
+                with phase(name):
+                    return func(*args, **kwargs)
+        return wrapper
+
+
+@contextmanager
+def timed(strategy, phase_name: str):
+    """Record the time spent in the block as a phase of a strategy on its own."""
+    start = perf_counter()
+    try:
+        yield
+    finally:
+        strategy_phase_seconds.labels(strategy.name, strategy.symbol.name, phase_name).observe(perf_counter() - start)
+
+
+@contextmanager
+def closer(func, *, symbol: str):
+    """Record the time spent in the block as a run of a closer on an order of symbol."""
+    start = perf_counter()
+    try:
+        yield
+    finally:
+        name = getattr(func, '__name__', type(func).__name__)
+        closer_seconds.labels(name, symbol).observe(perf_counter() - start)
+
+
+def serve(*, port: int, addr: str = '0.0.0.0'):
+    """Serve the metrics of this process over HTTP on a background thread."""
+    try:
+        start_http_server(port, addr=addr)
+        logger.info(f"Serving metrics on {addr}:{port}")
+    except OSError as err:
+        logger.warning(f"{err}: Unable to serve metrics on {addr}:{port}")
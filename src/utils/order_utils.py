@@ -1,4 +1,6 @@
-from aiomql import Symbol, OrderType, MetaTrader
+import math
+
+from aiomql import Symbol, OrderType, MetaTrader, Tick, TradePosition
 from logging import getLogger
 
 logger = getLogger(__name__)
@@ -11,3 +13,63 @@ def calc_profit(*, sym: Symbol, open_price: float, close_price: float, volume: f
         return round(profit, 2)
     except Exception as exe:
         logger.warning(f'{exe} in calc profit')
+
+
+def snap(value: float, *, step: float, digits: int, up: bool) -> float:
+    """Round a value to a multiple of step, up or down."""
+    units = value / step
+    units = math.ceil(units - 1e-9) if up else math.floor(units + 1e-9)
+    return round(units * step, digits)
+
+
+def stop_distance(*, sym: Symbol, padding: float = 0.1) -> float:
+    """The nearest a stop can be placed to the price that triggers it. This is the larger of the stops level and the
+    freeze level plus a point, widened by a share of the spread in case it grows before the request reaches the
+    server."""
+    points = max(sym.trade_stops_level, sym.trade_freeze_level) + 1 + sym.spread * padding
+    return points * sym.point
+
+
+def fit_stops(*, sym: Symbol, order_type: OrderType, tick: Tick, sl: float = 0, tp: float = 0,
+              padding: float = 0.1) -> tuple[float, float]:
+    """Move the stops of a position away from the price to the nearest levels the server accepts, so a request
+    setting them is not rejected as invalid stops. They are rounded to the tick size, away from the price. A stop
+    of zero is not set and is left alone.
+
+    Args:
+        sym (Symbol): The symbol of the position, with fresh info
+        order_type (OrderType): The direction of the position
+        tick (Tick): The current tick
+        sl (float): The stop loss to set
+        tp (float): The take profit to set
+        padding (float): Share of the spread to keep the stops further away by
+
+    Returns:
+        tuple[float, float]: The stop loss and the take profit
+    """
+    distance = stop_distance(sym=sym, padding=padding)
+    step, digits = sym.trade_tick_size or sym.point, sym.digits
+    # a buy position is closed at the bid and a sell position at the ask
+    if order_type == OrderType.BUY:
+        sl = sl and snap(min(sl, tick.bid - distance), step=step, digits=digits, up=False)
+        tp = tp and snap(max(tp, tick.bid + distance), step=step, digits=digits, up=True)
+    else:
+        sl = sl and snap(max(sl, tick.ask + distance), step=step, digits=digits, up=True)
+        tp = tp and snap(min(tp, tick.ask - distance), step=step, digits=digits, up=False)
+    return sl, tp
+
+
+def stops_frozen(*, sym: Symbol, position: TradePosition, tick: Tick) -> bool:
+    """Check if the price is within the freeze level of a stop of a position, when the server rejects any change to
+    its stops."""
+    freeze = sym.trade_freeze_level * sym.point
+    price = tick.bid if position.type == OrderType.BUY else tick.ask
+    return freeze > 0 and any(stop and abs(price - stop) <= freeze for stop in (position.sl, position.tp))
+
+
+def fit_volume(*, sym: Symbol, volume: float) -> float:
+    """Bring a volume within the limits of a symbol, rounded down to the volume step."""
+    step = sym.volume_step
+    digits = len(f"{step:f}".rstrip('0').partition('.')[2])
+    volume = snap(min(volume, sym.volume_max), step=step, digits=digits, up=False)
+    return max(volume, sym.volume_min)
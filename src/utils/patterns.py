@@ -1,16 +1,19 @@
+import numpy as np
 from aiomql import Candle, Candles
 
 
 def find_bearish_fractal(candles: Candles) -> Candle | None:
-    for i in reversed(range(2, len(candles) - 1)):
-        if candles[i].high > max(candles[i - 1].high, candles[i + 1].high):
-            return candles[i]
+    highs = candles.data['high'].to_numpy()
+    mid = highs[2:-1]
+    indices = np.flatnonzero((mid > highs[1:-2]) & (mid > highs[3:]))
+    return candles[int(indices[-1]) + 2] if len(indices) else None
 
 
 def find_bullish_fractal(candles: Candles) -> Candle | None:
-    for i in reversed(range(2, len(candles) - 1)):
-        if candles[i].low < min(candles[i - 1].low, candles[i + 1].low):
-            return candles[i]
+    lows = candles.data['low'].to_numpy()
+    mid = lows[2:-1]
+    indices = np.flatnonzero((mid < lows[1:-2]) & (mid < lows[3:]))
+    return candles[int(indices[-1]) + 2] if len(indices) else None
 
 
 def is_half_bullish_fractal(candles: Candles) -> bool:
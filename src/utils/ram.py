@@ -1,4 +1,7 @@
-from aiomql import RAM as _RAM, Positions, TradePosition
+from aiomql import RAM as _RAM, TradePosition
+
+from .account_state import account_state
+from .exposure import exposure_index
 
 
 class RAM(_RAM):
@@ -14,27 +17,22 @@ class RAM(_RAM):
     async def get_amount(self) -> float:
         if self.fixed_amount:
             return self.fixed_amount
-        await self.account.refresh()
-        amount = self.account.equity * self.risk
+        account = await account_state.get()
+        amount = account.equity * self.risk
         return max(self.min_amount, min(self.max_amount, amount))
 
     async def get_open_positions(self, symbol='') -> list[TradePosition]:
-        pos = await Positions(symbol=symbol).positions_get()
+        pos = await exposure_index.get(symbol=symbol)
         self.positions = pos
         return pos
 
     async def check_losing_positions(self, symbol='') -> bool:
         """Check if the number of losing positions is greater than or equal the loss limit."""
-        positions = await Positions(symbol=symbol).positions_get()
-        loosing = [trade for trade in positions if trade.profit < 0]
-        return len(loosing) > self.loss_limit
+        return await exposure_index.losing_count(symbol=symbol) > self.loss_limit
 
     async def check_symbol_positions(self, *, symbol) -> bool:
-        positions = await Positions(symbol=symbol).positions_get()
-        # loosing = [trade for trade in positions if trade.profit < 0]
-        return len(positions) >= self.symbol_limit
+        return await exposure_index.count(symbol=symbol) >= self.symbol_limit
 
     async def check_open_positions(self, symbol='') -> bool:
         """Check if the number of open positions is greater than or equal the loss limit."""
-        positions = await Positions(symbol=symbol).positions_get()
-        return len(positions) >= self.open_limit
+        return await exposure_index.count(symbol=symbol) >= self.open_limit
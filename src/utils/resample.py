@@ -0,0 +1,84 @@
+"""Build the bars of higher timeframes from the bars of a lower timeframe.
+
+Bar times are trade server times, so aligning bars on multiples of their length in those times reproduces the bars of
+the terminal, with daily bars starting at the server's midnight. Weekly bars open on Sunday and monthly bars on the
+first day of the month, as in the terminal.
+"""
+import numpy as np
+from aiomql import TimeFrame
+
+# 1970-01-04 was a Sunday, weekly bars open on Sunday like in the terminal
+WEEK_OFFSET = 3 * 86400
+
+
+def bar_times(times: np.ndarray, timeframe: TimeFrame) -> np.ndarray:
+    """Open times of the bars of a timeframe that the given times fall in."""
+    if timeframe == TimeFrame.MN1:
+        return times.astype('datetime64[s]').astype('datetime64[M]').astype('datetime64[s]').astype(np.int64)
+    if timeframe == TimeFrame.W1:
+        return times - (times - WEEK_OFFSET) % timeframe.time
+    return times - times % timeframe.time
+
+
+def nests(base: TimeFrame, timeframe: TimeFrame) -> bool:
+    """Whether every bar of timeframe is made of whole bars of base."""
+    if timeframe in (TimeFrame.W1, TimeFrame.MN1):
+        return base.time <= TimeFrame.D1.time and TimeFrame.D1.time % base.time == 0
+    return timeframe.time % base.time == 0
+
+
+def span(base: TimeFrame, timeframe: TimeFrame) -> int:
+    """The largest number of base bars in a bar of timeframe."""
+    return (31 * TimeFrame.D1.time if timeframe == TimeFrame.MN1 else timeframe.time) // base.time
+
+
+def groups(rates: np.ndarray, timeframe: TimeFrame) -> tuple[np.ndarray, np.ndarray]:
+    """Open times of the bars of a timeframe that rates fall in and the index of the first row of each bar."""
+    times = bar_times(rates['time'], timeframe)
+    starts = np.flatnonzero(np.r_[True, times[1:] != times[:-1]]) if len(times) else np.empty(0, dtype=np.int64)
+    return times, starts
+
+
+def resample(rates: np.ndarray, timeframe: TimeFrame, *, complete: bool = False) -> np.ndarray:
+    """Aggregate rates into bars of a higher timeframe.
+
+    Args:
+        rates (np.ndarray): Rates in chronological order in the format of the terminal
+        timeframe (TimeFrame): Timeframe of the bars to build
+        complete (bool): Drop the first bar when the rates start after its open, so every bar covers all its rows
+
+    Returns:
+        np.ndarray: The bars with the dtype of the rates, the last one formed of the rows available so far
+    """
+    times, starts = groups(rates, timeframe)
+    bars = np.zeros(len(starts), dtype=rates.dtype)
+    if len(starts):
+        ends = np.r_[starts[1:], len(rates)] - 1
+        fields = rates.dtype.names
+        bars['time'] = times[starts]
+        bars['open'] = rates['open'][starts]
+        bars['high'] = np.maximum.reduceat(rates['high'], starts)
+        bars['low'] = np.minimum.reduceat(rates['low'], starts)
+        bars['close'] = rates['close'][ends]
+        for name in ('tick_volume', 'real_volume'):
+            if name in fields:
+                bars[name] = np.add.reduceat(rates[name], starts)
+        if 'spread' in fields:
+            bars['spread'] = rates['spread'][starts]
+    if complete and len(bars) and bars['time'][0] != rates['time'][0]:
+        bars = bars[1:]
+    return bars
+
+
+class Resampled:
+    """Bars of one timeframe built from base bars, with the mapping between the two.
+
+    Attributes:
+        rates (np.ndarray): The bars.
+        starts (np.ndarray): Index of the first base bar of each bar.
+        groups (np.ndarray): Index of the bar each base bar belongs to.
+    """
+    def __init__(self, *, base: np.ndarray, timeframe: TimeFrame):
+        times, self.starts = groups(base, timeframe)
+        self.groups = np.cumsum(np.r_[False, times[1:] != times[:-1]]) if len(times) else np.empty(0, dtype=np.int64)
+        self.rates = resample(base, timeframe)
@@ -0,0 +1,52 @@
+"""The above, below and cross predicates of pandas_ta, evaluated in NumPy over the trailing candles a strategy reads.
+
+Strategies compare price and indicator columns over every candle fetched and then only read the last one or two. With
+a window the predicates are evaluated over the last window candles only. The indicators themselves are computed over
+all the candles, so only the comparison is cut short, and cross reads one candle before the window for its previous
+values. Candles before the window are missing values, so reading one of them raises instead of passing for false.
+Without a window the results match pandas_ta over the whole series.
+"""
+import numpy as np
+from pandas import Series
+from pandas.arrays import BooleanArray, IntegerArray
+
+
+def above(a: Series, b: Series, *, asint: bool = True, window: int = 0) -> Series:
+    """Whether a is at or above b."""
+    start = first(a, window)
+    values = a.to_numpy()[start:] >= b.to_numpy()[start:]
+    return result(values, index=a, start=start, asint=asint, name=f"{a.name}_A_{b.name}")
+
+
+def below(a: Series, b: Series, *, asint: bool = True, window: int = 0) -> Series:
+    """Whether a is at or below b."""
+    start = first(a, window)
+    values = a.to_numpy()[start:] <= b.to_numpy()[start:]
+    return result(values, index=a, start=start, asint=asint, name=f"{a.name}_B_{b.name}")
+
+
+def cross(a: Series, b: Series, *, above: bool = True, asint: bool = True, window: int = 0) -> Series:
+    """Whether a crossed above b, or below it when above is False, on each candle."""
+    start = first(a, window)
+    # the candle before the window gives the previous values of the first candle in it
+    lead = max(start - 1, 0)
+    x, y = a.to_numpy()[lead:], b.to_numpy()[lead:]
+    current = x > y
+    previous = np.r_[False, x[:-1] < y[:-1]]
+    values = current & previous if above else ~current & ~previous
+    return result(values[start - lead:], index=a, start=start, asint=asint, name=f"{a.name}_XA_{b.name}" if above
+                  else f"{a.name}_XB_{b.name}")
+
+
+def first(a: Series, window: int) -> int:
+    return max(len(a) - window, 0) if window else 0
+
+
+def result(values: np.ndarray, *, index: Series, start: int, asint: bool, name: str) -> Series:
+    if not start:
+        return Series(values.astype(int) if asint else values, index=index.index, name=name, copy=False)
+    size = start + len(values)
+    data, mask = np.zeros(size, dtype=int if asint else bool), np.ones(size, dtype=bool)
+    data[start:], mask[start:] = values, False
+    array = IntegerArray(data, mask) if asint else BooleanArray(data, mask)
+    return Series(array, index=index.index, name=name, copy=False)
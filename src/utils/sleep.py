@@ -10,6 +10,4 @@ async def sleep(secs: float):
     Args:
         secs (float): The time in seconds. Usually the timeframe you are trading on.
     """
-    mod = time() % secs
-    secs = secs - mod if mod != 0 else mod
-    await asyncio.sleep(secs)
\ No newline at end of file
+    await asyncio.sleep(secs - time() % secs)
\ No newline at end of file
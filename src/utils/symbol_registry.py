@@ -0,0 +1,79 @@
+from logging import getLogger
+from threading import Lock
+from time import time
+from typing import Callable
+
+from aiomql import Symbol
+
+logger = getLogger(__name__)
+
+
+class SymbolRegistry:
+    """A process wide store of initialised symbols keyed by name.
+
+    A symbol is initialised once, the first time it is requested. After that its info, which carries the volatile
+    fields such as spread and trade_stops_level, is pulled from the terminal again only when it is older than ttl.
+    Symbols refreshed through the registry by the traders are adopted, so the closers reuse the instances the
+    strategies already hold.
+
+    Attributes:
+        ttl (float): Seconds after which the info of a symbol is refreshed.
+        clock (Callable): Source of the current time in seconds.
+    """
+    ttl: float
+    clock: Callable[[], float]
+
+    def __init__(self, *, ttl: float = 15, clock: Callable[[], float] = time):
+        self.ttl = ttl
+        self.clock = clock
+        self.symbols: dict[str, Symbol] = {}
+        self.refreshed: dict[int, float] = {}
+        self.lock = Lock()
+
+    async def get(self, *, name: str) -> Symbol:
+        """Get an initialised symbol by name.
+
+        Args:
+            name (str): Name of the financial instrument
+
+        Returns:
+            Symbol: The shared symbol object
+
+        Raises:
+            ValueError: If the symbol could not be initialised
+        """
+        with self.lock:
+            symbol = self.symbols.get(name)
+        if symbol is not None:
+            return await self.refresh(symbol=symbol)
+
+        symbol = Symbol(name=name)
+        if not await symbol.init():
+            raise ValueError(f"Unable to initialise symbol {name}")
+        with self.lock:
+            symbol = self.symbols.setdefault(name, symbol)
+            self.refreshed.setdefault(id(symbol), self.clock())
+        return symbol
+
+    async def refresh(self, *, symbol: Symbol) -> Symbol:
+        """Update the info of a symbol if it is older than ttl. The symbol is added to the registry if none with
+        the same name is held."""
+        now = self.clock()
+        with self.lock:
+            self.symbols.setdefault(symbol.name, symbol)
+            refreshed = self.refreshed.get(id(symbol), 0)
+        if now - refreshed >= self.ttl:
+            await symbol.info()
+            with self.lock:
+                self.refreshed[id(symbol)] = now
+        return symbol
+
+    def invalidate(self, *, name: str = ''):
+        """Force a refresh of the info on the next request. Affects every symbol if no name is given."""
+        with self.lock:
+            symbols = [self.symbols[name]] if name in self.symbols else [] if name else list(self.symbols.values())
+            for symbol in symbols:
+                self.refreshed.pop(id(symbol), None)
+
+
+symbol_registry = SymbolRegistry()